@@ -0,0 +1,336 @@
+# Copyright (c) 2025, Snelex and contributors
+# For license information, please see license.txt
+
+"""Daily operations analytics.
+
+``aggregate_operations`` computes per (date, route, payment_by) throughput and
+Job Card delivery counts with two ``GROUP BY`` queries. The hourly
+``materialize_daily_operations`` job stores the result in ``Daily Operations
+Summary``: it only recomputes the consignment dates touched by a Consignment
+Note or Job Card modified since its last run, so the Daily Operations report
+and dashboards read a few pre-aggregated rows instead of a year of documents.
+
+``materialize_status_counts`` keeps ``Daily Status Summary`` the same way: one
+count per (doctype, date, location, status) for Consignment Notes and Job
+Cards, which the Operations workspace number cards and charts sum up. A
+document whose date changes only shows up under its new date, so
+``record_moved_date`` keeps the date it left in a Redis set that the next run
+refreshes too.
+
+Archived notes and Job Cards are no longer in the live tables. Before they
+are deleted, ``archive_summaries`` stores their share of both summaries as
+rows flagged ``archived``. Refreshes only replace the live rows of a date, so
+the sums the report, cards and charts read stay whole.
+"""
+
+import frappe
+from frappe.query_builder import Case
+from frappe.query_builder.functions import Count, Sum
+from frappe.utils import getdate, now_datetime
+
+from snelex.profiling import profiled
+
+SUMMARY_DOCTYPE = "Daily Operations Summary"
+WATERMARK_KEY = "snelex_daily_operations_watermark"
+STATUS_SUMMARY_DOCTYPE = "Daily Status Summary"
+STATUS_WATERMARK_KEY = "snelex_daily_status_watermark"
+MOVED_DATES_KEY = "snelex:status_moved_dates"
+DATES_PER_CHUNK = 31
+
+# doctype -> (date field, location field, status field) counted in Daily Status Summary
+STATUS_SOURCES = {
+	"Consignment Note": ("consignment_date", "consignment_to", "docstatus"),
+	"Job Card": ("job_date", "consignment_to", "job_status"),
+}
+DOCSTATUS_LABELS = {0: "Draft", 1: "Submitted", 2: "Cancelled"}
+
+GROUP_FIELDS = ("date", "consignment_from", "consignment_to", "payment_by")
+MEASURE_FIELDS = (
+	"consignment_notes",
+	"total_pieces",
+	"total_weight_lbs",
+	"total_cbm",
+	"job_cards",
+	"delivered",
+	"on_time",
+)
+
+
+def materialize_daily_operations():
+	"""Scheduler job: refresh the summary rows of every date touched since the last run"""
+	_refresh_since_watermark(WATERMARK_KEY, get_touched_dates, refresh_dates)
+
+
+def materialize_status_counts():
+	"""Scheduler job: refresh the status counts of every date touched since the last run"""
+	moved = frappe.cache.smembers(MOVED_DATES_KEY)
+
+	def get_dates(since):
+		touched = get_status_touched_dates(since)
+		for member in moved:
+			doctype, date = member.decode().split("|", 1)
+			touched.setdefault(doctype, set()).add(date)
+		return touched
+
+	_refresh_since_watermark(STATUS_WATERMARK_KEY, get_dates, refresh_status_dates)
+	if moved:
+		# only what was read: dates recorded while this ran wait for the next run
+		frappe.cache.srem(MOVED_DATES_KEY, *moved)
+
+
+@profiled
+def record_moved_date(doc, method=None):
+	"""doc_events handler for Consignment Note and Job Card: remember the date a document moved away from"""
+	date_field = STATUS_SOURCES[doc.doctype][0]
+	before = doc.get_doc_before_save()
+	previous = before and before.get(date_field)
+	if previous and (not doc.get(date_field) or getdate(previous) != getdate(doc.get(date_field))):
+		frappe.cache.sadd(MOVED_DATES_KEY, f"{doc.doctype}|{getdate(previous)}")
+
+
+def _refresh_since_watermark(watermark_key, get_dates, refresh):
+	# taken before reading, so changes made while this runs are picked up next time
+	started = now_datetime()
+	refresh(get_dates(frappe.db.get_global(watermark_key)))
+	frappe.db.set_global(watermark_key, str(started))
+	frappe.db.commit()
+
+
+def refresh_dates(dates):
+	"""Replace the live summary rows of ``dates``, committing once per chunk of dates"""
+	dates = sorted({getdate(date) for date in dates if date})
+	for start in range(0, len(dates), DATES_PER_CHUNK):
+		chunk = dates[start : start + DATES_PER_CHUNK]
+		rows = aggregate_operations(chunk)
+		frappe.db.delete(SUMMARY_DOCTYPE, {"date": ["in", chunk], "archived": 0})
+		insert_summary_rows(rows)
+		frappe.db.commit()
+
+
+def insert_summary_rows(rows, archived=0):
+	now = now_datetime()
+	frappe.db.bulk_insert(
+		SUMMARY_DOCTYPE,
+		fields=[
+			"name",
+			"creation",
+			"modified",
+			"modified_by",
+			"owner",
+			"docstatus",
+			"archived",
+			*GROUP_FIELDS,
+			*MEASURE_FIELDS,
+		],
+		values=[
+			(
+				frappe.generate_hash(length=10),
+				now,
+				now,
+				"Administrator",
+				"Administrator",
+				0,
+				archived,
+				*(row[field] for field in GROUP_FIELDS),
+				*(row.get(field) or 0 for field in MEASURE_FIELDS),
+			)
+			for row in rows
+		],
+	)
+
+
+def archive_summaries(names):
+	"""Keep the share of the notes ``names`` and their Job Cards in both summaries as archived rows.
+
+	Called before the documents are deleted; returns ``{doctype: dates}`` whose
+	live rows must be refreshed once they are gone.
+	"""
+	dates = frappe.get_all(
+		"Consignment Note", filters={"name": ["in", names]}, pluck="consignment_date", distinct=True
+	)
+	insert_summary_rows(aggregate_operations(dates, names), archived=1)
+
+	touched = {}
+	for doctype, (_date_field, _location_field, status_field) in STATUS_SOURCES.items():
+		filters = {"name" if doctype == "Consignment Note" else "consignment_note": ["in", names]}
+		counts = count_statuses(doctype, filters)
+		insert_status_rows(doctype, status_field, counts, archived=1)
+		touched[doctype] = {row.date for row in counts}
+	return touched
+
+
+def get_touched_dates(since=None):
+	"""Consignment dates with a note or Job Card modified after ``since`` (all dates when empty)"""
+	note = frappe.qb.DocType("Consignment Note")
+	job = frappe.qb.DocType("Job Card")
+
+	notes = frappe.qb.from_(note).select(note.consignment_date).distinct()
+	jobs = (
+		frappe.qb.from_(job)
+		.join(note)
+		.on(note.name == job.consignment_note)
+		.select(note.consignment_date)
+		.distinct()
+	)
+	if since:
+		notes = notes.where(note.modified > since)
+		jobs = jobs.where(job.modified > since)
+
+	return {row[0] for row in notes.run()} | {row[0] for row in jobs.run()}
+
+
+def aggregate_operations(dates, names=None):
+	"""Return one row per (date, route, payment_by) of submitted notes on ``dates``, or only of ``names``"""
+	if not dates:
+		return []
+
+	note = frappe.qb.DocType("Consignment Note")
+	job = frappe.qb.DocType("Job Card")
+	group_by = (note.consignment_date, note.consignment_from, note.consignment_to, note.payment_by)
+	keys = (
+		note.consignment_date.as_("date"),
+		note.consignment_from,
+		note.consignment_to,
+		note.payment_by,
+	)
+
+	throughput = (
+		frappe.qb.from_(note)
+		.select(
+			*keys,
+			Count(note.name).as_("consignment_notes"),
+			Sum(note.total_no_of_pieces).as_("total_pieces"),
+			Sum(note.total_weight_lbs).as_("total_weight_lbs"),
+			Sum(note.total_cbm).as_("total_cbm"),
+		)
+		.where(note.docstatus == 1)
+		.where(note.consignment_date.isin(dates))
+		.groupby(*group_by)
+	)
+	if names:
+		throughput = throughput.where(note.name.isin(names))
+
+	# a separate query, so notes with several Job Cards are not counted twice above
+	deliveries = (
+		frappe.qb.from_(job)
+		.join(note)
+		.on(note.name == job.consignment_note)
+		.select(
+			*keys,
+			Count(job.name).as_("job_cards"),
+			Sum(Case().when(job.actual_delivery_date.isnotnull(), 1).else_(0)).as_("delivered"),
+			Sum(Case().when(job.actual_delivery_date <= job.estimated_delivery_date, 1).else_(0)).as_(
+				"on_time"
+			),
+		)
+		.where(note.docstatus == 1)
+		.where(job.docstatus < 2)
+		.where(note.consignment_date.isin(dates))
+		.groupby(*group_by)
+	)
+	if names:
+		deliveries = deliveries.where(note.name.isin(names))
+
+	rows = {}
+	for row in [*throughput.run(as_dict=True), *deliveries.run(as_dict=True)]:
+		key = tuple(row[field] for field in GROUP_FIELDS)
+		rows.setdefault(key, frappe._dict(zip(GROUP_FIELDS, key, strict=True))).update(row)
+	return list(rows.values())
+
+
+def get_status_touched_dates(since=None):
+	"""Return ``{doctype: dates}`` changed after ``since``, deletions included"""
+	touched = {}
+	for doctype, (date_field, _location_field, _status_field) in STATUS_SOURCES.items():
+		touched[doctype] = set(
+			frappe.get_all(
+				doctype,
+				filters={"modified": [">", since]} if since else {},
+				fields=[date_field],
+				order_by=date_field,
+				distinct=True,
+				pluck=date_field,
+			)
+		)
+
+	if since:
+		# deleted drafts leave no modified row behind
+		for row in frappe.get_all(
+			"Deleted Document",
+			filters={"deleted_doctype": ["in", list(STATUS_SOURCES)], "creation": [">", since]},
+			fields=["deleted_doctype", "data"],
+		):
+			date_field = STATUS_SOURCES[row.deleted_doctype][0]
+			touched[row.deleted_doctype].add(frappe.parse_json(row.data).get(date_field))
+
+	return touched
+
+
+def refresh_status_dates(touched):
+	"""Replace the live status counts of the given ``{doctype: dates}``, committing per chunk"""
+	for doctype, dates in touched.items():
+		date_field, _location_field, status_field = STATUS_SOURCES[doctype]
+		dates = sorted({getdate(date) for date in dates if date})
+		for start in range(0, len(dates), DATES_PER_CHUNK):
+			chunk = dates[start : start + DATES_PER_CHUNK]
+			counts = count_statuses(doctype, {date_field: ["in", chunk]})
+			frappe.db.delete(
+				STATUS_SUMMARY_DOCTYPE, {"reference_doctype": doctype, "date": ["in", chunk], "archived": 0}
+			)
+			insert_status_rows(doctype, status_field, counts)
+			frappe.db.commit()
+
+
+def count_statuses(doctype, filters):
+	"""Count the ``doctype`` documents matching ``filters`` per date, location and status"""
+	date_field, location_field, status_field = STATUS_SOURCES[doctype]
+	return frappe.get_all(
+		doctype,
+		filters=filters,
+		fields=[
+			f"{date_field} as date",
+			f"{location_field} as location",
+			f"{status_field} as status",
+			"count(*) as count",
+		],
+		group_by=f"{date_field}, {location_field}, {status_field}",
+		order_by=None,
+	)
+
+
+def insert_status_rows(doctype, status_field, counts, archived=0):
+	now = now_datetime()
+	frappe.db.bulk_insert(
+		STATUS_SUMMARY_DOCTYPE,
+		fields=[
+			"name",
+			"creation",
+			"modified",
+			"modified_by",
+			"owner",
+			"docstatus",
+			"archived",
+			"date",
+			"location",
+			"reference_doctype",
+			"status",
+			"count",
+		],
+		values=[
+			(
+				frappe.generate_hash(length=10),
+				now,
+				now,
+				"Administrator",
+				"Administrator",
+				0,
+				archived,
+				row.date,
+				row.location,
+				doctype,
+				DOCSTATUS_LABELS.get(row.status) if status_field == "docstatus" else row.status,
+				row.count,
+			)
+			for row in counts
+		],
+	)
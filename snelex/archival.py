@@ -0,0 +1,211 @@
+# Copyright (c) 2025, Snelex and contributors
+# For license information, please see license.txt
+
+"""Archival of closed Consignment Notes and their Job Cards.
+
+A note is closed once it is cancelled, or once every Job Card for it is
+Completed or Cancelled. The daily ``archive_closed_consignments`` job finds
+closed notes whose consignment date is older than ``snelex_archive_after_days``
+(site config, default 365). For each one it writes a single ``Archived
+Consignment`` row holding the note, its Job Cards and its tracking entry as
+JSON, then deletes the live rows without touching what linked to them. So
+notes that are still referenced are left alone: notes on any Manifest,
+notes invoiced on a Sales Invoice, and amended or amending notes.
+
+The job scans the notes in keyset-paginated chunks and commits each chunk.
+Its cursor is stored as a global, so a run cut short by a timeout resumes
+where it stopped. Before the live rows go, their share of the daily
+summaries is kept as archived rows by ``snelex.analytics.archive_summaries``,
+which the scheduled refreshes leave in place.
+
+``get_consignment_note`` is the combined lookup used by the print format,
+and ``snelex.tracking`` falls back to the archived tracking entries, so
+archived notes stay readable from tracking search and print.
+"""
+
+import frappe
+from frappe.utils import add_days, cint, getdate, now_datetime, today
+
+from snelex.analytics import archive_summaries, refresh_dates, refresh_status_dates
+from snelex.profiling import profiled
+from snelex.tracking import remove_tracking
+
+ARCHIVE_DOCTYPE = "Archived Consignment"
+CURSOR_KEY = "snelex_archive_cursor"
+DEFAULT_ARCHIVE_AFTER_DAYS = 365
+ARCHIVE_CHUNK_SIZE = 200
+CLOSED_JOB_STATUSES = ("Completed", "Cancelled")
+
+
+def archive_closed_consignments(chunk_size=ARCHIVE_CHUNK_SIZE):
+	"""Scheduler job: archive closed notes past the retention age, resuming from the last cursor"""
+	chunk_size = cint(chunk_size) or ARCHIVE_CHUNK_SIZE
+	cutoff = get_retention_cutoff()
+	last = frappe.db.get_global(CURSOR_KEY) or ""
+	archived = 0
+
+	while True:
+		names = frappe.get_all(
+			"Consignment Note",
+			filters={"consignment_date": ["<", cutoff], "name": [">", last]},
+			order_by="name asc",
+			limit=chunk_size,
+			pluck="name",
+		)
+		if not names:
+			break
+
+		archived += archive_consignments(get_closed_consignments(names))
+		last = names[-1]
+		frappe.db.set_global(CURSOR_KEY, last)
+		frappe.db.commit()
+
+	# the scan is complete, the next run starts from the beginning
+	frappe.db.set_global(CURSOR_KEY, "")
+	frappe.db.commit()
+	return archived
+
+
+def get_closed_consignments(names):
+	"""The notes of ``names`` that are cancelled or whose Job Cards are all closed, and nothing links to"""
+	notes = frappe.get_all(
+		"Consignment Note",
+		filters={"name": ["in", names]},
+		fields=["name", "docstatus", "amended_from", "sales_invoice"],
+	)
+	job_statuses = {}
+	for job in frappe.get_all(
+		"Job Card", filters={"consignment_note": ["in", names]}, fields=["consignment_note", "job_status"]
+	):
+		job_statuses.setdefault(job.consignment_note, set()).add(job.job_status)
+
+	closed = []
+	referenced = get_referenced_consignments(names)
+	for note in notes:
+		if note.name in referenced or note.amended_from or note.sales_invoice:
+			continue
+		statuses = job_statuses.get(note.name)
+		if note.docstatus == 2 or (statuses and statuses <= set(CLOSED_JOB_STATUSES)):
+			closed.append(note.name)
+	return closed
+
+
+def get_referenced_consignments(names):
+	"""The notes of ``names`` still linked from a Manifest row or an amendment"""
+	referenced = set(
+		frappe.get_all(
+			"Consignment List",
+			filters={"consignment_number": ["in", names]},
+			pluck="consignment_number",
+			distinct=True,
+		)
+	)
+	referenced.update(
+		frappe.get_all(
+			"Consignment Note",
+			filters={"amended_from": ["in", names]},
+			pluck="amended_from",
+			distinct=True,
+		)
+	)
+	return referenced
+
+
+def archive_consignments(names):
+	"""Move ``names`` with their Job Cards and tracking rows into Archived Consignment"""
+	if not names:
+		return 0
+
+	notes = frappe.get_all("Consignment Note", filters={"name": ["in", names]}, fields=["*"])
+	job_cards = {}
+	for job in frappe.get_all(
+		"Job Card", filters={"consignment_note": ["in", names]}, fields=["*"], order_by="creation asc"
+	):
+		job_cards.setdefault(job.consignment_note, []).append(job)
+	tracking = {
+		row.name: row
+		for row in frappe.get_all("Consignment Tracking", filters={"name": ["in", names]}, fields=["*"])
+	}
+
+	now = now_datetime()
+	values = []
+	for note in notes:
+		jobs = job_cards.get(note.name, [])
+		values.append(
+			(
+				note.name,
+				now,
+				now,
+				frappe.session.user,
+				frappe.session.user,
+				0,
+				note.name,
+				note.tracking_no,
+				note.consignment_date,
+				note.consignment_to,
+				jobs[-1].job_status if jobs else None,
+				now,
+				frappe.as_json(note, indent=None),
+				frappe.as_json(jobs, indent=None),
+				frappe.as_json(tracking.get(note.name), indent=None),
+			)
+		)
+
+	# a note restored and closed again replaces its earlier archive
+	frappe.db.delete(ARCHIVE_DOCTYPE, {"name": ["in", [note.name for note in notes]]})
+	frappe.db.bulk_insert(
+		ARCHIVE_DOCTYPE,
+		fields=[
+			"name",
+			"creation",
+			"modified",
+			"modified_by",
+			"owner",
+			"docstatus",
+			"consignment_note",
+			"tracking_no",
+			"consignment_date",
+			"consignment_to",
+			"job_status",
+			"archived_on",
+			"consignment_note_data",
+			"job_cards_data",
+			"tracking_data",
+		],
+		values=values,
+	)
+
+	archived = [note.name for note in notes]
+	touched = archive_summaries(archived)
+	# plain deletes: the documents are kept whole in the archive, so no on_trash work is needed
+	frappe.db.delete("Job Card", {"consignment_note": ["in", archived]})
+	frappe.db.delete("Consignment Note", {"name": ["in", archived]})
+	remove_tracking(archived)
+	# the live summary rows of those dates still count the deleted documents
+	refresh_dates(touched["Consignment Note"])
+	refresh_status_dates(touched)
+	return len(archived)
+
+
+@profiled
+def get_consignment_note(name):
+	"""Return the Consignment Note ``name``, rebuilt from the archive when it was archived"""
+	# a jinja method, so reachable from any user-editable template
+	if frappe.db.exists("Consignment Note", name):
+		frappe.has_permission("Consignment Note", "read", name, throw=True)
+		return frappe.get_doc("Consignment Note", name)
+
+	data = frappe.db.get_value(ARCHIVE_DOCTYPE, name, "consignment_note_data")
+	if not data:
+		frappe.throw(f"Consignment Note {name} not found", frappe.DoesNotExistError)
+	frappe.has_permission(ARCHIVE_DOCTYPE, "read", name, throw=True)
+	doc = frappe.get_doc({**frappe.parse_json(data), "doctype": "Consignment Note"})
+	doc.flags.archived = True
+	return doc
+
+
+def get_retention_cutoff():
+	"""The consignment date before which closed notes are archived"""
+	return getdate(
+		add_days(today(), -(cint(frappe.conf.snelex_archive_after_days) or DEFAULT_ARCHIVE_AFTER_DAYS))
+	)
@@ -0,0 +1,174 @@
+# Copyright (c) 2025, Snelex and contributors
+# For license information, please see license.txt
+
+"""Batch PDF printing of Consignment Notes.
+
+The print format template is compiled once, and letter head, print settings
+and print CSS are fetched once per batch. Notes are read in chunks with one
+query each, every chunk becomes one wkhtmltopdf call, and the chunk PDFs are
+appended to a single file written straight into the site's private files.
+"""
+
+import os
+from io import BytesIO
+
+import frappe
+from frappe.utils import cint, now_datetime
+from frappe.utils.pdf import get_pdf
+from frappe.www.printview import get_print_style
+
+from snelex.profiling import profiled
+
+PRINT_FORMAT = "Consignment Note Print"
+PRINT_CHUNK_SIZE = 50
+PRINT_EVENT = "snelex_batch_print"
+
+
+@frappe.whitelist()
+@profiled
+def print_consignment_notes(manifest=None, consignment_notes=None, letter_head=None, no_letterhead=0):
+	"""Queue a merged PDF of a Manifest's Consignment Notes or of an explicit list"""
+	frappe.has_permission("Consignment Note", "print", throw=True)
+
+	if manifest:
+		frappe.has_permission("Manifest", "read", manifest, throw=True)
+		consignment_notes = frappe.get_all(
+			"Consignment List",
+			filters={"parenttype": "Manifest", "parent": manifest, "consignment_number": ["is", "set"]},
+			order_by="idx asc",
+			pluck="consignment_number",
+		)
+	else:
+		consignment_notes = frappe.parse_json(consignment_notes) or []
+
+	if not consignment_notes:
+		frappe.throw("There are no Consignment Notes to print")
+
+	job_id = f"consignment_print::{manifest or frappe.generate_hash(length=10)}"
+	frappe.enqueue(
+		"snelex.batch_print.render_batch",
+		queue="long",
+		timeout=3600,
+		job_id=job_id,
+		deduplicate=True,
+		now=frappe.flags.in_test,
+		consignment_notes=list(dict.fromkeys(consignment_notes)),
+		manifest=manifest,
+		letter_head=letter_head,
+		no_letterhead=cint(no_letterhead),
+		# not job_name: frappe.enqueue takes that argument for itself
+		print_id=job_id,
+		user=frappe.session.user,
+	)
+	return job_id
+
+
+def render_batch(
+	consignment_notes, manifest=None, letter_head=None, no_letterhead=0, print_id=None, user=None
+):
+	"""Background job: render every note into one PDF File and announce its URL"""
+	from pypdf import PdfReader, PdfWriter
+
+	renderer = BatchRenderer(letter_head=letter_head, no_letterhead=no_letterhead)
+	writer = PdfWriter()
+	total = len(consignment_notes)
+
+	for start in range(0, total, PRINT_CHUNK_SIZE):
+		chunk = consignment_notes[start : start + PRINT_CHUNK_SIZE]
+		pdf = get_pdf(renderer.render_chunk(chunk), options=renderer.pdf_options)
+		writer.append(PdfReader(BytesIO(pdf)))
+
+		done = min(start + PRINT_CHUNK_SIZE, total)
+		frappe.publish_progress(
+			done * 100 / total,
+			title="Printing Consignment Notes",
+			description=f"{done} of {total} rendered",
+		)
+
+	file_doc = _save_pdf(writer, manifest)
+	frappe.publish_realtime(
+		PRINT_EVENT, {"print_id": print_id, "file_url": file_doc.file_url, "count": total}, user=user
+	)
+	return file_doc.file_url
+
+
+class BatchRenderer:
+	"""Holds everything that is the same for every note of a batch"""
+
+	def __init__(self, letter_head=None, no_letterhead=0):
+		self.print_format = frappe.get_cached_doc("Print Format", PRINT_FORMAT)
+		jenv = frappe.get_jenv()
+		self.template = jenv.from_string(self.print_format.html or _read_template_file())
+		self.print_settings = frappe.get_cached_doc("Print Settings")
+		self.css = get_print_style(print_format=self.print_format)
+		self.letter_head = None if cint(no_letterhead) else _get_letter_head(letter_head)
+		self.letter_head_template = (
+			jenv.from_string(self.letter_head.content or "") if self.letter_head else None
+		)
+		self.pdf_options = {
+			"margin-top": f"{self.print_format.margin_top or 15}mm",
+			"margin-bottom": f"{self.print_format.margin_bottom or 15}mm",
+			"margin-left": f"{self.print_format.margin_left or 15}mm",
+			"margin-right": f"{self.print_format.margin_right or 15}mm",
+		}
+
+	def render_chunk(self, consignment_notes):
+		"""Render a chunk of notes into one HTML document, one page per note"""
+		docs = {
+			doc.name: doc
+			for doc in frappe.get_all(
+				"Consignment Note", filters={"name": ["in", consignment_notes]}, fields=["*"]
+			)
+		}
+		pages = [self.render(docs[name]) for name in consignment_notes if name in docs]
+		body = '<div style="page-break-after: always;"></div>'.join(pages)
+		return (
+			'<!DOCTYPE html><html><head><meta charset="utf-8">'
+			f"<style>{self.css}</style></head><body>{body}</body></html>"
+		)
+
+	def render(self, doc):
+		context = {
+			"doc": doc,
+			"print_settings": self.print_settings,
+			"letter_head": self.letter_head,
+			"_": frappe._,
+		}
+		letter_head = self.letter_head_template.render(context) if self.letter_head_template else ""
+		return letter_head + self.template.render(context)
+
+
+def _get_letter_head(letter_head=None):
+	filters = {"name": letter_head} if letter_head else {"is_default": 1, "disabled": 0}
+	return frappe.db.get_value("Letter Head", filters, ["name", "content"], as_dict=True)
+
+
+def _read_template_file():
+	path = frappe.get_app_path(
+		"snelex", "snelex", "print_format", "consignment_note_print", "consignment_note_print.html"
+	)
+	with open(path) as f:
+		return f.read()
+
+
+def _save_pdf(writer, manifest=None):
+	"""Write the merged PDF straight to private files and register it as a File"""
+	stamp = now_datetime().strftime("%Y%m%d-%H%M%S")
+	file_name = f"consignment-notes-{manifest or stamp}-{frappe.generate_hash(length=6)}.pdf"
+	path = frappe.get_site_path("private", "files", file_name)
+	with open(path, "wb") as f:
+		writer.write(f)
+
+	file_doc = frappe.get_doc(
+		{
+			"doctype": "File",
+			"file_name": file_name,
+			"file_url": f"/private/files/{file_name}",
+			"is_private": 1,
+			"file_size": os.path.getsize(path),
+			"attached_to_doctype": "Manifest" if manifest else None,
+			"attached_to_name": manifest,
+		}
+	)
+	file_doc.insert(ignore_permissions=True)
+	return file_doc
@@ -0,0 +1,82 @@
+# Copyright (c) 2025, Snelex and contributors
+# For license information, please see license.txt
+
+"""Benchmark helpers for snelex hot paths.
+
+Benchmarks run against a site through ``bench execute``, e.g.::
+
+	bench --site mysite execute snelex.benchmarks.job_card_snapshot.run
+"""
+
+import json
+import time
+from contextlib import contextmanager
+
+import frappe
+
+
+@contextmanager
+def count_queries():
+	"""Count SQL statements and the time spent in them while the block runs"""
+	counter = frappe._dict(count=0, seconds=0.0)
+	sql = frappe.db.sql
+
+	def counted_sql(*args, **kwargs):
+		start = time.perf_counter()
+		try:
+			return sql(*args, **kwargs)
+		finally:
+			counter.count += 1
+			counter.seconds += time.perf_counter() - start
+
+	frappe.db.sql = counted_sql
+	try:
+		yield counter
+	finally:
+		# drop the instance attribute so the class method shows through again
+		del frappe.db.sql
+
+
+def measure(fn, iterations=100, setup=None):
+	"""Run ``fn`` ``iterations`` times and return latency and query statistics"""
+	timings = []
+	queries = 0
+	sql_seconds = 0.0
+	for _ in range(iterations):
+		if setup:
+			setup()
+		with count_queries() as counter:
+			start = time.perf_counter()
+			fn()
+			timings.append(time.perf_counter() - start)
+		queries += counter.count
+		sql_seconds += counter.seconds
+
+	return summarize(timings, queries=queries, sql_seconds=sql_seconds)
+
+
+def summarize(timings, queries=0, sql_seconds=0.0):
+	timings = sorted(timings)
+	count = len(timings) or 1
+	return {
+		"iterations": len(timings),
+		"mean_ms": round(sum(timings) * 1000 / count, 3),
+		"p50_ms": round(percentile(timings, 50) * 1000, 3),
+		"p95_ms": round(percentile(timings, 95) * 1000, 3),
+		"max_ms": round((timings[-1] if timings else 0) * 1000, 3),
+		"queries_per_call": round(queries / count, 2),
+		"sql_ms_per_call": round(sql_seconds * 1000 / count, 3),
+	}
+
+
+def percentile(sorted_values, pct):
+	if not sorted_values:
+		return 0
+	index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+	return sorted_values[index]
+
+
+def report(results):
+	"""Print ``results`` as JSON and return them for ``bench execute``"""
+	print(json.dumps(results, indent=1, default=str))
+	return results
@@ -0,0 +1,61 @@
+# Copyright (c) 2025, Snelex and contributors
+# For license information, please see license.txt
+
+"""Job Card save: full Consignment Note loads vs. the projected snapshot.
+
+Both sides time and count ``job_card.save()`` on one Job Card, created for the
+run and rolled back afterwards. The "before" side swaps the snapshot lookup
+for the two full document loads JobCard.validate used to do::
+
+	bench --site mysite execute snelex.benchmarks.job_card_snapshot.run --kwargs "{'iterations': 500}"
+"""
+
+from unittest.mock import patch
+
+import frappe
+
+from snelex.benchmarks import measure, report
+from snelex.consignment import get_consignment_snapshot
+
+JOB_CARD_MODULE = "snelex.snelex.doctype.job_card.job_card"
+
+
+def run(consignment_note=None, iterations=200):
+	iterations = int(iterations)
+	consignment_note = consignment_note or frappe.db.get_value(
+		"Consignment Note", {"docstatus": 1}, "name", order_by="modified desc"
+	)
+	if not consignment_note:
+		frappe.throw("Submit at least one Consignment Note before running this benchmark")
+
+	job_card = frappe.get_doc({"doctype": "Job Card", "consignment_note": consignment_note}).insert(
+		ignore_permissions=True
+	)
+
+	def save():
+		job_card.save(ignore_permissions=True)
+
+	def reset_memo():
+		frappe.local.snelex_consignment_snapshots = {}
+
+	try:
+		# what JobCard.validate did: a full document load in each of its two checks
+		with patch(
+			f"{JOB_CARD_MODULE}.get_consignment_snapshot",
+			lambda name: frappe.get_doc("Consignment Note", name),
+		):
+			before = measure(save, iterations)
+
+		results = {
+			"consignment_note": consignment_note,
+			"before_save": before,
+			"after_save_cold": measure(save, iterations, setup=reset_memo),
+			"after_save_warm": measure(save, iterations),
+			"get_consignment_snapshot_cold": measure(
+				lambda: get_consignment_snapshot(consignment_note), iterations, setup=reset_memo
+			),
+		}
+	finally:
+		frappe.db.rollback()
+
+	return report(results)
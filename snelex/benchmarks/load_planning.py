@@ -0,0 +1,70 @@
+# Copyright (c) 2025, Snelex and contributors
+# For license information, please see license.txt
+
+"""Load planner on synthetic notes and trucks; needs no site data.
+
+bench --site mysite execute snelex.benchmarks.load_planning.run --kwargs "{'notes': [1000, 5000, 10000]}"
+"""
+
+import math
+import random
+import time
+
+from snelex.benchmarks import report
+from snelex.load_planning import LBS_PER_TON, plan_loads
+
+
+def run(notes=(1000, 5000, 10000), trucks=400, seed=42):
+	rng = random.Random(seed)
+	fleet = make_trucks(rng, trucks)
+	results = {"trucks": trucks, "seed": seed, "runs": []}
+	for count in notes:
+		consignments = make_notes(rng, count)
+		start = time.perf_counter()
+		plan = plan_loads(consignments, fleet)
+		elapsed = time.perf_counter() - start
+
+		results["runs"].append(
+			{
+				"notes": count,
+				"seconds": round(elapsed, 3),
+				"trucks_used": len(plan.loads),
+				"trucks_lower_bound": lower_bound(consignments, fleet),
+				"unassigned": len(plan.unassigned),
+				"mean_fill": round(sum(load.fill for load in plan.loads) / (len(plan.loads) or 1), 3),
+			}
+		)
+	return report(results)
+
+
+def make_trucks(rng, count):
+	"""A mixed fleet from 3 ton box trucks to 40 ton flat beds"""
+	sizes = [(3, 18), (7, 35), (12, 50), (20, 67), (40, 0)]
+	return [
+		{"name": f"TRUCK-{i:04d}", "max_weight": tons * LBS_PER_TON, "max_cbm": cbm}
+		for i, (tons, cbm) in enumerate(rng.choice(sizes) for _ in range(count))
+	]
+
+
+def make_notes(rng, count):
+	"""Mostly small parcels with a long tail of heavy or bulky pallets"""
+	return [
+		{
+			"name": f"CN-{i:06d}",
+			"weight": round(rng.lognormvariate(5, 1.1), 1),
+			"cbm": round(rng.lognormvariate(-0.5, 0.9), 2),
+		}
+		for i in range(count)
+	]
+
+
+def lower_bound(notes, trucks):
+	"""Fewest trucks whose summed weight capacity covers the total weight"""
+	total = sum(note["weight"] for note in notes)
+	used = 0
+	for capacity in sorted((truck["max_weight"] for truck in trucks), reverse=True):
+		if total <= 0:
+			break
+		total -= capacity
+		used += 1
+	return used if total <= 0 else math.inf
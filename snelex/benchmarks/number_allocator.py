@@ -0,0 +1,62 @@
+# Copyright (c) 2025, Snelex and contributors
+# For license information, please see license.txt
+
+"""Throughput of the per-location number allocator under concurrent workers.
+
+Starts ``threads`` threads, each with its own site connection, that draw
+``per_thread`` numbers from one throwaway series, then drops the series from
+Redis and ``tabSeries``. Set ``snelex_number_block_size`` in the site config
+to compare block sizes::
+
+	bench --site mysite execute snelex.benchmarks.number_allocator.run --kwargs "{'threads': 8}"
+"""
+
+import threading
+import time
+
+import frappe
+
+from snelex.benchmarks import report
+from snelex.numbering import SERIES_CACHE_KEY, next_number
+
+
+def run(threads=8, per_thread=250):
+	threads, per_thread = int(threads), int(per_thread)
+	site = frappe.local.site
+	series = f"BENCH-{frappe.generate_hash(length=8)}-"
+	allocated, errors = [], []
+
+	def worker():
+		frappe.init(site=site)
+		frappe.connect()
+		try:
+			numbers = [next_number(series) for _ in range(per_thread)]
+			frappe.db.commit()
+			allocated.extend(numbers)
+		except Exception as e:
+			errors.append(repr(e))
+		finally:
+			frappe.destroy()
+
+	workers = [threading.Thread(target=worker) for _ in range(threads)]
+	start = time.perf_counter()
+	for thread in workers:
+		thread.start()
+	for thread in workers:
+		thread.join()
+	elapsed = time.perf_counter() - start
+
+	frappe.cache.delete(frappe.cache.make_key(SERIES_CACHE_KEY.format(series)))
+	frappe.db.sql("delete from `tabSeries` where `name` = %s", series)
+	frappe.db.commit()
+
+	return report(
+		{
+			"threads": threads,
+			"allocations": len(allocated),
+			"duplicates": len(allocated) - len(set(allocated)),
+			"errors": errors,
+			"seconds": round(elapsed, 3),
+			"allocations_per_second": round(len(allocated) / elapsed) if elapsed else None,
+		}
+	)
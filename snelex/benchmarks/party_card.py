@@ -0,0 +1,68 @@
+# Copyright (c) 2025, Snelex and contributors
+# For license information, please see license.txt
+
+"""Consignee / shipper form triggers: full party details vs. the cached party card.
+
+bench --site mysite execute snelex.benchmarks.party_card.run --kwargs "{'customer': 'ACME', 'shipper': 'ACME'}"
+"""
+
+import re
+
+import frappe
+
+from snelex.benchmarks import measure, report
+from snelex.party import PARTY_CACHE_KEY, _cache_key, get_party_card
+
+
+def run(customer=None, shipper=None, iterations=200):
+	customer = customer or frappe.db.get_value("Customer", {}, "name", order_by="modified desc")
+	shipper = shipper or frappe.db.get_value("Shipper", {}, "name", order_by="modified desc")
+	if not customer or not shipper:
+		frappe.throw("Create at least one Customer and one Shipper before running this benchmark")
+
+	def customer_before():
+		# what get_customer_details did: ERPNext party details, regex and a Contact load
+		from erpnext.accounts.party import get_party_details
+
+		frappe.get_doc("Customer", customer)
+		details = get_party_details(party=customer, party_type="Customer")
+		re.sub(r"<br\s*/?>", "\n", details.get("address_display") or "")
+		if details.get("contact_person"):
+			frappe.get_doc("Contact", details.get("contact_person"))
+
+	def shipper_before():
+		# what get_shipper_details did: Shipper and Address loads, then a rendered address
+		shipper_doc = frappe.get_doc("Shipper", shipper)
+		if shipper_doc.address:
+			re.sub(r"<br\s*/?>", "\n", frappe.get_doc("Address", shipper_doc.address).get_display() or "")
+
+	def reset(link_doctype, link_name):
+		def setup():
+			frappe.local.snelex_party_memo = {}
+			frappe.cache.hdel(PARTY_CACHE_KEY, _cache_key(link_doctype, link_name))
+
+		return setup
+
+	def reset_memo():
+		frappe.local.snelex_party_memo = {}
+
+	return report(
+		{
+			"customer": customer,
+			"shipper": shipper,
+			"customer_before": measure(customer_before, iterations),
+			"customer_card_cold": measure(
+				lambda: get_party_card("Customer", customer), iterations, setup=reset("Customer", customer)
+			),
+			"customer_card_warm": measure(
+				lambda: get_party_card("Customer", customer), iterations, setup=reset_memo
+			),
+			"shipper_before": measure(shipper_before, iterations),
+			"shipper_card_cold": measure(
+				lambda: get_party_card("Shipper", shipper), iterations, setup=reset("Shipper", shipper)
+			),
+			"shipper_card_warm": measure(
+				lambda: get_party_card("Shipper", shipper), iterations, setup=reset_memo
+			),
+		}
+	)
@@ -0,0 +1,264 @@
+# Copyright (c) 2025, Snelex and contributors
+# For license information, please see license.txt
+
+"""Repeatable benchmark suite for the snelex doctype hot paths.
+
+Seeds a synthetic dataset (prefixed ``BENCH``, reused between runs), then
+measures latency, p95 and query count of each hot path. Writes made while
+measuring are rolled back, so runs stay comparable::
+
+	bench --site mysite execute snelex.benchmarks.suite.run \\
+		--kwargs "{'iterations': 200, 'output': '/tmp/bench.json'}"
+	bench --site mysite execute snelex.benchmarks.suite.compare \\
+		--kwargs "{'baseline': '/tmp/before.json', 'current': '/tmp/bench.json'}"
+"""
+
+import json
+import random
+
+import frappe
+from frappe.utils import add_days, now_datetime, today
+
+from snelex.benchmarks import measure, report
+
+PREFIX = "BENCH"
+DEFAULT_SIZES = {"locations": 10, "shippers": 50, "customers": 50, "notes": 2000}
+REGRESSION_THRESHOLD = 0.2
+
+
+def run(iterations=100, output=None, seed=42, **sizes):
+	"""Seed the dataset, run every benchmark and return (and optionally write) the JSON results"""
+	sizes = {key: int(sizes.get(key) or default) for key, default in DEFAULT_SIZES.items()}
+	iterations = int(iterations)
+	rng = random.Random(seed)
+
+	dataset = seed_dataset(**sizes)
+	frappe.db.commit()
+
+	results = {
+		"site": frappe.local.site,
+		"timestamp": str(now_datetime()),
+		"iterations": iterations,
+		"sizes": sizes,
+		"results": {},
+	}
+	try:
+		for name, benchmark in BENCHMARKS.items():
+			results["results"][name] = benchmark(dataset, iterations, rng)
+	finally:
+		# nothing measured is kept, the seeded dataset is
+		frappe.db.rollback()
+
+	if output:
+		with open(output, "w") as f:
+			json.dump(results, f, indent=1, default=str)
+
+	return report(results)
+
+
+def compare(baseline, current, threshold=REGRESSION_THRESHOLD):
+	"""Compare two result files and report benchmarks whose p95 or query count grew"""
+	with open(baseline) as f:
+		old = json.load(f)["results"]
+	with open(current) as f:
+		new = json.load(f)["results"]
+
+	threshold = float(threshold)
+	regressions = {}
+	for name, stats in new.items():
+		before = old.get(name)
+		if not before:
+			continue
+		for metric in ("p95_ms", "queries_per_call"):
+			if before[metric] and stats[metric] > before[metric] * (1 + threshold):
+				regressions.setdefault(name, {})[metric] = {"before": before[metric], "after": stats[metric]}
+
+	return report({"threshold": threshold, "regressions": regressions})
+
+
+def seed_dataset(locations, shippers, customers, notes):
+	"""Create whatever part of the synthetic dataset is missing and return its names"""
+	country = frappe.db.get_default("country") or frappe.db.get_value("Country", {}, "name")
+	dataset = frappe._dict(
+		locations=_seed_locations(locations),
+		shippers=_seed_shippers(shippers, country),
+		customers=_seed_customers(customers),
+	)
+	dataset.notes = _seed_notes(notes, dataset)
+	return dataset
+
+
+def bench_consignment_note_insert(dataset, iterations, rng):
+	return measure(lambda: new_consignment_note(dataset, rng).insert(), iterations)
+
+
+def bench_consignment_note_submit(dataset, iterations, rng):
+	pending = []
+
+	def setup():
+		pending.append(new_consignment_note(dataset, rng).insert())
+
+	return measure(lambda: pending.pop().submit(), iterations, setup=setup)
+
+
+def bench_job_card_create(dataset, iterations, rng):
+	pending = []
+
+	def setup():
+		note = new_consignment_note(dataset, rng).insert()
+		note.submit()
+		pending.append(note.name)
+
+	def create():
+		frappe.get_doc(
+			{
+				"doctype": "Job Card",
+				"consignment_note": pending.pop(),
+				"job_date": today(),
+				"job_status": "Open",
+				"advance_status": "Open",
+			}
+		).insert()
+
+	return measure(create, iterations, setup=setup)
+
+
+def bench_get_consignment_details(dataset, iterations, rng):
+	from snelex.snelex.doctype.manifest.manifest import get_consignment_details
+
+	days = [add_days(today(), -offset) for offset in range(30)]
+	return measure(
+		lambda: get_consignment_details(rng.choice(days), rng.choice(dataset.locations)), iterations
+	)
+
+
+def bench_get_shipper_details(dataset, iterations, rng):
+	from snelex.snelex.doctype.consignment_note.consignment_note import get_shipper_details
+
+	return measure(lambda: get_shipper_details(rng.choice(dataset.shippers)), iterations, setup=_reset_memos)
+
+
+def bench_get_customer_details(dataset, iterations, rng):
+	from snelex.snelex.doctype.consignment_note.consignment_note import get_customer_details
+
+	return measure(
+		lambda: get_customer_details(rng.choice(dataset.customers)), iterations, setup=_reset_memos
+	)
+
+
+def bench_shipper_save(dataset, iterations, rng):
+	return measure(lambda: frappe.get_doc("Shipper", rng.choice(dataset.shippers)).save(), iterations)
+
+
+BENCHMARKS = {
+	"consignment_note_insert": bench_consignment_note_insert,
+	"consignment_note_submit": bench_consignment_note_submit,
+	"job_card_create": bench_job_card_create,
+	"get_consignment_details": bench_get_consignment_details,
+	"get_shipper_details": bench_get_shipper_details,
+	"get_customer_details": bench_get_customer_details,
+	"shipper_save": bench_shipper_save,
+}
+
+
+def new_consignment_note(dataset, rng, consignment_date=None):
+	origin, destination = rng.sample(dataset.locations, 2)
+	return frappe.get_doc(
+		{
+			"doctype": "Consignment Note",
+			"consignment_date": consignment_date or today(),
+			"tracking_no": f"{PREFIX}-{frappe.generate_hash(length=10)}",
+			"consignment_from": origin,
+			"consignment_to": destination,
+			"payment_by": rng.choice(["Shipper", "Receiver"]),
+			"shipper": rng.choice(dataset.shippers),
+			"consignee_customer": rng.choice(dataset.customers),
+			"product": "General Cargo",
+			"number_of_cartons": rng.randint(1, 20),
+			"number_of_pieces": rng.randint(0, 50),
+			"total_weight_lbs": rng.randint(10, 5000),
+			"total_cbm": rng.randint(1, 30),
+		}
+	)
+
+
+def _reset_memos():
+	frappe.local.snelex_party_memo = {}
+
+
+def _seed_locations(count):
+	names = []
+	for i in range(count):
+		name = f"{PREFIX} Location {i:03d}"
+		if not frappe.db.exists("Location", name):
+			frappe.get_doc(
+				{
+					"doctype": "Location",
+					"location_name": name,
+					"custom_location_code": f"B{i:03d}",
+				}
+			).insert(ignore_permissions=True)
+		names.append(name)
+	return names
+
+
+def _seed_shippers(count, country):
+	names = []
+	for i in range(count):
+		name = f"{PREFIX} Shipper {i:04d}"
+		if not frappe.db.exists("Shipper", name):
+			address = frappe.get_doc(
+				{
+					"doctype": "Address",
+					"address_title": name,
+					"address_type": "Office",
+					"address_line1": f"{i} Bench Street",
+					"city": "Bench City",
+					"country": country,
+					"phone": f"+1000{i:06d}",
+					"email_id": f"shipper{i}@bench.invalid",
+					"links": [{"link_doctype": "Shipper", "link_name": name}],
+				}
+			).insert(ignore_permissions=True, ignore_links=True)
+			frappe.get_doc({"doctype": "Shipper", "shipper": name, "address": address.name}).insert(
+				ignore_permissions=True
+			)
+		names.append(name)
+	return names
+
+
+def _seed_customers(count):
+	names = []
+	for i in range(count):
+		customer_name = f"{PREFIX} Customer {i:04d}"
+		name = frappe.db.get_value("Customer", {"customer_name": customer_name})
+		if not name:
+			name = (
+				frappe.get_doc(
+					{
+						"doctype": "Customer",
+						"customer_name": customer_name,
+						"customer_type": "Company",
+						"customer_group": frappe.db.get_value("Customer Group", {"is_group": 0}),
+						"territory": frappe.db.get_value("Territory", {"is_group": 0}),
+					}
+				)
+				.insert(ignore_permissions=True)
+				.name
+			)
+		names.append(name)
+	return names
+
+
+def _seed_notes(count, dataset):
+	existing = frappe.db.count("Consignment Note", {"tracking_no": ["like", f"{PREFIX}-%"]})
+	rng = random.Random(existing)
+	for i in range(existing, count):
+		note = new_consignment_note(dataset, rng, consignment_date=add_days(today(), -(i % 30)))
+		note.insert(ignore_permissions=True)
+		note.submit()
+		if i % 200 == 0:
+			frappe.db.commit()
+	return frappe.get_all(
+		"Consignment Note", filters={"tracking_no": ["like", f"{PREFIX}-%"]}, pluck="name", limit=count
+	)
@@ -0,0 +1,101 @@
+# Copyright (c) 2025, Snelex and contributors
+# For license information, please see license.txt
+
+"""Daily truck expiry scan over a synthetic fleet.
+
+Seeds ``trucks`` Truck rows (prefixed ``BENCH-TRUCK``) inside the open
+transaction, times the indexed scan and the calendar build, then rolls the
+rows back and rescans so the live calendar is restored::
+
+	bench --site mysite execute snelex.benchmarks.truck_expiry.run --kwargs "{'trucks': 10000}"
+"""
+
+import random
+import time
+
+import frappe
+from frappe.utils import add_days, now_datetime, today
+
+from snelex.benchmarks import measure, report
+from snelex.truck_expiry import (
+	EXPIRY_HORIZON_DAYS,
+	build_expiry_calendar,
+	get_expiring_trucks,
+	scan_truck_expiry,
+)
+
+PREFIX = "BENCH-TRUCK"
+TARGET_SECONDS = 1.0
+
+
+def run(trucks=10000, iterations=5, seed=42):
+	trucks, iterations = int(trucks), int(iterations)
+	seed_trucks(random.Random(seed), trucks)
+	try:
+		scan = measure(lambda: scan_truck_expiry(notify=False), iterations)
+
+		rows = get_expiring_trucks(add_days(today(), EXPIRY_HORIZON_DAYS))
+		start = time.perf_counter()
+		calendar = build_expiry_calendar(rows)
+		build_ms = (time.perf_counter() - start) * 1000
+	finally:
+		frappe.db.rollback()
+		scan_truck_expiry(notify=False)
+
+	return report(
+		{
+			"trucks": trucks,
+			"expiring": len(calendar),
+			"scan": scan,
+			"calendar_build_ms": round(build_ms, 3),
+			"under_target": scan["max_ms"] < TARGET_SECONDS * 1000,
+		}
+	)
+
+
+def seed_trucks(rng, count):
+	"""Insert ``count`` trucks with expiry dates spread from two months ago to two years ahead"""
+	now = now_datetime()
+	values = []
+	for i in range(count):
+		values.append(
+			(
+				f"{PREFIX}-{i:05d}",
+				now,
+				now,
+				"Administrator",
+				"Administrator",
+				0,
+				f"{PREFIX}-{i:05d}",
+				f"REG-{i:05d}",
+				"Synthetic",
+				"Diesel",
+				rng.choice((5, 10, 20, 30)),
+				"Available",
+				rng.choice(("Flat Bed", "Low Bed", "40 Feet Box truck", "3 ton truck")),
+				add_days(today(), rng.randint(-60, 730)),
+				add_days(today(), rng.randint(-60, 730)),
+			)
+		)
+
+	frappe.db.bulk_insert(
+		"Truck",
+		fields=[
+			"name",
+			"creation",
+			"modified",
+			"modified_by",
+			"owner",
+			"docstatus",
+			"truck_number",
+			"registration_number",
+			"model",
+			"fuel_type",
+			"capacityton",
+			"status",
+			"truck_type",
+			"insurance_expiry_date",
+			"permit_expiry_date",
+		],
+		values=values,
+	)
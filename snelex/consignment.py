@@ -0,0 +1,132 @@
+# Copyright (c) 2025, Snelex and contributors
+# For license information, please see license.txt
+
+"""Consignment Note data shared with Job Cards.
+
+``JOB_CARD_FIELD_MAP`` declares which note fields a Job Card copies.
+``get_consignment_snapshots`` reads just those fields for any number of notes
+in one query and memoizes the rows for the rest of the request, and
+``sync_job_cards`` pushes later changes of those fields to existing Job Cards
+with a single bulk ``UPDATE``.
+"""
+
+import frappe
+
+from snelex.profiling import count_cache, profiled
+
+# Consignment Note field -> Job Card fields it is copied to
+JOB_CARD_FIELD_MAP = {
+	"consignment_from": ("consignment_from",),
+	"consignment_to": ("consignment_to",),
+	"payment_by": ("payment_by",),
+	"tracking_no": ("tracking_no",),
+	"shipper_display_name": ("shipper_name", "shipper_contact"),
+	"shipper_phone": ("shipper_phone",),
+	"shipper_email": ("shipper_email",),
+	"consignee_display_name": ("consignee_name", "consignee_contact"),
+	"consignee_phone": ("consignee_phone",),
+	"consignee_email": ("consignee_email",),
+	"total_no_of_pieces": ("total_pieces",),
+	"total_weight_lbs": ("total_weight",),
+	"number_of_cartons": ("number_of_cartons",),
+	"number_of_bundles": ("number_of_bundles",),
+	"description": ("job_description",),
+}
+
+# Job Card fields that keep their own value when the note's value is empty
+KEEP_WHEN_EMPTY = {"job_description"}
+
+# fields read by Job Card validation, its client-side fetch and bulk creation
+CONSIGNMENT_SNAPSHOT_FIELDS = ["name", "docstatus", "consignment_date", "modified", *JOB_CARD_FIELD_MAP]
+
+
+def get_consignment_snapshot(consignment_note):
+	"""Return the projected row of a single Consignment Note, or ``None``"""
+	if not consignment_note:
+		return None
+	return get_consignment_snapshots([consignment_note]).get(consignment_note)
+
+
+def get_consignment_snapshots(consignment_notes):
+	"""Return ``{name: row}`` for the given notes, loading the ones not seen yet in one query"""
+	memo = _get_request_memo()
+	missing = list({name for name in consignment_notes if name and name not in memo})
+	count_cache(hits=len({name for name in consignment_notes if name}) - len(missing), misses=len(missing))
+	if missing:
+		rows = {
+			row.name: row
+			for row in frappe.get_all(
+				"Consignment Note", filters={"name": ["in", missing]}, fields=get_snapshot_fields()
+			)
+		}
+		for name in missing:
+			row = rows.get(name)
+			if row is not None:
+				# fields the doctype lacks read as None, the same as on a loaded document
+				row.setdefault("description", None)
+			memo[name] = row
+
+	return {name: memo.get(name) for name in consignment_notes if name}
+
+
+def get_snapshot_fields():
+	meta = frappe.get_meta("Consignment Note")
+	return [
+		f for f in CONSIGNMENT_SNAPSHOT_FIELDS if f in ("name", "docstatus", "modified") or meta.has_field(f)
+	]
+
+
+def get_job_card_values(consignment_note, fields=None):
+	"""Map a note (document or snapshot) onto Job Card field values.
+
+	``fields`` limits the mapping to the given Consignment Note fields.
+	"""
+	values = {}
+	for source, targets in JOB_CARD_FIELD_MAP.items():
+		if fields is not None and source not in fields:
+			continue
+		value = consignment_note.get(source)
+		for target in targets:
+			if target in KEEP_WHEN_EMPTY and not value:
+				continue
+			values[target] = value
+	return values
+
+
+@profiled
+def sync_job_cards(doc, method=None):
+	"""doc_events handler: push changed Consignment Note fields to its Job Cards.
+
+	Runs on update after submit and on submit of an amendment. Only mapped
+	fields whose value changed are written, with one ``UPDATE`` per note.
+	"""
+	mapped = [f for f in get_snapshot_fields() if f in JOB_CARD_FIELD_MAP]
+	if method == "on_submit":
+		if not doc.amended_from:
+			return
+		previous = frappe.db.get_value("Consignment Note", doc.amended_from, mapped, as_dict=True)
+		job_card_filters = {"consignment_note": doc.amended_from}
+	else:
+		previous = doc.get_doc_before_save()
+		job_card_filters = {"consignment_note": doc.name}
+
+	changed = [field for field in mapped if not previous or previous.get(field) != doc.get(field)]
+	values = get_job_card_values(doc, changed)
+	if method == "on_submit":
+		# Job Cards follow the note into its amendment
+		values["consignment_note"] = doc.name
+
+	if values:
+		frappe.db.set_value("Job Card", job_card_filters, values)
+
+
+@profiled
+def clear_consignment_snapshot(doc, method=None):
+	"""doc_events handler: forget a note's snapshot once it changes within the request"""
+	_get_request_memo().pop(doc.name, None)
+
+
+def _get_request_memo():
+	if not hasattr(frappe.local, "snelex_consignment_snapshots"):
+		frappe.local.snelex_consignment_snapshots = {}
+	return frappe.local.snelex_consignment_snapshots
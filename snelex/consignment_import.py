@@ -0,0 +1,265 @@
+# Copyright (c) 2025, Snelex and contributors
+# For license information, please see license.txt
+
+"""Bulk import (and optional submit) of Consignment Notes from CSV / XLSX.
+
+The file is streamed in chunks. Only editable fields can be imported. For
+every chunk the targets of all Link fields are resolved with one set-based
+query per linked doctype, rows are checked against those sets and then
+inserted with link validation switched off. Each row runs inside a
+savepoint so a bad row is reported without losing the rest of the chunk,
+and every chunk is committed on its own.
+"""
+
+import csv
+import os
+
+import frappe
+from frappe.model import default_fields, no_value_fields
+from frappe.utils import cint, flt, get_datetime, getdate
+
+from snelex.party import get_parties
+from snelex.profiling import profiled
+
+DOCTYPE = "Consignment Note"
+DEFAULT_CHUNK_SIZE = 500
+PROGRESS_EVENT = "snelex_consignment_import"
+STATUS_CACHE_KEY = "snelex:consignment_import:{0}"
+
+# CSV cells arrive as text, cast them like the form would before validate runs
+CASTS = {
+	"Int": cint,
+	"Check": cint,
+	"Float": flt,
+	"Currency": flt,
+	"Percent": flt,
+	"Date": getdate,
+	"Datetime": get_datetime,
+}
+
+
+@frappe.whitelist()
+@profiled
+def import_consignment_notes(file_url, submit=0, chunk_size=DEFAULT_CHUNK_SIZE):
+	"""Queue a bulk import of Consignment Notes from an uploaded CSV / XLSX file"""
+	frappe.has_permission(DOCTYPE, "create", throw=True)
+	if cint(submit):
+		frappe.has_permission(DOCTYPE, "submit", throw=True)
+
+	file_doc = frappe.get_doc("File", {"file_url": file_url})
+	if not file_doc.is_downloadable():
+		frappe.throw("You do not have access to this file", frappe.PermissionError)
+	extension = os.path.splitext(file_doc.file_name or file_url)[1].lower()
+	if extension not in (".csv", ".xlsx"):
+		frappe.throw("Only CSV and XLSX files can be imported")
+
+	job_id = f"consignment_import::{file_doc.name}"
+	frappe.enqueue(
+		"snelex.consignment_import.run_import",
+		queue="long",
+		timeout=6000,
+		job_id=job_id,
+		deduplicate=True,
+		now=frappe.flags.in_test,
+		file_path=file_doc.get_full_path(),
+		submit=cint(submit),
+		chunk_size=cint(chunk_size) or DEFAULT_CHUNK_SIZE,
+		# not job_name: frappe.enqueue takes that argument for itself
+		import_id=job_id,
+		user=frappe.session.user,
+	)
+	return job_id
+
+
+@frappe.whitelist()
+@profiled
+def get_import_status(import_id):
+	"""Return the summary of a running or finished import"""
+	frappe.has_permission(DOCTYPE, "create", throw=True)
+	return frappe.cache.get_value(STATUS_CACHE_KEY.format(import_id))
+
+
+def run_import(file_path, submit=0, chunk_size=DEFAULT_CHUNK_SIZE, import_id=None, user=None):
+	"""Background job: stream ``file_path`` and import it chunk by chunk"""
+	summary = frappe._dict(import_id=import_id, processed=0, created=0, submitted=0, errors=[])
+	header_map = get_header_map()
+
+	for chunk in iter_chunks(read_rows(file_path), chunk_size):
+		rows = [normalize_row(row, header_map) for row in chunk]
+		for result in import_rows(rows, submit=submit, start=summary.processed + 1):
+			if result.error:
+				summary.errors.append(result)
+			else:
+				summary.created += 1
+				if result.docstatus == 1:
+					summary.submitted += 1
+
+		summary.processed += len(rows)
+		frappe.db.commit()
+		_publish_progress(summary, user)
+
+	summary.finished = 1
+	_publish_progress(summary, user)
+	return summary
+
+
+def import_rows(rows, submit=0, start=1):
+	"""Insert (and optionally submit) already-normalized rows, one savepoint per row.
+
+	Returns one result per row with ``row``, ``name``, ``docstatus`` and ``error``.
+	The caller owns the transaction and is expected to commit after each chunk.
+	"""
+	link_fields = get_link_fields()
+	known = resolve_links(rows, link_fields)
+	results = []
+
+	for idx, row in enumerate(rows, start=start):
+		result = frappe._dict(row=idx, name=None, docstatus=0, error=None)
+		results.append(result)
+
+		error = check_links(row, known, link_fields)
+		if error:
+			result.error = error
+			continue
+
+		savepoint = f"consignment_import_{idx}"
+		frappe.db.savepoint(savepoint)
+		try:
+			doc = frappe.get_doc({"doctype": DOCTYPE, **row})
+			# every Link field was checked in bulk by resolve_links / check_links
+			doc.flags.ignore_links = True
+			doc.insert()
+			if cint(submit):
+				doc.submit()
+		except Exception as e:
+			frappe.db.rollback(save_point=savepoint)
+			frappe.clear_messages()
+			result.error = str(e) or e.__class__.__name__
+		else:
+			result.name = doc.name
+			result.docstatus = doc.docstatus
+
+	return results
+
+
+def get_link_fields():
+	"""Importable Link fields keyed by target doctype"""
+	meta = frappe.get_meta(DOCTYPE)
+	link_fields = {}
+	for df in meta.get_link_fields():
+		if is_importable(df):
+			link_fields.setdefault(df.options, []).append(df.fieldname)
+	return link_fields
+
+
+def resolve_links(rows, link_fields):
+	"""Fetch every linked document used in ``rows`` with one set-based query per doctype"""
+	wanted = {doctype: set() for doctype in link_fields}
+	for row in rows:
+		for doctype, fields in link_fields.items():
+			wanted[doctype].update(row.get(field) for field in fields if row.get(field))
+
+	known = {}
+	for doctype, names in wanted.items():
+		known[doctype] = set(
+			frappe.get_all(doctype, filters={"name": ["in", list(names)]}, pluck="name") if names else []
+		)
+
+	# warm the party cache so ConsignmentNote.validate resolves without queries
+	shippers, customers = known.get("Shipper", set()), known.get("Customer", set())
+	get_parties(
+		[("Shipper", name) for name in shippers] + [("Customer", name) for name in customers | shippers]
+	)
+	return known
+
+
+def check_links(row, known, link_fields):
+	"""Return an error message for the first link in ``row`` that does not exist"""
+	for doctype, fields in link_fields.items():
+		for field in fields:
+			if row.get(field) and row[field] not in known[doctype]:
+				return f"{doctype} {row[field]} not found ({field})"
+
+
+def is_importable(df):
+	"""Editable value fields only: no read-only, no_copy or standard fields"""
+	return not (
+		df.fieldtype in no_value_fields or df.read_only or df.no_copy or df.fieldname in default_fields
+	)
+
+
+def get_header_map():
+	"""Map column headers (field labels or fieldnames, case-insensitive) of importable fields to fieldnames"""
+	header_map = {}
+	for df in frappe.get_meta(DOCTYPE).fields:
+		if not is_importable(df):
+			continue
+		header_map[df.fieldname.lower()] = df.fieldname
+		if df.label:
+			header_map.setdefault(df.label.strip().lower(), df.fieldname)
+	return header_map
+
+
+def normalize_row(row, header_map):
+	"""Translate a raw ``{header: value}`` row into ``{fieldname: value}`` cast by field type, dropping blanks"""
+	meta = frappe.get_meta(DOCTYPE)
+	out = {}
+	for header, value in row.items():
+		fieldname = header_map.get((header or "").strip().lower())
+		if isinstance(value, str):
+			value = value.strip()
+		if fieldname and value not in (None, ""):
+			cast = CASTS.get(meta.get_field(fieldname).fieldtype)
+			out[fieldname] = cast(value) if cast else value
+	return out
+
+
+def read_rows(file_path):
+	"""Yield one dict per data row of a CSV or XLSX file without loading it whole"""
+	if file_path.lower().endswith(".xlsx"):
+		yield from _read_xlsx(file_path)
+	else:
+		with open(file_path, encoding="utf-8-sig", newline="") as f:
+			yield from csv.DictReader(f)
+
+
+def iter_chunks(iterable, size):
+	"""Yield lists of at most ``size`` items from ``iterable``"""
+	chunk = []
+	for item in iterable:
+		chunk.append(item)
+		if len(chunk) >= size:
+			yield chunk
+			chunk = []
+	if chunk:
+		yield chunk
+
+
+def _read_xlsx(file_path):
+	from openpyxl import load_workbook
+
+	workbook = load_workbook(file_path, read_only=True, data_only=True)
+	try:
+		rows = workbook.active.iter_rows(values_only=True)
+		headers = [str(h) if h is not None else "" for h in next(rows, [])]
+		for values in rows:
+			if any(v not in (None, "") for v in values):
+				yield dict(zip(headers, values, strict=False))
+	finally:
+		workbook.close()
+
+
+def _publish_progress(summary, user):
+	frappe.cache.set_value(STATUS_CACHE_KEY.format(summary.import_id), summary, expires_in_sec=86400)
+	frappe.publish_realtime(
+		PROGRESS_EVENT,
+		{
+			"import_id": summary.import_id,
+			"processed": summary.processed,
+			"created": summary.created,
+			"submitted": summary.submitted,
+			"failed": len(summary.errors),
+			"finished": summary.get("finished", 0),
+		},
+		user=user,
+	)
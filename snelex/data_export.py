@@ -0,0 +1,283 @@
+# Copyright (c) 2025, Snelex and contributors
+# For license information, please see license.txt
+
+"""Streaming export of Consignment Notes, Job Cards and Manifests.
+
+``export_documents`` queues ``run_export``, which reads the matching documents
+in keyset-paginated chunks on ``name`` and writes each chunk straight into a
+private file as CSV, XLSX or NDJSON. Only one chunk is held in memory at a
+time, so a month of notes exports as cheaply as a day. Manifests carry their
+``Consignment List`` rows: one line per row in CSV / XLSX (parent columns
+repeated) and a nested list in NDJSON. The finished file is attached as a
+``File`` and announced over realtime like the bulk import.
+"""
+
+import csv
+import json
+
+import frappe
+from frappe.model import no_value_fields, table_fields
+from frappe.utils import cint, now_datetime
+
+from snelex.profiling import profiled
+
+DEFAULT_CHUNK_SIZE = 1000
+FORMATS = ("CSV", "XLSX", "NDJSON")
+PROGRESS_EVENT = "snelex_data_export"
+STATUS_CACHE_KEY = "snelex:data_export:{0}"
+
+# exportable doctype -> (table field, child doctype) exported with it, if any
+EXPORT_DOCTYPES = {
+	"Consignment Note": None,
+	"Job Card": None,
+	"Manifest": ("consignment_details", "Consignment List"),
+}
+
+
+@frappe.whitelist()
+@profiled
+def export_documents(doctype, filters=None, fields=None, file_format="CSV", chunk_size=DEFAULT_CHUNK_SIZE):
+	"""Queue a streaming export of ``doctype`` and return its export id"""
+	if doctype not in EXPORT_DOCTYPES:
+		frappe.throw(f"{doctype} cannot be exported here")
+	frappe.has_permission(doctype, "export", throw=True)
+
+	file_format = (file_format or "CSV").upper()
+	if file_format not in FORMATS:
+		frappe.throw("Export format must be CSV, XLSX or NDJSON")
+
+	job_id = f"data_export::{frappe.session.user}::{frappe.generate_hash(length=10)}"
+	frappe.enqueue(
+		"snelex.data_export.run_export",
+		queue="long",
+		timeout=6000,
+		job_id=job_id,
+		now=frappe.flags.in_test,
+		doctype=doctype,
+		filters=frappe.parse_json(filters) or [],
+		fields=frappe.parse_json(fields),
+		file_format=file_format,
+		chunk_size=cint(chunk_size) or DEFAULT_CHUNK_SIZE,
+		# not job_name: frappe.enqueue takes that argument for itself
+		export_id=job_id,
+		user=frappe.session.user,
+	)
+	return job_id
+
+
+@frappe.whitelist()
+@profiled
+def get_export_status(export_id):
+	"""Return the summary of a running or finished export"""
+	summary = frappe.cache.get_value(STATUS_CACHE_KEY.format(export_id))
+	if summary and summary.user != frappe.session.user:
+		frappe.throw("Not permitted", frappe.PermissionError)
+	return summary
+
+
+def run_export(
+	doctype,
+	filters=None,
+	fields=None,
+	file_format="CSV",
+	chunk_size=DEFAULT_CHUNK_SIZE,
+	export_id=None,
+	user=None,
+):
+	"""Background job: stream the documents of ``doctype`` into a private File"""
+	filters = normalize_filters(doctype, filters)
+	fields = get_export_fields(doctype, fields)
+	child = EXPORT_DOCTYPES[doctype]
+	child_fields = get_export_fields(child[1]) if child else []
+
+	summary = frappe._dict(
+		export_id=export_id, user=user, doctype=doctype, exported=0, total=frappe.db.count(doctype, filters)
+	)
+	file_name = (
+		f"{frappe.scrub(doctype)}_{now_datetime():%Y%m%d_%H%M%S}_{frappe.generate_hash(length=6)}"
+		f".{file_format.lower()}"
+	)
+	path = frappe.get_site_path("private", "files", file_name)
+
+	writer = WRITERS[file_format](path, fields, child and (child[0], child_fields))
+	try:
+		for chunk in iter_documents(doctype, filters, fields, child_fields, chunk_size):
+			writer.write(chunk)
+			summary.exported += len(chunk)
+			_publish_progress(summary)
+	finally:
+		writer.close()
+
+	file_doc = frappe.get_doc(
+		{
+			"doctype": "File",
+			"file_name": file_name,
+			"file_url": f"/private/files/{file_name}",
+			"is_private": 1,
+		}
+	).insert(ignore_permissions=True)
+	frappe.db.commit()
+
+	summary.update(finished=1, file_url=file_doc.file_url)
+	_publish_progress(summary)
+	return summary
+
+
+def get_export_fields(doctype, fields=None):
+	"""Value fields of ``doctype`` in form order, limited to ``fields`` when given"""
+	meta = frappe.get_meta(doctype)
+	allowed = [
+		df.fieldname
+		for df in meta.fields
+		if df.fieldtype not in no_value_fields and df.fieldtype not in table_fields
+	]
+	if fields:
+		allowed = [field for field in fields if field in allowed]
+	return ["name", *allowed]
+
+
+def normalize_filters(doctype, filters=None):
+	"""Return ``filters`` as a list of ``[doctype, field, operator, value]`` conditions.
+
+	The list view sends a list of conditions, API callers often a dict.
+	"""
+	filters = frappe.parse_json(filters) or []
+	if isinstance(filters, dict):
+		return [
+			[doctype, field, *value] if isinstance(value, list | tuple) else [doctype, field, "=", value]
+			for field, value in filters.items()
+		]
+	return [list(condition) for condition in filters]
+
+
+def iter_documents(doctype, filters, fields, child_fields=(), chunk_size=DEFAULT_CHUNK_SIZE):
+	"""Yield lists of at most ``chunk_size`` documents, keyset-paginated on ``name``"""
+	child = EXPORT_DOCTYPES.get(doctype)
+	filters = normalize_filters(doctype, filters)
+	last = None
+	while True:
+		page_filters = list(filters)
+		if last is not None:
+			# an extra condition, so a caller's own filter on name still applies
+			page_filters.append([doctype, "name", ">", last])
+		# get_list, so the export never shows more than the list view would
+		rows = frappe.get_list(
+			doctype, filters=page_filters, fields=fields, order_by="name asc", limit=chunk_size
+		)
+		if not rows:
+			break
+
+		if child:
+			table_field, child_doctype = child
+			by_parent = {}
+			for row in frappe.get_all(
+				child_doctype,
+				filters={
+					"parenttype": doctype,
+					"parentfield": table_field,
+					"parent": ["in", [row.name for row in rows]],
+				},
+				fields=["parent", *(field for field in child_fields if field != "name")],
+				order_by="parent asc, idx asc",
+			):
+				by_parent.setdefault(row.pop("parent"), []).append(row)
+			for row in rows:
+				row[table_field] = by_parent.get(row.name, [])
+
+		yield rows
+		if len(rows) < chunk_size:
+			break
+		last = rows[-1].name
+
+
+class CSVWriter:
+	"""One line per document, or per child row with the parent columns repeated"""
+
+	def __init__(self, path, fields, child=None):
+		self.fields = fields
+		self.child = child
+		self.file = open(path, "w", encoding="utf-8", newline="")
+		self.writer = csv.writer(self.file)
+		self.writerow(self.header())
+
+	def header(self):
+		if not self.child:
+			return self.fields
+		table_field, child_fields = self.child
+		return [*self.fields, *(f"{table_field}.{field}" for field in child_fields if field != "name")]
+
+	def lines(self, rows):
+		for row in rows:
+			values = [row.get(field) for field in self.fields]
+			if not self.child:
+				yield values
+				continue
+
+			table_field, child_fields = self.child
+			children = row.get(table_field) or [{}]
+			for child in children:
+				yield [*values, *(child.get(field) for field in child_fields if field != "name")]
+
+	def writerow(self, values):
+		self.writer.writerow(["" if value is None else value for value in values])
+
+	def write(self, rows):
+		for values in self.lines(rows):
+			self.writerow(values)
+
+	def close(self):
+		self.file.close()
+
+
+class XLSXWriter(CSVWriter):
+	"""Same layout as CSV, through openpyxl's write-only workbook"""
+
+	def __init__(self, path, fields, child=None):
+		from openpyxl import Workbook
+
+		self.path = path
+		self.fields = fields
+		self.child = child
+		self.workbook = Workbook(write_only=True)
+		self.sheet = self.workbook.create_sheet()
+		self.writerow(self.header())
+
+	def writerow(self, values):
+		self.sheet.append(values)
+
+	def close(self):
+		self.workbook.save(self.path)
+
+
+class NDJSONWriter:
+	"""One JSON object per line, child rows nested under their table field"""
+
+	def __init__(self, path, fields, child=None):
+		self.file = open(path, "w", encoding="utf-8")
+
+	def write(self, rows):
+		for row in rows:
+			self.file.write(json.dumps(row, default=str, ensure_ascii=False))
+			self.file.write("\n")
+
+	def close(self):
+		self.file.close()
+
+
+WRITERS = {"CSV": CSVWriter, "XLSX": XLSXWriter, "NDJSON": NDJSONWriter}
+
+
+def _publish_progress(summary):
+	frappe.cache.set_value(STATUS_CACHE_KEY.format(summary.export_id), summary, expires_in_sec=86400)
+	frappe.publish_realtime(
+		PROGRESS_EVENT,
+		{
+			"export_id": summary.export_id,
+			"doctype": summary.doctype,
+			"exported": summary.exported,
+			"total": summary.total,
+			"finished": summary.get("finished", 0),
+			"file_url": summary.get("file_url"),
+		},
+		user=summary.user,
+	)
@@ -0,0 +1,239 @@
+# Copyright (c) 2025, Snelex and contributors
+# For license information, please see license.txt
+
+"""Fleet availability: Truck status follows Manifests, free trucks are indexed in Redis.
+
+Saving an Open Manifest puts its truck ``In Transit``. Closing, deleting or
+re-trucking the Manifest releases the truck: it becomes ``Available`` again
+at the Manifest location, unless another Open Manifest still holds it.
+Manifest validation refuses a truck that is already on the road or out of
+service.
+
+Every Available truck with a capacity sits in one Redis sorted set per
+(truck type, current location), scored by capacity in lbs. ``assign_truck``
+answers with one ``ZRANGEBYSCORE ... LIMIT`` per candidate set: the smallest
+truck that still carries the weight, without scanning the Truck table. Trucks
+at the preferred location are tried first, then every other location. Truck
+``doc_events`` keep the sets current, and the whole index is rebuilt lazily
+when its marker key is missing.
+"""
+
+import frappe
+from frappe.query_builder.functions import Sum
+from frappe.utils import flt, getdate
+
+from snelex.profiling import count_cache, profiled
+
+LBS_PER_TON = 2204.62
+FLEET_KEY = "snelex:fleet:{0}|{1}"
+MEMBERS_KEY = "snelex:fleet:members"
+SETS_KEY = "snelex:fleet:sets"
+BUILT_KEY = "snelex:fleet:built"
+INDEX_TTL = 86400
+MAX_CANDIDATES = 20
+INDEX_FIELDS = ["name", "truck_type", "current_location", "capacityton", "status"]
+
+
+@frappe.whitelist()
+@profiled
+def assign_truck(location=None, date=None, weight=0, truck_type=None, manifest=None):
+	"""Return the smallest truck free on ``date`` that carries ``weight`` lbs, preferring ``location``.
+
+	With a ``manifest``, the weight is that of the Consignment Notes it lists.
+	"""
+	frappe.has_permission("Truck", "read", throw=True)
+	ensure_fleet_index()
+
+	weight = flt(weight)
+	if manifest:
+		weight = max(weight, get_manifest_weight(manifest))
+	for index_keys in _candidate_keys(truck_type, location):
+		candidates = []
+		for index_key in index_keys:
+			candidates += frappe.cache.zrangebyscore(
+				index_key, weight, "+inf", start=0, num=MAX_CANDIDATES, withscores=True
+			)
+		# smallest truck first, whichever set it came from
+		for name, _capacity in sorted(candidates, key=lambda candidate: candidate[1]):
+			name = name.decode()
+			truck = get_free_truck(name, date)
+			if truck:
+				count_cache(hits=1)
+				return truck
+			# the index was stale for this truck
+			count_cache(misses=1)
+			update_fleet_index([name])
+
+
+def get_manifest_weight(manifest):
+	"""Total weight in lbs of the Consignment Notes listed on ``manifest``"""
+	frappe.has_permission("Manifest", "read", manifest, throw=True)
+	note = frappe.qb.DocType("Consignment Note")
+	listed = frappe.qb.DocType("Consignment List")
+	weight = (
+		frappe.qb.from_(listed)
+		.join(note)
+		.on(note.name == listed.consignment_number)
+		.select(Sum(note.total_weight_lbs))
+		.where(listed.parenttype == "Manifest")
+		.where(listed.parent == manifest)
+		.run()
+	)
+	return flt(weight[0][0])
+
+
+def get_free_truck(name, date=None):
+	"""Return the truck card of ``name`` when it is Available, on no Open Manifest and insured on ``date``"""
+	truck = frappe.db.get_value(
+		"Truck",
+		name,
+		[
+			"name",
+			"truck_type",
+			"capacityton",
+			"capacity_cbm",
+			"current_location",
+			"driver",
+			"status",
+			"insurance_expiry_date",
+			"permit_expiry_date",
+		],
+		as_dict=True,
+	)
+	if not truck or truck.status != "Available" or get_open_manifest(name):
+		return None
+
+	date = getdate(date)
+	if any(
+		expiry and getdate(expiry) < date
+		for expiry in (truck.insurance_expiry_date, truck.permit_expiry_date)
+	):
+		return None
+	return truck
+
+
+def get_open_manifest(truck, exclude=None):
+	"""Name of the Open Manifest ``truck`` is currently on, if any"""
+	filters = {"truck": truck, "status": "Open"}
+	if exclude:
+		filters["name"] = ["!=", exclude]
+	return frappe.db.get_value("Manifest", filters, "name")
+
+
+def _candidate_keys(truck_type, location):
+	"""Return ``(preferred, others)``: the sets at ``location``, then every other set of the type"""
+	# the made key of type "" at location "", minus its "|"
+	prefix = frappe.safe_decode(frappe.cache.make_key(FLEET_KEY.format("", "")))[:-1]
+	preferred, others = [], []
+	for key in sorted(member.decode() for member in frappe.cache.smembers(SETS_KEY)):
+		key_type, key_location = key.removeprefix(prefix).split("|", 1)
+		if truck_type and key_type != truck_type:
+			continue
+		(preferred if location and key_location == location else others).append(key)
+	return preferred, others
+
+
+def ensure_fleet_index():
+	if not frappe.cache.exists(BUILT_KEY):
+		rebuild_fleet_index()
+
+
+def rebuild_fleet_index():
+	"""Drop and rebuild every availability set from the Truck table"""
+	members_key = frappe.cache.make_key(MEMBERS_KEY)
+	old_keys = set(frappe.cache.hvals(members_key))
+	pipe = frappe.cache.pipeline()
+	for key in old_keys:
+		pipe.delete(key)
+	pipe.delete(members_key)
+	pipe.delete(frappe.cache.make_key(SETS_KEY))
+	pipe.execute()
+
+	_index_trucks(frappe.get_all("Truck", fields=INDEX_FIELDS))
+	frappe.cache.set(frappe.cache.make_key(BUILT_KEY), 1, ex=INDEX_TTL)
+
+
+def update_fleet_index(trucks):
+	"""Re-read ``trucks`` and move each one into (or out of) its availability set"""
+	rows = frappe.get_all("Truck", filters={"name": ["in", trucks]}, fields=INDEX_FIELDS)
+	found = {row.name for row in rows}
+	_index_trucks(rows, removed=[name for name in trucks if name not in found])
+
+
+def _index_trucks(rows, removed=()):
+	members_key = frappe.cache.make_key(MEMBERS_KEY)
+	names = [row.name for row in rows] + list(removed)
+	if not names:
+		return
+
+	previous = frappe.cache.hmget(members_key, names)
+	pipe = frappe.cache.pipeline()
+	for name, old_key in zip(names, previous, strict=True):
+		if old_key:
+			pipe.zrem(old_key, name)
+		pipe.hdel(members_key, name)
+
+	for row in rows:
+		if row.status != "Available" or not row.capacityton:
+			continue
+		key = frappe.cache.make_key(FLEET_KEY.format(row.truck_type or "", row.current_location or ""))
+		pipe.zadd(key, {row.name: flt(row.capacityton) * LBS_PER_TON})
+		pipe.hset(members_key, row.name, key)
+		# every set ever filled, so assign_truck can search all locations
+		pipe.sadd(frappe.cache.make_key(SETS_KEY), key)
+	pipe.execute()
+
+
+@profiled
+def update_from_truck(doc, method=None, *args):
+	"""doc_events handler for Truck"""
+	if method == "after_rename":
+		rebuild_fleet_index()
+	else:
+		update_fleet_index([doc.name])
+
+
+@profiled
+def sync_truck_status(doc, method=None):
+	"""doc_events handler for Manifest: an Open Manifest holds its truck, anything else releases it"""
+	before = None if method == "on_trash" else doc.get_doc_before_save()
+	previous = before.truck if before else None
+
+	if method == "on_trash" or doc.status != "Open":
+		release, hold = {doc.truck, previous}, None
+	else:
+		release, hold = {previous} - {doc.truck}, doc.truck
+
+	for truck in release - {None, ""}:
+		if not get_open_manifest(truck, exclude=doc.name):
+			_set_truck_status(
+				truck, "Available", "In Transit", None if method == "on_trash" else doc.location
+			)
+	if hold:
+		_set_truck_status(hold, "In Transit", "Available")
+
+
+def _set_truck_status(name, status, current, location=None):
+	"""Move ``name`` from ``current`` to ``status``; trucks in any other state are left alone"""
+	truck = frappe.get_doc("Truck", name)
+	if truck.status != current:
+		return
+	truck.status = status
+	if location:
+		truck.current_location = location
+	# saved as a document, so the index and the list status stream follow
+	truck.save(ignore_permissions=True)
+
+
+def validate_truck(manifest):
+	"""Refuse a truck that is on another Open Manifest or out of service"""
+	if manifest.status != "Open" or not manifest.truck:
+		return
+
+	other = get_open_manifest(manifest.truck, exclude=None if manifest.is_new() else manifest.name)
+	if other:
+		frappe.throw(f"Truck {manifest.truck} is already on the road with Manifest {other}")
+
+	status = frappe.db.get_value("Truck", manifest.truck, "status")
+	if status not in ("Available", "In Transit"):
+		frappe.throw(f"Truck {manifest.truck} is {status} and cannot be assigned")
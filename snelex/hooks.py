@@ -26,7 +26,7 @@ app_license = "mit"
 
 # include js, css files in header of desk.html
 # app_include_css = "/assets/snelex/css/snelex.css"
-# app_include_js = "/assets/snelex/js/snelex.js"
+app_include_js = "/assets/snelex/js/status_stream.js"
 
 # include js, css files in header of web template
 # web_include_css = "/assets/snelex/css/snelex.css"
@@ -74,6 +74,10 @@ app_license = "mit"
 # ----------
 
 # add methods and filters to jinja environment
+jinja = {
+	"methods": ["snelex.archival.get_consignment_note"],
+}
+
 # jinja = {
 # 	"methods": "snelex.utils.jinja_methods",
 # 	"filters": "snelex.utils.jinja_filters"
@@ -145,9 +149,91 @@ app_license = "mit"
 # 	}
 # }
 
+doc_events = {
+	"Address": {
+		"on_update": "snelex.party.clear_party_cache",
+		"on_trash": "snelex.party.clear_party_cache",
+	},
+	"Contact": {
+		"on_update": "snelex.party.clear_party_cache",
+		"on_trash": "snelex.party.clear_party_cache",
+	},
+	"Customer": {
+		"on_update": "snelex.party.clear_party_cache",
+		"on_trash": "snelex.party.clear_party_cache",
+		"after_rename": "snelex.party.clear_party_cache",
+	},
+	"Consignment Note": {
+		"on_update": ["snelex.consignment.clear_consignment_snapshot", "snelex.analytics.record_moved_date"],
+		"on_submit": [
+			"snelex.consignment.clear_consignment_snapshot",
+			"snelex.consignment.sync_job_cards",
+			"snelex.tracking.update_from_consignment_note",
+		],
+		"on_update_after_submit": [
+			"snelex.consignment.clear_consignment_snapshot",
+			"snelex.consignment.sync_job_cards",
+			"snelex.tracking.update_from_consignment_note",
+		],
+		"on_cancel": [
+			"snelex.consignment.clear_consignment_snapshot",
+			"snelex.tracking.update_from_consignment_note",
+		],
+		"on_trash": "snelex.tracking.update_from_consignment_note",
+	},
+	"Job Card": {
+		"on_update": ["snelex.tracking.update_from_job_card", "snelex.analytics.record_moved_date"],
+		"on_change": "snelex.realtime.queue_status_delta",
+		"after_delete": "snelex.tracking.update_from_job_card",
+	},
+	"Lane Tariff": {
+		"on_update": "snelex.rating.clear_tariff_cache",
+		"on_trash": "snelex.rating.clear_tariff_cache",
+	},
+	"Location": {
+		"on_update": "snelex.numbering.clear_location_code_cache",
+		"on_trash": "snelex.numbering.clear_location_code_cache",
+		"after_rename": "snelex.numbering.clear_location_code_cache",
+	},
+	"Manifest": {
+		"on_update": ["snelex.tracking.update_from_manifest", "snelex.fleet.sync_truck_status"],
+		"on_change": "snelex.realtime.queue_status_delta",
+		"on_trash": ["snelex.tracking.update_from_manifest", "snelex.fleet.sync_truck_status"],
+	},
+	"Sales Invoice": {
+		"on_cancel": "snelex.invoicing.release_consignment_notes",
+		"on_trash": "snelex.invoicing.release_consignment_notes",
+	},
+	"Shipper": {
+		# the cache is cleared first so provisioning sees the saved Shipper
+		"on_update": ["snelex.party.clear_party_cache", "snelex.provisioning.queue_customer"],
+		"on_trash": "snelex.party.clear_party_cache",
+		"after_rename": ["snelex.party.clear_party_cache", "snelex.provisioning.queue_customer"],
+	},
+	"Truck": {
+		"on_update": ["snelex.fleet.update_from_truck", "snelex.truck_expiry.update_truck_expiry"],
+		"on_change": "snelex.realtime.queue_status_delta",
+		"after_rename": ["snelex.fleet.update_from_truck", "snelex.truck_expiry.update_truck_expiry"],
+		"after_delete": ["snelex.fleet.update_from_truck", "snelex.truck_expiry.update_truck_expiry"],
+	},
+}
+
 # Scheduled Tasks
 # ---------------
 
+scheduler_events = {
+	"hourly_long": [
+		"snelex.analytics.materialize_daily_operations",
+		"snelex.analytics.materialize_status_counts",
+	],
+	"daily": [
+		"snelex.truck_expiry.scan_truck_expiry",
+	],
+	"daily_long": [
+		"snelex.archival.archive_closed_consignments",
+	],
+}
+
 # scheduler_events = {
 # 	"all": [
 # 		"snelex.tasks.all"
@@ -0,0 +1,232 @@
+# Copyright (c) 2025, Snelex and contributors
+# For license information, please see license.txt
+
+"""Consolidated billing of Consignment Notes into Sales Invoices.
+
+``create_sales_invoices`` queues ``run_invoicing`` for a date range and a
+billing period. The job walks submitted, uninvoiced notes that have an
+``invoiced_to`` party in keyset-paginated chunks ordered by party, date and
+name, prices every note with the compiled Lane Tariffs of ``snelex.rating``
+and builds one Sales Invoice per party and period, with a line per note.
+
+Each invoice is inserted in its own savepoint. Its notes are stamped with
+the invoice and their freight amount in a single ``UPDATE`` that only
+touches notes still unbilled: when another run got there first, the group
+is rolled back instead of billed twice. The job commits every
+``INVOICES_PER_COMMIT`` invoices, and the resume cursor is written in the
+same transaction. A crashed or timed-out run therefore loses at most the
+uncommitted invoices together with their stamps, and the next run of the
+same range picks up from the cursor. Cancelling or deleting an invoice
+releases its notes again.
+"""
+
+import frappe
+from frappe.query_builder import Case
+from frappe.utils import cint, get_last_day, get_last_day_of_week, getdate
+
+from snelex.profiling import profiled
+from snelex.rating import PRICING_FIELDS, get_rate_engine
+
+NOTE_CHUNK_SIZE = 1000
+MAX_INVOICE_LINES = 500
+INVOICES_PER_COMMIT = 20
+PROGRESS_EVENT = "snelex_invoicing"
+CURSOR_KEY = "snelex_invoicing_cursor:{0}:{1}:{2}:{3}"
+
+# period -> last day of the period holding a date
+BILLING_PERIODS = {
+	"Daily": getdate,
+	"Weekly": get_last_day_of_week,
+	"Monthly": get_last_day,
+}
+
+
+@frappe.whitelist(methods=["POST"])
+@profiled
+def create_sales_invoices(from_date, to_date, company=None, period="Monthly"):
+	"""Queue billing of every uninvoiced Consignment Note dated within the range"""
+	frappe.has_permission("Sales Invoice", "create", throw=True)
+	company = company or frappe.defaults.get_user_default("Company")
+	if not company:
+		frappe.throw("Set a default Company or pass the Company to invoice from")
+	if period not in BILLING_PERIODS:
+		frappe.throw(f"Billing period must be one of {', '.join(BILLING_PERIODS)}")
+	from_date, to_date = getdate(from_date), getdate(to_date)
+	if from_date > to_date:
+		frappe.throw("From Date cannot be after To Date")
+
+	job_id = f"snelex_invoicing::{company}::{from_date}::{to_date}::{period}"
+	frappe.enqueue(
+		"snelex.invoicing.run_invoicing",
+		queue="long",
+		timeout=7200,
+		job_id=job_id,
+		deduplicate=True,
+		now=frappe.flags.in_test,
+		from_date=str(from_date),
+		to_date=str(to_date),
+		company=company,
+		period=period,
+		user=frappe.session.user,
+	)
+	return job_id
+
+
+def run_invoicing(from_date, to_date, company, period="Monthly", user=None):
+	"""Background job: one Sales Invoice per invoiced_to party and period, resuming from the last cursor"""
+	engine = get_rate_engine()
+	cursor_key = CURSOR_KEY.format(company, from_date, to_date, period)
+	cursor = frappe.parse_json(frappe.db.get_global(cursor_key) or "null")
+	summary = frappe._dict(invoices=[], billed=0, unpriced=[], errors=[])
+	pending = 0
+
+	for (party, period_end), notes in iter_billable_groups(from_date, to_date, period, cursor):
+		cursor = [party, str(notes[-1].consignment_date), notes[-1].name]
+		prices = engine.price_many(notes)
+		summary.unpriced.extend(note.name for note in notes if note.name not in prices)
+		priced = [note for note in notes if note.name in prices]
+		if not priced:
+			continue
+
+		savepoint = f"invoice_{len(summary.invoices) + len(summary.errors)}"
+		frappe.db.savepoint(savepoint)
+		try:
+			invoice = make_sales_invoice(party, company, min(period_end, getdate(to_date)), priced, prices)
+			invoice.insert()
+			mark_invoiced(invoice.name, priced, prices)
+		except Exception as e:
+			frappe.db.rollback(save_point=savepoint)
+			frappe.clear_messages()
+			summary.errors.append({"invoiced_to": party, "error": str(e)})
+			frappe.log_error(title=f"Consignment invoicing failed for {party}")
+			continue
+
+		summary.invoices.append(invoice.name)
+		summary.billed += len(priced)
+		pending += 1
+		if pending >= INVOICES_PER_COMMIT:
+			frappe.db.set_global(cursor_key, frappe.as_json(cursor))
+			frappe.db.commit()
+			pending = 0
+			_publish_progress(summary, user)
+
+	frappe.db.set_global(cursor_key, "")
+	frappe.db.commit()
+	summary.finished = 1
+	_publish_progress(summary, user)
+	return summary
+
+
+def iter_billable_groups(from_date, to_date, period="Monthly", cursor=None, chunk_size=NOTE_CHUNK_SIZE):
+	"""Yield ``((invoiced_to, period end), notes)`` of at most ``MAX_INVOICE_LINES`` notes.
+
+	Notes are read in keyset chunks ordered by party, date and name, starting
+	after ``cursor`` (a ``[party, date, name]`` triple) when given.
+	"""
+	last_day = BILLING_PERIODS[period]
+	note = frappe.qb.DocType("Consignment Note")
+	last_party, last_date, last_name = cursor or ("", getdate(from_date), "")
+	group_key, group = None, []
+
+	while True:
+		rows = (
+			frappe.qb.from_(note)
+			.select(note.invoiced_to, *(note[field] for field in PRICING_FIELDS))
+			.where(note.docstatus == 1)
+			.where(note.sales_invoice.isnull() | (note.sales_invoice == ""))
+			.where(note.invoiced_to.isnotnull() & (note.invoiced_to != ""))
+			.where(note.consignment_date[getdate(from_date) : getdate(to_date)])
+			.where(
+				(note.invoiced_to > last_party)
+				| ((note.invoiced_to == last_party) & (note.consignment_date > last_date))
+				| (
+					(note.invoiced_to == last_party)
+					& (note.consignment_date == last_date)
+					& (note.name > last_name)
+				)
+			)
+			.orderby(note.invoiced_to)
+			.orderby(note.consignment_date)
+			.orderby(note.name)
+			.limit(cint(chunk_size) or NOTE_CHUNK_SIZE)
+			.run(as_dict=True)
+		)
+		if not rows:
+			break
+
+		for row in rows:
+			key = (row.invoiced_to, getdate(last_day(row.consignment_date)))
+			if key != group_key or len(group) >= MAX_INVOICE_LINES:
+				if group:
+					yield group_key, group
+				group_key, group = key, []
+			group.append(row)
+		last = rows[-1]
+		last_party, last_date, last_name = last.invoiced_to, last.consignment_date, last.name
+
+	if group:
+		yield group_key, group
+
+
+def make_sales_invoice(customer, company, posting_date, notes, prices):
+	"""Build (without saving) a Sales Invoice with one line per priced note"""
+	invoice = frappe.new_doc("Sales Invoice")
+	invoice.customer = customer
+	invoice.company = company
+	invoice.posting_date = posting_date
+	invoice.set_posting_time = 1
+	for note in notes:
+		price = prices[note.name]
+		invoice.append(
+			"items",
+			{
+				"item_code": price.item,
+				"qty": 1,
+				"rate": price.amount,
+				"description": (
+					f"{note.name} ({note.consignment_date}): {note.consignment_from} → {note.consignment_to}"
+				),
+			},
+		)
+	invoice.set_missing_values()
+	return invoice
+
+
+def mark_invoiced(sales_invoice, notes, prices):
+	"""Stamp ``notes`` with their invoice and freight amount in one UPDATE, refusing notes billed meanwhile"""
+	note = frappe.qb.DocType("Consignment Note")
+	amount = Case()
+	for row in notes:
+		amount = amount.when(note.name == row.name, prices[row.name].amount)
+	(
+		frappe.qb.update(note)
+		.set(note.sales_invoice, sales_invoice)
+		.set(note.freight_amount, amount)
+		.where(note.name.isin([row.name for row in notes]))
+		.where(note.sales_invoice.isnull() | (note.sales_invoice == ""))
+		.run()
+	)
+	if frappe.db.count("Consignment Note", {"sales_invoice": sales_invoice}) != len(notes):
+		frappe.throw(f"Some of the Consignment Notes for {sales_invoice} were invoiced by another run")
+
+
+@profiled
+def release_consignment_notes(doc, method=None):
+	"""doc_events handler for Sales Invoice: cancelled or deleted invoices free their notes"""
+	frappe.db.set_value(
+		"Consignment Note", {"sales_invoice": doc.name}, {"sales_invoice": None, "freight_amount": 0}
+	)
+
+
+def _publish_progress(summary, user):
+	frappe.publish_realtime(
+		PROGRESS_EVENT,
+		{
+			"invoices": len(summary.invoices),
+			"billed": summary.billed,
+			"unpriced": len(summary.unpriced),
+			"failed": len(summary.errors),
+			"finished": summary.get("finished", 0),
+		},
+		user=user,
+	)
@@ -0,0 +1,293 @@
+# Copyright (c) 2025, Snelex and contributors
+# For license information, please see license.txt
+
+"""Load planning: assign a day's Consignment Notes to Available Trucks.
+
+``plan_loads`` treats the assignment as two-dimensional bin packing over
+weight and CBM. Notes are placed first-fit decreasing by their size relative
+to the largest truck, trucks are opened largest first, and a local
+improvement pass then empties the lightest loads into the others and moves
+every load onto the smallest free truck that still holds it. It touches no
+database, so it can be benchmarked on synthetic data.
+
+``plan_manifests`` feeds it the eligible notes of a date and location and,
+when asked to, creates one Manifest per load with its Consignment List rows
+written in a single bulk insert.
+"""
+
+import math
+
+import frappe
+from frappe.utils import cint, flt, getdate, now_datetime
+
+from snelex.fleet import LBS_PER_TON
+from snelex.profiling import profiled
+from snelex.snelex.doctype.manifest.manifest import iter_consignment_details
+from snelex.tracking import rebuild_tracking
+
+MAX_IMPROVEMENT_PASSES = 10
+
+
+class Load:
+	"""Notes assigned to one truck, with running totals"""
+
+	__slots__ = ("cbm", "max_cbm", "max_weight", "notes", "truck", "weight")
+
+	def __init__(self, truck, max_weight, max_cbm):
+		self.truck = truck
+		self.max_weight = max_weight
+		self.max_cbm = max_cbm
+		self.weight = 0.0
+		self.cbm = 0.0
+		self.notes = []
+
+	def fits(self, note):
+		return self.weight + note.weight <= self.max_weight and self.cbm + note.cbm <= self.max_cbm
+
+	def add(self, note):
+		self.notes.append(note)
+		self.weight += note.weight
+		self.cbm += note.cbm
+
+	def remove(self, note):
+		self.notes.remove(note)
+		self.weight -= note.weight
+		self.cbm -= note.cbm
+
+	@property
+	def fill(self):
+		return max(self.weight / self.max_weight, self.cbm / self.max_cbm if self.max_cbm != math.inf else 0)
+
+
+def plan_loads(notes, trucks):
+	"""Assign ``notes`` to ``trucks`` and return ``{"loads": [Load], "unassigned": [note]}``.
+
+	Notes need ``name``, ``weight`` (lbs) and ``cbm``; trucks need ``name``,
+	``max_weight`` (lbs) and ``max_cbm`` (0 when only weight is limited).
+	"""
+	notes = [frappe._dict(note, weight=flt(note.get("weight")), cbm=flt(note.get("cbm"))) for note in notes]
+	trucks = [
+		frappe._dict(
+			truck, max_weight=flt(truck.get("max_weight")), max_cbm=flt(truck.get("max_cbm")) or math.inf
+		)
+		for truck in trucks
+		if flt(truck.get("max_weight")) > 0
+	]
+	if not trucks:
+		return frappe._dict(loads=[], unassigned=notes)
+
+	ref_weight = max(truck.max_weight for truck in trucks)
+	cbm_limits = [truck.max_cbm for truck in trucks if truck.max_cbm != math.inf]
+	ref_cbm = max(cbm_limits) if cbm_limits else math.inf
+
+	def size(item_weight, item_cbm):
+		# an unlimited CBM does not count, so a truck limited by weight only ranks by its weight
+		cbm = item_cbm / ref_cbm if math.isfinite(item_cbm) and math.isfinite(ref_cbm) else 0
+		return max(item_weight / ref_weight, cbm)
+
+	notes.sort(key=lambda note: size(note.weight, note.cbm), reverse=True)
+	# largest first while packing, so few trucks are opened
+	free = sorted(trucks, key=lambda truck: size(truck.max_weight, truck.max_cbm), reverse=True)
+
+	loads, unassigned = [], []
+	for note in notes:
+		load = next((load for load in loads if load.fits(note)), None)
+		if load is None:
+			truck = next(
+				(truck for truck in free if note.weight <= truck.max_weight and note.cbm <= truck.max_cbm),
+				None,
+			)
+			if truck is None:
+				unassigned.append(note)
+				continue
+			free.remove(truck)
+			load = Load(truck.name, truck.max_weight, truck.max_cbm)
+			loads.append(load)
+		load.add(note)
+
+	for _ in range(MAX_IMPROVEMENT_PASSES):
+		emptied = _empty_lightest_load(loads, free)
+		resized = _downsize_loads(loads, free, size)
+		if not (emptied or resized):
+			break
+
+	return frappe._dict(loads=loads, unassigned=unassigned)
+
+
+def _empty_lightest_load(loads, free):
+	"""Move every note of the lightest possible load into the others and free its truck"""
+	for load in sorted(loads, key=lambda load: load.fill):
+		moved = []
+		for note in sorted(load.notes, key=lambda note: note.weight, reverse=True):
+			target = next((other for other in loads if other is not load and other.fits(note)), None)
+			if target is None:
+				break
+			target.add(note)
+			moved.append((note, target))
+		else:
+			loads.remove(load)
+			free.append(frappe._dict(name=load.truck, max_weight=load.max_weight, max_cbm=load.max_cbm))
+			return True
+
+		for note, target in moved:
+			target.remove(note)
+	return False
+
+
+def _downsize_loads(loads, free, size):
+	"""Swap each load onto the smallest free truck that still holds it"""
+	changed = False
+	for load in loads:
+		current = size(load.max_weight, load.max_cbm)
+		smaller = [
+			truck
+			for truck in free
+			if load.weight <= truck.max_weight
+			and load.cbm <= truck.max_cbm
+			and size(truck.max_weight, truck.max_cbm) < current
+		]
+		if not smaller:
+			continue
+
+		truck = min(smaller, key=lambda truck: size(truck.max_weight, truck.max_cbm))
+		free.remove(truck)
+		free.append(frappe._dict(name=load.truck, max_weight=load.max_weight, max_cbm=load.max_cbm))
+		load.truck, load.max_weight, load.max_cbm = truck.name, truck.max_weight, truck.max_cbm
+		changed = True
+	return changed
+
+
+@frappe.whitelist()
+@profiled
+def plan_manifests(manifest_date, location, trucks=None, create=0, transport_type="By Road", remarks=None):
+	"""Plan (and with ``create`` make) Manifests for the pending notes of a date and location"""
+	create = cint(create)
+	frappe.has_permission("Manifest", "create" if create else "read", throw=True)
+	if not (manifest_date and location):
+		frappe.throw("Select the Manifest Date and Location")
+
+	notes = {row.name: row for row in iter_consignment_details(manifest_date, location)}
+	truck_rows = {row.name: row for row in get_available_trucks(manifest_date, frappe.parse_json(trucks))}
+	plan = plan_loads(
+		[{"name": row.name, "weight": row.total_weight_lbs, "cbm": row.total_cbm} for row in notes.values()],
+		[
+			{"name": row.name, "max_weight": flt(row.capacityton) * LBS_PER_TON, "max_cbm": row.capacity_cbm}
+			for row in truck_rows.values()
+		],
+	)
+
+	manifests = {}
+	if create and plan.loads:
+		manifests = create_manifests(
+			plan.loads,
+			notes,
+			truck_rows,
+			manifest_date,
+			location,
+			transport_type,
+			remarks or f"Load plan for {location} on {manifest_date}",
+		)
+
+	return {
+		"loads": [
+			{
+				"truck": load.truck,
+				"manifest": manifests.get(load.truck),
+				"consignment_notes": [note.name for note in load.notes],
+				"weight_lbs": round(load.weight, 2),
+				"cbm": round(load.cbm, 3),
+				"fill": round(load.fill, 3),
+			}
+			for load in plan.loads
+		],
+		"unassigned": [note.name for note in plan.unassigned],
+	}
+
+
+def get_available_trucks(manifest_date, trucks=None):
+	"""Available trucks with a weight capacity that no open Manifest of the date uses yet"""
+	filters = {"status": "Available", "capacityton": [">", 0]}
+	if trucks:
+		filters["name"] = ["in", trucks]
+	rows = frappe.get_all("Truck", filters=filters, fields=["name", "capacityton", "capacity_cbm", "driver"])
+	if not rows:
+		return []
+
+	busy = frappe.get_all(
+		"Manifest",
+		filters={
+			"status": "Open",
+			"manifest_date": getdate(manifest_date),
+			"truck": ["in", [row.name for row in rows]],
+		},
+		pluck="truck",
+	)
+	busy = set(busy)
+	return [row for row in rows if row.name not in busy]
+
+
+def create_manifests(loads, notes, trucks, manifest_date, location, transport_type, remarks):
+	"""Insert one Manifest per load and all Consignment List rows in one bulk insert"""
+	manifests, values = {}, []
+	now = now_datetime()
+	for load in loads:
+		manifest = frappe.get_doc(
+			{
+				"doctype": "Manifest",
+				"location": location,
+				"manifest_date": manifest_date,
+				"status": "Open",
+				"transport_type": transport_type,
+				"remarks": remarks,
+				"truck": load.truck,
+				"driver": trucks[load.truck].driver,
+			}
+		).insert()
+		manifests[load.truck] = manifest.name
+
+		for idx, note in enumerate(load.notes, 1):
+			row = notes[note.name]
+			values.append(
+				(
+					frappe.generate_hash(length=10),
+					now,
+					now,
+					frappe.session.user,
+					frappe.session.user,
+					0,
+					manifest.name,
+					"consignment_details",
+					"Manifest",
+					idx,
+					row.name,
+					row.consignment_date,
+					row.consignee_customer,
+					row.shipper,
+					row.remarks,
+				)
+			)
+
+	frappe.db.bulk_insert(
+		"Consignment List",
+		fields=[
+			"name",
+			"creation",
+			"modified",
+			"modified_by",
+			"owner",
+			"docstatus",
+			"parent",
+			"parentfield",
+			"parenttype",
+			"idx",
+			"consignment_number",
+			"consignment_date",
+			"consignee",
+			"shipper",
+			"remarks",
+		],
+		values=values,
+	)
+	# the Manifest hooks ran before the rows existed
+	rebuild_tracking([note.name for load in loads for note in load.notes])
+	return manifests
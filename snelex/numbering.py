@@ -0,0 +1,126 @@
+# Copyright (c) 2025, Snelex and contributors
+# For license information, please see license.txt
+
+"""Per-location number allocation for Manifest and Job Card numbers.
+
+``make_autoname`` takes a row lock on ``tabSeries`` for every number and holds
+it until the saving transaction commits, so parallel saves at one location
+queue up behind each other. Here every worker process reserves a block of
+numbers at once with an atomic Redis ``INCRBY`` and hands them out from
+memory. The reserved high-water mark is written back to ``tabSeries`` once
+per block, after the saving transaction ends, so numbering resumes correctly
+if Redis is flushed.
+
+Numbers are unique and increasing, but not gapless. A Redis increment is
+not rolled back with the saving transaction, so a save that fails after its
+number was drawn leaves a gap. Manifests draw their numbers in
+``before_save``, after every validation, which keeps such failures rare.
+With a block size above 1, numbers still left in a block when a worker
+exits are skipped as well. The block size comes from the
+``snelex_number_block_size`` site config key and defaults to 1; raise it
+only where throughput matters more than a dense sequence.
+"""
+
+import threading
+
+import frappe
+from frappe.utils import cint
+
+from snelex.profiling import profiled
+
+DEFAULT_BLOCK_SIZE = 1
+LOCATION_CODE_CACHE_KEY = "snelex:location_code"
+SERIES_CACHE_KEY = "snelex:number_series:{0}"
+
+_lock = threading.Lock()
+# (site, series) -> [next, last] of the block reserved by this process
+_blocks = {}
+
+
+def get_location_code(location):
+	"""Return the cached ``custom_location_code`` of a Location"""
+	return frappe.cache.hget(
+		LOCATION_CODE_CACHE_KEY,
+		location,
+		generator=lambda: frappe.db.get_value("Location", location, "custom_location_code") or "",
+	)
+
+
+@profiled
+def clear_location_code_cache(doc, method=None, *args):
+	"""doc_events handler for Location"""
+	frappe.cache.hdel(LOCATION_CODE_CACHE_KEY, doc.name)
+	if method == "after_rename" and args:
+		frappe.cache.hdel(LOCATION_CODE_CACHE_KEY, args[0])
+
+
+def make_manifest_number(location):
+	"""Return the next Manifest number for ``location``, e.g. ``DXB-00042``"""
+	prefix = get_location_code(location) or "MNF"
+	# same series key as make_autoname("{prefix}-.#####") so existing counters carry on
+	return f"{prefix}-{next_number(f'{prefix}-'):05d}"
+
+
+def make_job_card_number(location):
+	"""Return the next Job Card number for ``location``, e.g. ``00042-DXB``"""
+	prefix = get_location_code(location) or "JCN"
+	# "#####.-{prefix}" used to share the unnamed series across every location;
+	# per-location series start from its value so old numbers are never reissued
+	return f"{next_number(f'JCN-{prefix}', seed_series=''):05d}-{prefix}"
+
+
+def next_number(series, seed_series=None):
+	"""Return the next number of ``series`` from this process's reserved block"""
+	key = (frappe.local.site, series)
+	with _lock:
+		block = _blocks.get(key)
+		if not block or block[0] > block[1]:
+			block = _blocks[key] = reserve_block(series, get_block_size(), seed_series)
+		number = block[0]
+		block[0] += 1
+	return number
+
+
+def reserve_block(series, size, seed_series=None):
+	"""Atomically reserve ``size`` numbers of ``series`` and return ``[first, last]``"""
+	key = frappe.cache.make_key(SERIES_CACHE_KEY.format(series))
+	if frappe.cache.get(key) is None:
+		seed = max(_get_db_current(series), _get_db_current(seed_series) if seed_series is not None else 0)
+		frappe.cache.set(key, seed, nx=True)
+
+	last = frappe.cache.incrby(key, size)
+	_persist_after_transaction(series, last)
+	return [last - size + 1, last]
+
+
+def get_block_size():
+	return max(cint(frappe.conf.get("snelex_number_block_size")) or DEFAULT_BLOCK_SIZE, 1)
+
+
+def _get_db_current(series):
+	return cint(frappe.db.get_value("Series", series, "current", order_by="name"))
+
+
+def _persist_after_transaction(series, current):
+	"""Write the high-water mark in its own short transaction once the current one ends.
+
+	Writing it inline would hold the ``tabSeries`` row lock until the saving
+	transaction commits, which is exactly the contention this module avoids.
+	"""
+
+	def persist():
+		_set_db_current(series, current)
+		frappe.db.commit()
+
+	frappe.db.after_commit.add(persist)
+	frappe.db.after_rollback.add(persist)
+
+
+def _set_db_current(series, current):
+	"""Raise the ``tabSeries`` high-water mark, never lower it"""
+	if frappe.db.get_value("Series", series, "name", order_by="name") is None:
+		frappe.db.sql("insert into `tabSeries` (`name`, `current`) values (%s, 0)", (series,))
+	frappe.db.sql(
+		"update `tabSeries` set `current` = greatest(`current`, %s) where `name` = %s",
+		(current, series),
+	)
@@ -0,0 +1,241 @@
+# Copyright (c) 2025, Snelex and contributors
+# For license information, please see license.txt
+
+"""Party resolution for Shippers and Customers.
+
+Consignment Notes copy display name, address and contact details from the
+linked Shipper / Customer on every save. Resolving those one document at a
+time costs a handful of queries per party, so this module resolves any number
+of parties with a few set-based queries and caches the result twice: in a
+per-request memo on ``frappe.local`` and in a Redis hash keyed by
+``(link_doctype, link_name)``.
+
+Addresses are rendered to plain text once, when a party is loaded, so
+``get_party_card`` serves the form triggers straight from the cache. Entries
+are dropped from ``doc_events`` whenever the party itself or one of its
+Addresses / Contacts changes (see ``hooks.py``) and reloaded once the change
+is committed.
+"""
+
+import re
+
+import frappe
+from frappe.contacts.doctype.address.address import get_address_display
+
+from snelex.profiling import count_cache, profiled
+
+PARTY_CACHE_KEY = "snelex:party_details"
+PARTY_DOCTYPES = ("Shipper", "Customer")
+
+# fields read from the party record itself, keyed by doctype
+PARTY_FIELDS = {
+	"Shipper": ["name", "shipper as display_name", "address", "modified"],
+	"Customer": ["name", "customer_name as display_name", "modified"],
+}
+
+ADDRESS_FIELDS = [
+	"name",
+	"address_title",
+	"address_line1",
+	"address_line2",
+	"city",
+	"county",
+	"state",
+	"country",
+	"pincode",
+	"phone",
+	"fax",
+	"email_id",
+	"is_primary_address",
+	"modified",
+]
+
+CONTACT_FIELDS = ["name", "phone", "mobile_no", "email_id", "fax", "is_primary_contact", "modified"]
+
+# fields the Consignment Note form shows for a party
+PARTY_CARD_FIELDS = ("display_name", "address", "phone", "fax", "email")
+
+
+def get_party(link_doctype, link_name):
+	"""Return cached display details for a single Shipper or Customer"""
+	return get_parties([(link_doctype, link_name)]).get((link_doctype, link_name))
+
+
+def get_party_card(link_doctype, link_name):
+	"""Return display name, plain-text address, phone, fax and email of a party"""
+	party = get_party(link_doctype, link_name)
+	if not party:
+		return {}
+	return {field: party.get(field) or "" for field in PARTY_CARD_FIELDS}
+
+
+def get_parties(parties):
+	"""Resolve a list of ``(link_doctype, link_name)`` pairs in one batched lookup.
+
+	Returns a dict keyed by the pair. Parties that do not exist map to ``None``.
+	"""
+	memo = _get_request_memo()
+	wanted = {(dt, name) for dt, name in parties if dt in PARTY_DOCTYPES and name}
+
+	missing = set()
+	for key in wanted - set(memo):
+		cached = frappe.cache.hget(PARTY_CACHE_KEY, _cache_key(*key))
+		if cached is None:
+			missing.add(key)
+		else:
+			memo[key] = cached or None
+
+	if missing:
+		resolved = _load_parties(missing)
+		for key in missing:
+			details = resolved.get(key)
+			memo[key] = details
+			# store misses as an empty dict so unknown names don't hit the DB again
+			frappe.cache.hset(PARTY_CACHE_KEY, _cache_key(*key), details or {})
+
+	count_cache(hits=len(wanted) - len(missing), misses=len(missing))
+	return {key: memo.get(key) for key in wanted}
+
+
+@profiled
+def clear_party_cache(doc, method=None, *args):
+	"""doc_events handler: drop cached entries affected by ``doc``"""
+	names = {doc.name}
+	if method == "after_rename" and args:
+		# after_rename passes (old, new, merge)
+		names.add(args[0])
+
+	keys = set()
+	if doc.doctype in PARTY_DOCTYPES:
+		for name in names:
+			keys.add((doc.doctype, name))
+			if doc.doctype == "Shipper":
+				# a Customer with the same name doubles as the Shipper's invoicing party
+				keys.add(("Customer", name))
+
+	if doc.doctype in ("Address", "Contact"):
+		for link in doc.get("links") or []:
+			keys.add((link.link_doctype, link.link_name))
+		if doc.doctype == "Address":
+			for shipper in frappe.get_all("Shipper", filters={"address": doc.name}, pluck="name"):
+				keys.add(("Shipper", shipper))
+
+	keys = {key for key in keys if key[0] in PARTY_DOCTYPES}
+	memo = _get_request_memo()
+	for key in keys:
+		memo.pop(key, None)
+		frappe.cache.hdel(PARTY_CACHE_KEY, _cache_key(*key))
+
+	if keys:
+		# reload once committed: keeps the next form trigger warm and overwrites
+		# anything another request cached from the pre-commit rows meanwhile
+		frappe.db.after_commit.add(lambda: refresh_parties(keys))
+
+
+def refresh_parties(keys):
+	"""Load ``keys`` from the database straight into the Redis cache"""
+	resolved = _load_parties(keys)
+	for key in keys:
+		frappe.cache.hset(PARTY_CACHE_KEY, _cache_key(*key), resolved.get(key) or {})
+
+
+def html_to_text(html):
+	"""Convert a rendered address (``<br>`` separated) into plain text"""
+	if not html:
+		return ""
+	text = re.sub(r"<br\s*/?>", "\n", html)
+	return re.sub(r"<[^>]+>", "", text).strip()
+
+
+def _get_request_memo():
+	if not hasattr(frappe.local, "snelex_party_memo"):
+		frappe.local.snelex_party_memo = {}
+	return frappe.local.snelex_party_memo
+
+
+def _cache_key(link_doctype, link_name):
+	return f"{link_doctype}::{link_name}"
+
+
+def _load_parties(keys):
+	"""Load parties, their primary address and primary contact with set-based queries"""
+	names_by_doctype = {}
+	for dt, name in keys:
+		names_by_doctype.setdefault(dt, set()).add(name)
+
+	parties = {}
+	for dt, names in names_by_doctype.items():
+		for row in frappe.get_all(dt, filters={"name": ["in", list(names)]}, fields=PARTY_FIELDS[dt]):
+			parties[(dt, row.name)] = row
+
+	if not parties:
+		return {}
+
+	address_links, contact_links = _load_links(parties)
+
+	# a Shipper's own address link wins over any Dynamic Link
+	explicit_addresses = {row.address for row in parties.values() if row.get("address")}
+	address_rows = _load_rows("Address", ADDRESS_FIELDS, explicit_addresses.union(*address_links.values()))
+	contact_rows = _load_rows("Contact", CONTACT_FIELDS, set().union(*contact_links.values()))
+
+	resolved = {}
+	for key, row in parties.items():
+		address = address_rows.get(row.get("address")) or _pick_primary(
+			address_links.get(key), address_rows, "is_primary_address"
+		)
+		contact = _pick_primary(contact_links.get(key), contact_rows, "is_primary_contact")
+		resolved[key] = frappe._dict(
+			name=row.name,
+			display_name=row.display_name or row.name,
+			address_name=address.get("name"),
+			address=html_to_text(get_address_display(address)) if address else "",
+			contact_name=contact.get("name"),
+			phone=contact.get("phone") or contact.get("mobile_no") or address.get("phone") or "",
+			fax=contact.get("fax") or address.get("fax") or "",
+			email=contact.get("email_id") or address.get("email_id") or "",
+			# latest change to the party, its address or its contact
+			modified=str(max(filter(None, (row.modified, address.get("modified"), contact.get("modified"))))),
+		)
+
+	return resolved
+
+
+def _load_links(parties):
+	"""Return the linked Address and Contact names for every party, keyed like ``parties``"""
+	links = frappe.get_all(
+		"Dynamic Link",
+		filters={
+			"link_doctype": ["in", list({dt for dt, _name in parties})],
+			"link_name": ["in", list({name for _dt, name in parties})],
+			"parenttype": ["in", ["Address", "Contact"]],
+		},
+		fields=["parent", "parenttype", "link_doctype", "link_name"],
+		order_by="creation asc",
+	)
+
+	linked = {"Address": {}, "Contact": {}}
+	for link in links:
+		key = (link.link_doctype, link.link_name)
+		if key in parties:
+			linked[link.parenttype].setdefault(key, []).append(link.parent)
+
+	return linked["Address"], linked["Contact"]
+
+
+def _pick_primary(names, rows, flag):
+	"""Return the primary row among ``names``, falling back to the oldest link"""
+	candidates = [rows[name] for name in names or [] if name in rows]
+	for row in candidates:
+		if row.get(flag):
+			return row
+	return candidates[0] if candidates else {}
+
+
+def _load_rows(doctype, fields, names):
+	names = [name for name in names if name]
+	if not names:
+		return {}
+
+	meta = frappe.get_meta(doctype)
+	fields = [f for f in fields if f == "name" or meta.has_field(f)]
+	return {row.name: row for row in frappe.get_all(doctype, filters={"name": ["in", names]}, fields=fields)}
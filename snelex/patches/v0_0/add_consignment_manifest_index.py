@@ -0,0 +1,6 @@
+import frappe
+
+
+def execute():
+	# backs Manifest.get_consignment_details; new sites get it from on_doctype_update
+	frappe.db.add_index("Consignment Note", ["consignment_to", "consignment_date", "docstatus"])
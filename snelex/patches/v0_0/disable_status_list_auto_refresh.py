@@ -0,0 +1,14 @@
+import frappe
+
+from snelex.realtime import WATCHED_FIELDS
+
+
+def execute():
+	# these lists are kept current by snelex.realtime status deltas instead
+	for doctype in WATCHED_FIELDS:
+		if frappe.db.exists("List View Settings", doctype):
+			frappe.db.set_value("List View Settings", doctype, "disable_auto_refresh", 1)
+		else:
+			frappe.get_doc(
+				{"doctype": "List View Settings", "name": doctype, "disable_auto_refresh": 1}
+			).insert(ignore_permissions=True)
@@ -0,0 +1,5 @@
+from snelex.tracking import rebuild_tracking
+
+
+def execute():
+	rebuild_tracking()
@@ -0,0 +1,205 @@
+# Copyright (c) 2025, Snelex and contributors
+# For license information, please see license.txt
+
+"""Opt-in profiling of snelex whitelisted methods and doc_events handlers.
+
+Functions decorated with ``profiled`` record wall time, SQL count, SQL time
+and cache hits / misses per call once ``snelex_profiling`` is set in the site
+config. Calls are aggregated into Redis hashes, one per ``WINDOW_SECONDS``
+window, holding per-method totals and a latency histogram; windows expire
+after ``RETENTION_SECONDS``. ``get_profile_stats`` rolls the windows of the
+last few minutes up and backs the ``snelex-profiler`` Desk page.
+
+When profiling is off the decorator costs one site config lookup per call.
+"""
+
+import functools
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+import frappe
+from frappe.utils import cint
+
+PROFILE_KEY = "snelex:profile:{}"
+WINDOW_SECONDS = 300
+RETENTION_SECONDS = 24 * 60 * 60
+
+# upper bounds of the latency histogram buckets, in milliseconds
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+COUNTERS = ("calls", "wall_ms", "sql_count", "sql_ms", "cache_hits", "cache_misses")
+
+
+def is_enabled():
+	return bool(frappe.conf.get("snelex_profiling"))
+
+
+def profiled(fn):
+	"""Decorator: profile ``fn`` whenever profiling is enabled for the site"""
+	name = f"{fn.__module__}.{fn.__qualname__}"
+
+	@functools.wraps(fn)
+	def wrapper(*args, **kwargs):
+		if not is_enabled():
+			return fn(*args, **kwargs)
+		with profile(name):
+			return fn(*args, **kwargs)
+
+	return wrapper
+
+
+@contextmanager
+def profile(name):
+	"""Record one call of ``name``; nested calls are counted inclusively"""
+	state = _start()
+	before = (state.sql_count, state.sql_seconds, state.cache_hits, state.cache_misses)
+	start = time.perf_counter()
+	try:
+		yield
+	finally:
+		wall_seconds = time.perf_counter() - start
+		_record(
+			name,
+			wall_seconds,
+			sql_count=state.sql_count - before[0],
+			sql_seconds=state.sql_seconds - before[1],
+			cache_hits=state.cache_hits - before[2],
+			cache_misses=state.cache_misses - before[3],
+		)
+		_stop(state)
+
+
+def count_cache(hits=0, misses=0):
+	"""Report cache hits and misses to the calls being profiled, if any"""
+	state = getattr(frappe.local, "snelex_profiler", None)
+	if state and state.depth:
+		state.cache_hits += hits
+		state.cache_misses += misses
+
+
+@frappe.whitelist()
+def get_profile_stats(minutes=60):
+	"""Return per-method statistics over the last ``minutes``, slowest in total first"""
+	frappe.only_for("System Manager")
+	minutes = max(1, min(cint(minutes) or 60, RETENTION_SECONDS // 60))
+
+	totals = defaultdict(lambda: defaultdict(float))
+	pipe = frappe.cache.pipeline()
+	for key in _window_keys(minutes * 60):
+		pipe.hgetall(key)
+
+	for window in pipe.execute():
+		for field, value in window.items():
+			name, metric = field.decode().rsplit("|", 1)
+			totals[name][metric] += float(value)
+
+	stats = [_summarize(name, counters) for name, counters in totals.items()]
+	return {
+		"enabled": is_enabled(),
+		"minutes": minutes,
+		"buckets": BUCKETS_MS,
+		"methods": sorted(stats, key=lambda row: row["total_ms"], reverse=True),
+	}
+
+
+@frappe.whitelist(methods=["POST"])
+def reset_profile_stats():
+	"""Drop every recorded window"""
+	frappe.only_for("System Manager")
+	pipe = frappe.cache.pipeline()
+	for key in _window_keys(RETENTION_SECONDS):
+		pipe.delete(key)
+	pipe.execute()
+
+
+def _start():
+	if not hasattr(frappe.local, "snelex_profiler"):
+		frappe.local.snelex_profiler = frappe._dict(
+			depth=0, sql_count=0, sql_seconds=0.0, cache_hits=0, cache_misses=0, previous_sql=None
+		)
+	state = frappe.local.snelex_profiler
+	if not state.depth and frappe.db:
+		_install_sql_counter(state)
+	state.depth += 1
+	return state
+
+
+def _stop(state):
+	state.depth -= 1
+	if not state.depth and frappe.db:
+		# put back whatever was there before, e.g. a benchmark's own counter
+		if state.previous_sql is None:
+			frappe.db.__dict__.pop("sql", None)
+		else:
+			frappe.db.sql = state.previous_sql
+
+
+def _install_sql_counter(state):
+	state.previous_sql = frappe.db.__dict__.get("sql")
+	sql = frappe.db.sql
+
+	def counted_sql(*args, **kwargs):
+		start = time.perf_counter()
+		try:
+			return sql(*args, **kwargs)
+		finally:
+			state.sql_count += 1
+			state.sql_seconds += time.perf_counter() - start
+
+	frappe.db.sql = counted_sql
+
+
+def _record(name, wall_seconds, sql_count, sql_seconds, cache_hits, cache_misses):
+	wall_ms = wall_seconds * 1000
+	bucket = next((str(bound) for bound in BUCKETS_MS if wall_ms <= bound), "inf")
+	key = frappe.cache.make_key(PROFILE_KEY.format(int(time.time() // WINDOW_SECONDS)))
+	try:
+		pipe = frappe.cache.pipeline()
+		pipe.hincrby(key, f"{name}|calls", 1)
+		pipe.hincrbyfloat(key, f"{name}|wall_ms", wall_ms)
+		pipe.hincrby(key, f"{name}|sql_count", sql_count)
+		pipe.hincrbyfloat(key, f"{name}|sql_ms", sql_seconds * 1000)
+		pipe.hincrby(key, f"{name}|cache_hits", cache_hits)
+		pipe.hincrby(key, f"{name}|cache_misses", cache_misses)
+		pipe.hincrby(key, f"{name}|le_{bucket}", 1)
+		pipe.expire(key, RETENTION_SECONDS)
+		pipe.execute()
+	except Exception:
+		# profiling must never fail the call it measures
+		pass
+
+
+def _window_keys(seconds):
+	last = int(time.time() // WINDOW_SECONDS)
+	first = int((time.time() - seconds) // WINDOW_SECONDS)
+	return [frappe.cache.make_key(PROFILE_KEY.format(window)) for window in range(first, last + 1)]
+
+
+def _summarize(name, counters):
+	calls = int(counters["calls"]) or 1
+	cache_lookups = counters["cache_hits"] + counters["cache_misses"]
+	histogram = {str(bound): int(counters[f"le_{bound}"]) for bound in BUCKETS_MS}
+	histogram["inf"] = int(counters["le_inf"])
+	return {
+		"method": name,
+		"calls": int(counters["calls"]),
+		"total_ms": round(counters["wall_ms"], 1),
+		"mean_ms": round(counters["wall_ms"] / calls, 2),
+		"p50_ms": _bucket_percentile(histogram, calls, 50),
+		"p95_ms": _bucket_percentile(histogram, calls, 95),
+		"sql_per_call": round(counters["sql_count"] / calls, 2),
+		"sql_ms_per_call": round(counters["sql_ms"] / calls, 2),
+		"cache_hit_rate": round(counters["cache_hits"] / cache_lookups, 3) if cache_lookups else None,
+		"histogram": histogram,
+	}
+
+
+def _bucket_percentile(histogram, calls, pct):
+	"""Upper bound of the bucket holding the percentile, ``None`` past the last bucket"""
+	seen = 0
+	for bound, count in histogram.items():
+		seen += count
+		if seen * 100 >= calls * pct:
+			return None if bound == "inf" else int(bound)
+	return None
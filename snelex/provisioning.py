@@ -0,0 +1,168 @@
+# Copyright (c) 2025, Snelex and contributors
+# For license information, please see license.txt
+
+"""Background provisioning of the Customer every Shipper is invoiced as.
+
+A Shipper save no longer creates its Customer inline. ``queue_customer``
+checks the party cache and, only when the Customer is missing, queues
+``provision_customers`` once the save is committed. The job id is derived
+from the Shipper so repeated saves collapse into one queued job, and each
+Shipper is claimed with a short-lived Redis key before its Customer is
+inserted, so concurrent jobs never create it twice.
+
+``reconcile_customers`` walks every Shipper in keyset-paginated batches and
+provisions the missing Customers, committing once per batch. Data imports
+queue a single reconciliation instead of one job per row.
+"""
+
+import frappe
+from frappe.utils import cint
+
+from snelex.party import get_party
+from snelex.profiling import profiled
+
+PROVISION_BATCH_SIZE = 500
+CLAIM_KEY = "snelex:customer_provisioning:{}"
+CLAIM_TIMEOUT = 600
+RECONCILE_JOB_ID = "snelex_customer_reconciliation"
+
+
+@profiled
+def queue_customer(doc, method=None, *args):
+	"""doc_events handler for Shipper: queue its Customer when there is none yet"""
+	if frappe.flags.in_import:
+		# one reconciliation covers the whole import
+		enqueue_reconciliation()
+		return
+
+	if get_party("Customer", doc.name):
+		return
+
+	frappe.enqueue(
+		"snelex.provisioning.provision_customers",
+		queue="short",
+		job_id=f"snelex_customer::{doc.name}",
+		deduplicate=True,
+		enqueue_after_commit=True,
+		now=frappe.flags.in_test,
+		shippers=[doc.name],
+	)
+
+
+@frappe.whitelist(methods=["POST"])
+def reconcile_shipper_customers(batch_size=PROVISION_BATCH_SIZE):
+	"""Queue a reconciliation of Customers for every Shipper"""
+	frappe.only_for("System Manager")
+	enqueue_reconciliation(batch_size)
+
+
+def enqueue_reconciliation(batch_size=PROVISION_BATCH_SIZE):
+	if frappe.flags.snelex_reconciliation_queued:
+		return
+	frappe.flags.snelex_reconciliation_queued = True
+	frappe.enqueue(
+		"snelex.provisioning.reconcile_customers",
+		queue="long",
+		timeout=3600,
+		job_id=RECONCILE_JOB_ID,
+		deduplicate=True,
+		enqueue_after_commit=True,
+		now=frappe.flags.in_test,
+		batch_size=cint(batch_size) or PROVISION_BATCH_SIZE,
+	)
+
+
+def reconcile_customers(batch_size=PROVISION_BATCH_SIZE):
+	"""Background job: create the missing Customer of every Shipper, one batch at a time"""
+	batch_size = cint(batch_size) or PROVISION_BATCH_SIZE
+	summary = frappe._dict(checked=0, created=[], errors=[])
+	total = frappe.db.count("Shipper") or 1
+	last = ""
+	while True:
+		shippers = frappe.get_all(
+			"Shipper", filters={"name": [">", last]}, order_by="name asc", limit=batch_size, pluck="name"
+		)
+		if not shippers:
+			break
+
+		provision_customers(shippers, summary)
+		summary.checked += len(shippers)
+		last = shippers[-1]
+		frappe.publish_progress(
+			min(summary.checked, total) * 100 / total,
+			title="Reconciling Shipper Customers",
+			description=f"{summary.checked} Shippers checked, {len(summary.created)} Customers created",
+		)
+
+	return summary
+
+
+def provision_customers(shippers, summary=None):
+	"""Background job: create the Customers missing for ``shippers`` and commit"""
+	summary = summary or frappe._dict(checked=0, created=[], errors=[])
+	existing = set(
+		frappe.get_all("Customer", filters={"customer_name": ["in", shippers]}, pluck="customer_name")
+	)
+	missing = [shipper for shipper in shippers if shipper not in existing]
+	if not missing:
+		return summary
+
+	phones = _get_shipper_phones(missing)
+	claimed = []
+	for shipper in missing:
+		claim_key = frappe.cache.make_key(CLAIM_KEY.format(shipper))
+		if not frappe.cache.set(claim_key, 1, nx=True, ex=CLAIM_TIMEOUT):
+			# another job is creating this Customer right now
+			continue
+		claimed.append(claim_key)
+
+		savepoint = f"customer_{len(summary.created)}"
+		frappe.db.savepoint(savepoint)
+		try:
+			# the claim only serializes jobs, the row check makes retries idempotent
+			if not frappe.db.exists("Customer", {"customer_name": shipper}):
+				customer = frappe.new_doc("Customer")
+				customer.customer_name = shipper
+				customer.customer_type = "Individual"
+				if phones.get(shipper):
+					customer.mobile_no = phones[shipper]
+				customer.insert(ignore_permissions=True)
+				summary.created.append(customer.name)
+		except Exception as e:
+			frappe.db.rollback(save_point=savepoint)
+			frappe.clear_messages()
+			summary.errors.append({"shipper": shipper, "error": str(e)})
+			frappe.log_error(title=f"Customer provisioning failed for Shipper {shipper}")
+
+	if not frappe.flags.in_test:
+		# in tests the job runs inline, inside the Shipper save that queued it
+		frappe.db.commit()
+	for claim_key in claimed:
+		frappe.cache.delete(claim_key)
+	return summary
+
+
+def _get_shipper_phones(shippers):
+	"""Return ``{shipper: phone}`` from the Addresses linked to each Shipper"""
+	links = frappe.get_all(
+		"Dynamic Link",
+		filters={"link_doctype": "Shipper", "link_name": ["in", shippers], "parenttype": "Address"},
+		fields=["parent", "link_name"],
+		order_by="creation asc",
+	)
+	if not links:
+		return {}
+
+	phones = dict(
+		frappe.get_all(
+			"Address",
+			filters={"name": ["in", list({link.parent for link in links})]},
+			fields=["name", "phone"],
+			as_list=True,
+		)
+	)
+	result = {}
+	for link in links:
+		# the oldest linked address wins, like the single lookup it replaces
+		result.setdefault(link.link_name, phones.get(link.parent))
+	return result
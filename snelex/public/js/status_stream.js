@@ -0,0 +1,48 @@
+// Copyright (c) 2025, Snelex and contributors
+// For license information, please see license.txt
+
+// Applies the coalesced status deltas published by snelex.realtime to the open list view,
+// so dispatchers see Job Card, Manifest and Truck status changes without a list refresh.
+
+frappe.provide('snelex.status_stream');
+
+snelex.status_stream.DOCTYPES = ['Job Card', 'Manifest', 'Truck'];
+
+snelex.status_stream.apply = function(message) {
+	let listview = window.cur_list;
+	if (!listview || listview.doctype !== message.doctype || !listview.data) {
+		return;
+	}
+
+	let unknown = false;
+	Object.keys(message.changes).forEach(function(name) {
+		let row = listview.data.find(function(d) { return d.name === name; });
+		if (row) {
+			Object.assign(row, message.changes[name]);
+		} else {
+			unknown = true;
+		}
+	});
+
+	if (unknown) {
+		// a document that is not on this page may now match the filters
+		snelex.status_stream.refresh(listview);
+	} else {
+		listview.render();
+	}
+};
+
+snelex.status_stream.refresh = frappe.utils.debounce(function(listview) {
+	listview.refresh();
+}, 2000);
+
+$(document).on('app_ready', function() {
+	frappe.realtime.on('snelex_status_delta', snelex.status_stream.apply);
+	frappe.router.on('change', function() {
+		let route = frappe.get_route();
+		// auto refresh is off for these lists, so Desk does not join their room itself
+		if (route[0] === 'List' && snelex.status_stream.DOCTYPES.includes(route[1])) {
+			frappe.realtime.doctype_subscribe(route[1]);
+		}
+	});
+});
@@ -0,0 +1,175 @@
+# Copyright (c) 2025, Snelex and contributors
+# For license information, please see license.txt
+
+"""Lane rate engine: price Consignment Notes from Lane Tariffs.
+
+``compile_tariffs`` reads every enabled Lane Tariff with its rate rows in two
+queries. It turns them into ``{(from, to): [Tariff]}``, where each tariff
+keeps its sorted weight band bounds, and each weight band keeps its sorted
+CBM band bounds. ``RateEngine.price`` takes the newest tariff valid on the
+consignment date that has a band for the shipment, bisecting to the weight
+band and then the CBM band. That makes pricing a note a couple of dictionary
+and ``bisect`` lookups, with no queries.
+
+The compiled engine is pickled into Redis and memoised per request. Lane
+Tariff saves and deletions drop it.
+"""
+
+import math
+from bisect import bisect_left
+
+import frappe
+from frappe.utils import flt, getdate
+
+from snelex.profiling import count_cache, profiled
+
+TARIFF_CACHE_KEY = "snelex:lane_tariffs"
+PRICING_FIELDS = [
+	"name",
+	"consignment_date",
+	"consignment_from",
+	"consignment_to",
+	"total_weight_lbs",
+	"total_cbm",
+	"total_no_of_pieces",
+]
+RATE_FIELDS = [
+	"parent",
+	"weight_upto_lbs",
+	"cbm_upto",
+	"flat_rate",
+	"rate_per_lbs",
+	"rate_per_cbm",
+	"rate_per_piece",
+	"minimum_charge",
+]
+
+
+class Tariff:
+	"""One Lane Tariff compiled to ``weight bounds -> (cbm bounds, rules)``"""
+
+	__slots__ = ("bands", "item", "name", "valid_from", "valid_to", "weight_bounds")
+
+	def __init__(self, name, item, valid_from, valid_to, rates):
+		self.name = name
+		self.item = item
+		self.valid_from = getdate(valid_from) if valid_from else None
+		self.valid_to = getdate(valid_to) if valid_to else None
+
+		by_weight = {}
+		for rate in rates:
+			by_weight.setdefault(flt(rate.weight_upto_lbs) or math.inf, []).append(rate)
+		self.weight_bounds = sorted(by_weight)
+		self.bands = []
+		for bound in self.weight_bounds:
+			rules = sorted(by_weight[bound], key=lambda rate: flt(rate.cbm_upto) or math.inf)
+			self.bands.append(([flt(rate.cbm_upto) or math.inf for rate in rules], rules))
+
+	def is_valid_on(self, date):
+		return (not self.valid_from or self.valid_from <= date) and (
+			not self.valid_to or date <= self.valid_to
+		)
+
+	def find_rule(self, weight, cbm):
+		"""The rule of the smallest weight band, then the smallest CBM band, holding the shipment"""
+		index = bisect_left(self.weight_bounds, weight)
+		if index == len(self.weight_bounds):
+			return None
+		cbm_bounds, rules = self.bands[index]
+		index = bisect_left(cbm_bounds, cbm)
+		return rules[index] if index < len(rules) else None
+
+
+class RateEngine:
+	"""Compiled Lane Tariffs keyed by route"""
+
+	def __init__(self, lanes):
+		self.lanes = lanes
+
+	def price(self, note):
+		"""Return ``{"amount", "tariff", "item"}`` for ``note``, or None when no tariff covers it"""
+		date = getdate(note.consignment_date)
+		weight, cbm, pieces = flt(note.total_weight_lbs), flt(note.total_cbm), flt(note.total_no_of_pieces)
+		for tariff in self.lanes.get((note.consignment_from, note.consignment_to), ()):
+			if not tariff.is_valid_on(date):
+				continue
+			rule = tariff.find_rule(weight, cbm)
+			if rule is None:
+				# an older tariff of the lane may still have a band for it
+				continue
+			amount = (
+				flt(rule.flat_rate)
+				+ weight * flt(rule.rate_per_lbs)
+				+ cbm * flt(rule.rate_per_cbm)
+				+ pieces * flt(rule.rate_per_piece)
+			)
+			return frappe._dict(
+				amount=flt(max(amount, flt(rule.minimum_charge)), 2), tariff=tariff.name, item=tariff.item
+			)
+
+	def price_many(self, notes):
+		"""Return ``{note name: price}``; notes no tariff covers are left out"""
+		prices = {}
+		for note in notes:
+			price = self.price(note)
+			if price:
+				prices[note.name] = price
+		return prices
+
+
+def compile_tariffs():
+	"""Build a RateEngine from every enabled Lane Tariff"""
+	tariffs = frappe.get_all(
+		"Lane Tariff",
+		filters={"enabled": 1},
+		fields=["name", "consignment_from", "consignment_to", "item", "valid_from", "valid_to"],
+		# the newest tariff of a lane wins when validity periods overlap
+		order_by="valid_from desc, creation desc",
+	)
+	if not tariffs:
+		return RateEngine({})
+
+	rates = {}
+	for rate in frappe.get_all(
+		"Lane Tariff Rate",
+		filters={"parenttype": "Lane Tariff", "parent": ["in", [t.name for t in tariffs]]},
+		fields=RATE_FIELDS,
+	):
+		rates.setdefault(rate.parent, []).append(rate)
+
+	lanes = {}
+	for tariff in tariffs:
+		lanes.setdefault((tariff.consignment_from, tariff.consignment_to), []).append(
+			Tariff(tariff.name, tariff.item, tariff.valid_from, tariff.valid_to, rates.get(tariff.name, []))
+		)
+	return RateEngine(lanes)
+
+
+def get_rate_engine():
+	"""Compiled engine from the request memo, then Redis, compiling on a miss"""
+	engine = getattr(frappe.local, "snelex_rate_engine", None)
+	if engine is None:
+		engine = frappe.cache.get_value(TARIFF_CACHE_KEY)
+		count_cache(hits=int(engine is not None), misses=int(engine is None))
+		if engine is None:
+			engine = compile_tariffs()
+			frappe.cache.set_value(TARIFF_CACHE_KEY, engine)
+		frappe.local.snelex_rate_engine = engine
+	return engine
+
+
+@profiled
+def clear_tariff_cache(doc=None, method=None):
+	"""doc_events handler for Lane Tariff"""
+	frappe.cache.delete_value(TARIFF_CACHE_KEY)
+	frappe.local.snelex_rate_engine = None
+
+
+@frappe.whitelist()
+@profiled
+def price_consignment_notes(consignment_notes):
+	"""Return ``{note: price}`` for the given Consignment Notes"""
+	frappe.has_permission("Consignment Note", "read", throw=True)
+	names = frappe.parse_json(consignment_notes) or []
+	notes = frappe.get_list("Consignment Note", filters={"name": ["in", names]}, fields=PRICING_FIELDS)
+	return get_rate_engine().price_many(notes)
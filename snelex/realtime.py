@@ -0,0 +1,103 @@
+# Copyright (c) 2025, Snelex and contributors
+# For license information, please see license.txt
+
+"""Coalesced realtime status deltas for dispatcher list views.
+
+``queue_status_delta`` runs from ``on_change`` of Job Card, Manifest and
+Truck. When a watched status field changed it buffers ``{name: {field:
+value}}`` for the request. After commit the buffer is merged into a Redis
+hash per doctype, so a later change to the same document replaces the
+earlier one. The first change of a window queues ``publish_status_deltas``.
+That job waits out the window, drains the hash and sends one
+``snelex_status_delta`` message to the doctype room. A bulk update therefore
+reaches each open list as a single event, which ``status_stream.js`` applies
+to the rows on screen without querying again.
+"""
+
+import pickle
+import time
+
+import frappe
+
+from snelex.profiling import profiled
+
+STATUS_DELTA_EVENT = "snelex_status_delta"
+PENDING_KEY = "snelex:status_deltas:{0}"
+WINDOW_KEY = "snelex:status_deltas:{0}:window"
+COALESCE_SECONDS = 1
+
+# doctype -> fields whose changes are pushed to list views
+WATCHED_FIELDS = {
+	"Job Card": ("job_status",),
+	"Manifest": ("status",),
+	"Truck": ("status",),
+}
+
+
+@profiled
+def queue_status_delta(doc, method=None):
+	"""doc_events handler: buffer the watched fields of ``doc`` that changed in this save"""
+	fields = WATCHED_FIELDS.get(doc.doctype)
+	if not fields:
+		return
+
+	changed = {field: doc.get(field) for field in fields if doc.has_value_changed(field)}
+	if not changed:
+		return
+
+	if not hasattr(frappe.local, "snelex_status_deltas"):
+		frappe.local.snelex_status_deltas = {}
+		frappe.db.after_commit.add(flush_status_deltas)
+		frappe.db.after_rollback.add(discard_status_deltas)
+
+	delta = frappe.local.snelex_status_deltas.setdefault(doc.doctype, {}).setdefault(doc.name, {})
+	delta.update(changed, modified=str(doc.modified))
+
+
+def flush_status_deltas():
+	"""Hand the committed deltas of this request to the per-doctype coalescing window"""
+	buffered = getattr(frappe.local, "snelex_status_deltas", None) or {}
+	discard_status_deltas()
+
+	for doctype, deltas in buffered.items():
+		pending_key = frappe.cache.make_key(PENDING_KEY.format(doctype))
+		pipe = frappe.cache.pipeline()
+		for name, delta in deltas.items():
+			pipe.hset(pending_key, name, pickle.dumps(delta))
+		pipe.expire(pending_key, 3600)
+		pipe.execute()
+
+		window_key = frappe.cache.make_key(WINDOW_KEY.format(doctype))
+		if frappe.cache.set(window_key, 1, nx=True, ex=COALESCE_SECONDS):
+			frappe.enqueue(
+				"snelex.realtime.publish_status_deltas",
+				queue="short",
+				now=frappe.flags.in_test,
+				doctype=doctype,
+				wait=0 if frappe.flags.in_test else COALESCE_SECONDS,
+			)
+
+
+def discard_status_deltas():
+	"""Drop the deltas of a rolled back transaction"""
+	if hasattr(frappe.local, "snelex_status_deltas"):
+		del frappe.local.snelex_status_deltas
+
+
+def publish_status_deltas(doctype, wait=COALESCE_SECONDS):
+	"""Background job: after the window closes, publish every pending delta of ``doctype`` at once"""
+	if wait:
+		time.sleep(wait)
+
+	pending_key = frappe.cache.make_key(PENDING_KEY.format(doctype))
+	pipe = frappe.cache.pipeline()
+	pipe.hgetall(pending_key)
+	pipe.delete(pending_key)
+	pending, _deleted = pipe.execute()
+	if not pending:
+		# an earlier job of an overlapping window already sent these
+		return
+
+	changes = {name.decode(): pickle.loads(value) for name, value in pending.items()}
+	frappe.publish_realtime(STATUS_DELTA_EVENT, {"doctype": doctype, "changes": changes}, doctype=doctype)
+	return changes
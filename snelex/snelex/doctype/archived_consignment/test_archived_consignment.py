@@ -0,0 +1,104 @@
+# Copyright (c) 2025, sammish and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, today
+
+from snelex.analytics import refresh_status_dates
+from snelex.archival import archive_consignments, get_closed_consignments, get_consignment_note
+from snelex.snelex.doctype.shipper.test_shipper import make_test_shipper
+from snelex.tracking import get_tracking_entries
+
+
+def count_cancelled(date):
+	return sum(
+		frappe.get_all(
+			"Daily Status Summary",
+			filters={
+				"reference_doctype": "Consignment Note",
+				"date": date,
+				"location": "Archive Destination",
+				"status": "Cancelled",
+			},
+			pluck="count",
+		)
+	)
+
+
+class TestArchivedConsignment(FrappeTestCase):
+	def make_note(self):
+		for name in ("Archive Origin", "Archive Destination"):
+			if not frappe.db.exists("Location", name):
+				frappe.get_doc({"doctype": "Location", "location_name": name}).insert(ignore_permissions=True)
+
+		return frappe.get_doc(
+			{
+				"doctype": "Consignment Note",
+				"consignment_date": add_days(today(), -400),
+				"tracking_no": frappe.generate_hash(length=12),
+				"consignment_from": "Archive Origin",
+				"consignment_to": "Archive Destination",
+				"shipper": make_test_shipper().name,
+				"product": "Test product",
+				"payment_by": "3rd Party",
+				"number_of_cartons": 1,
+			}
+		).submit()
+
+	def test_archived_note_stays_readable(self):
+		"""An archived note leaves the live table but prints and tracks as before"""
+		note = self.make_note()
+		self.assertEqual(
+			get_tracking_entries([note.tracking_no])[note.tracking_no].consignment_to, "Archive Destination"
+		)
+
+		self.assertEqual(archive_consignments([note.name]), 1)
+		self.assertFalse(frappe.db.exists("Consignment Note", note.name))
+
+		archived = get_consignment_note(note.name)
+		self.assertTrue(archived.flags.archived)
+		self.assertEqual(archived.tracking_no, note.tracking_no)
+		self.assertEqual(archived.consignment_to, "Archive Destination")
+
+		entry = get_tracking_entries([note.tracking_no])[note.tracking_no]
+		self.assertEqual(entry.tracking_no, note.tracking_no)
+		self.assertEqual(entry.current_location, "Archive Origin")
+
+	def test_only_closed_notes_are_archived(self):
+		"""Submitted notes without closed Job Cards stay live, cancelled ones are archived"""
+		open_note = self.make_note()
+		cancelled = self.make_note()
+		cancelled.cancel()
+
+		self.assertEqual(get_closed_consignments([open_note.name, cancelled.name]), [cancelled.name])
+
+	def test_referenced_notes_stay_live(self):
+		"""Invoiced, amended and amending notes are not archived, so no Link is left dangling"""
+		invoiced = self.make_note()
+		invoiced.cancel()
+		frappe.db.set_value("Consignment Note", invoiced.name, "sales_invoice", "SINV-ARCHIVE-TEST")
+
+		amended = self.make_note()
+		amended.cancel()
+		amendment = frappe.copy_doc(amended)
+		amendment.amended_from = amended.name
+		amendment.insert()
+		amendment.submit()
+		amendment.cancel()
+
+		names = [invoiced.name, amended.name, amendment.name]
+		self.assertEqual(get_closed_consignments(names), [])
+
+	def test_status_counts_keep_archived_notes(self):
+		"""Archiving a note moves its count to an archived row; later refreshes leave it in the total"""
+		note = self.make_note()
+		note.cancel()
+		refresh_status_dates({"Consignment Note": [note.consignment_date]})
+		cancelled = count_cancelled(note.consignment_date)
+
+		archive_consignments([note.name])
+		self.assertEqual(count_cancelled(note.consignment_date), cancelled)
+
+		refresh_status_dates({"Consignment Note": [note.consignment_date]})
+		self.assertEqual(count_cancelled(note.consignment_date), cancelled)
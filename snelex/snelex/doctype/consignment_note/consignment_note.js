@@ -3,6 +3,8 @@
 
 frappe.ui.form.on('Consignment Note', {
 	refresh: function(frm) {
+		// details on a loaded form belong to its current links
+		frm.snelex_form_context_links = get_form_context_args(frm);
 
 		// if (!frm.doc.consignment_date) {
 		// 	frm.set_value('consignment_date', frappe.datetime.get_today());
@@ -50,111 +52,26 @@ frappe.ui.form.on('Consignment Note', {
 	},
 
 	shipper: function(frm) {
-	    if (frm.doc.shipper) {
-	        set_invoiced_to(frm)
-	        frappe.call({
-	            method: 'snelex.snelex.doctype.consignment_note.consignment_note.get_shipper_details',
-	            args: { shipper: frm.doc.shipper },
-	            callback: function(r) {
-	                if (r.message) {
-	                    frm.set_value('shipper_display_name', r.message.display_name);
-	                    frm.set_value('shipper_address', r.message.address);
-	                    frm.set_value('shipper_phone', r.message.phone);
-	                    frm.set_value('shipper_fax', r.message.fax);
-	                    frm.set_value('shipper_email', r.message.email);
-
-	                    // if (frm.doc.payment_by == "Shipper") {
-											//
-										  //    frm.set_value('invoiced_to_display_name', r.message.display_name);
-										  //    frm.set_value('invoiced_to_address', r.message.address);
-										  //    frm.set_value('invoiced_to_phone', r.message.phone);
-										  //    frm.set_value('invoiced_to_fax', r.message.fax);
-										  //    frm.set_value('invoiced_to_email', r.message.email);
-											//
-	                    // }
-	                }
-	            }
-	        });
-	    } else {
-	        frm.set_value('shipper_display_name', '');
-	        frm.set_value('shipper_address', '');
-	        frm.set_value('shipper_phone', '');
-	        frm.set_value('shipper_fax', '');
-	        frm.set_value('shipper_email', '');
-	    }
+		refresh_form_context(frm);
 	},
 
 	consignee_customer: function(frm) {
-	    if (frm.doc.consignee_customer) {
-	        frappe.call({
-	            method: 'snelex.snelex.doctype.consignment_note.consignment_note.get_customer_details',
-	            args: { customer: frm.doc.consignee_customer },
-	            callback: function(r) {
-	                if (r.message) {
-	                    frm.set_value('consignee_display_name', r.message.display_name);
-	                    frm.set_value('consignee_address', r.message.address);
-	                    frm.set_value('consignee_phone', r.message.phone);
-	                    frm.set_value('consignee_email', r.message.email);
-	                    frm.set_value('consignee_fax', r.message.fax);
-
-											frm.set_value('delivery_contact_person', r.message.display_name);
-											frm.set_value('name1', r.message.display_name);
-											frm.set_value('delivery_address', r.message.address);
-											frm.set_value('delivery_phone', r.message.phone);
-											frm.set_value('delivery_email', r.message.email);
-											frm.set_value('delivery_fax', r.message.fax);
-
-
-	                    if (frm.doc.payment_by == "Receiver") {
-	                        frm.set_value('invoiced_to', r.message.display_name);
-	                        frm.set_value('invoiced_to_display_name', r.message.display_name);
-	                        frm.set_value('invoiced_to_address', r.message.address);
-	                        frm.set_value('invoiced_to_phone', r.message.phone);
-	                        frm.set_value('invoiced_to_fax', r.message.fax);
-	                        frm.set_value('invoiced_to_email', r.message.email);
-	                    }
-	                }
-	            }
-	        });
-	    } else {
-	        frm.set_value('consignee_display_name', '');
-	        frm.set_value('consignee_address', '');
-	        frm.set_value('consignee_phone', '');
-	        frm.set_value('consignee_email', '');
-	        frm.set_value('consignee_fax', '');
-	        frm.set_value('consignee_web', '');
-	    }
+		refresh_form_context(frm);
 	},
 
 	invoiced_to: function(frm) {
-        if (frm.doc.invoiced_to) {
-            frappe.call({
-                method: "snelex.snelex.doctype.consignment_note.consignment_note.get_customer_details",
-                args: {
-                    customer: frm.doc.invoiced_to
-                },
-                callback: function(r) {
-                    if (r.message) {
-                        let d = r.message;
-                        frm.set_value("invoiced_to_display_name", d.display_name);
-                        frm.set_value("invoiced_to_address", d.address);
-                        frm.set_value("invoiced_to_phone", d.phone);
-                        frm.set_value("invoiced_to_fax", d.fax);
-                        frm.set_value("invoiced_to_email", d.email);
-                    }
-                }
-            });
-        }
-  },
+		refresh_form_context(frm);
+	},
+
 	payment_by: function(frm) {
 		if (frm.doc.payment_by === 'Shipper') {
 			frm.set_df_property('shipper', 'reqd', 1);
 			frm.set_df_property('consignee_customer', 'reqd', 0);
-			set_invoiced_to_from_shipper(frm);
+			refresh_form_context(frm);
 		} else if (frm.doc.payment_by === 'Receiver') {
 			frm.set_df_property('shipper', 'reqd', 0);
 			frm.set_df_property('consignee_customer', 'reqd', 1);
-			set_invoiced_to_from_consignee(frm);
+			refresh_form_context(frm);
 		} else {
 			frm.set_df_property('shipper', 'reqd', 0);
 			frm.set_df_property('consignee_customer', 'reqd', 0);
@@ -217,19 +134,9 @@ frappe.ui.form.on('Consignment Note', {
 		if (frm.doc.payment_by === 'Receiver' && !frm.doc.consignee_customer) {
 			frappe.throw(__('Consignee (Customer) is required when Payment By is Receiver'));
 		}
-	},
-	validate: function(frm) {
-		set_invoiced_to(frm);
 	}
 });
 
-function set_invoiced_to(frm){
-	if (frm.doc.payment_by == "Shipper") {
-			frm.set_value("invoiced_to", frm.doc.shipper);
-			frm.set_value("invoiced_to_display_name", frm.doc.shipper);
-	}
-}
-
 // Helper function to calculate total pieces
 function calculate_total_pieces(frm) {
 	let total = 0;
@@ -253,50 +160,105 @@ function calculate_total_pieces(frm) {
 	frm.set_value('total_no_of_pieces', total);
 }
 
-// Helper function to set invoiced to from shipper details
-function set_invoiced_to_from_shipper(frm) {
-	if (frm.doc.shipper) {
-		// Check if supplier has a linked customer
-		frappe.call({
-			method: 'frappe.client.get_value',
-			args: {
-				doctype: 'Customer',
-				filters: {'supplier': frm.doc.shipper},
-				fieldname: 'name'
-			},
-			callback: function(r) {
-				if (r.message && r.message.name) {
-					frm.set_value('invoiced_to', r.message.name);
-				} else {
-					frm.set_value('invoiced_to', '');
-				}
-				// Set invoiced to details from shipper
-				frm.set_value('invoiced_to_display_name', frm.doc.shipper_display_name);
-				frm.set_value('invoiced_to_address', frm.doc.shipper_address);
-				frm.set_value('invoiced_to_phone', frm.doc.shipper_phone);
-				frm.set_value('invoiced_to_fax', frm.doc.shipper_fax);
-				frm.set_value('invoiced_to_email', frm.doc.shipper_email);
-				frm.set_value('invoiced_to_web', frm.doc.shipper_web);
+const FORM_CONTEXT_METHOD = 'snelex.snelex.doctype.consignment_note.consignment_note.get_form_context';
+const PARTY_CARD_FIELDS = ['display_name', 'address', 'phone', 'fax', 'email'];
+
+// form contexts already fetched in this browser session, keyed by the links asked for
+const form_context_cache = {};
+
+// Links the form context depends on; invoiced_to only counts for 3rd party payment
+function get_form_context_args(frm) {
+	let third_party = !['Shipper', 'Receiver'].includes(frm.doc.payment_by);
+	return {
+		shipper: frm.doc.shipper || '',
+		consignee_customer: frm.doc.consignee_customer || '',
+		invoiced_to: third_party ? frm.doc.invoiced_to || '' : ''
+	};
+}
+
+// Collapse bursts of link changes into one get_form_context call
+function refresh_form_context(frm) {
+	if (!frm.snelex_refresh_form_context) {
+		frm.snelex_refresh_form_context = frappe.utils.debounce(() => load_form_context(frm), 300);
+	}
+	frm.snelex_refresh_form_context();
+}
+
+function load_form_context(frm) {
+	let args = get_form_context_args(frm);
+	let key = JSON.stringify(args);
+	if (form_context_cache[key]) {
+		apply_form_context(frm, args, form_context_cache[key]);
+		return;
+	}
+
+	frappe.call({
+		method: FORM_CONTEXT_METHOD,
+		args: args,
+		callback: function(r) {
+			form_context_cache[key] = r.message || {};
+			// links may have changed again while the call was in flight
+			if (key === JSON.stringify(get_form_context_args(frm))) {
+				apply_form_context(frm, args, form_context_cache[key]);
 			}
-		});
-	} else {
-		clear_invoiced_to_details(frm);
+		}
+	});
+}
+
+// Fill only what belongs to links that changed, so edited details survive other changes
+function apply_form_context(frm, args, context) {
+	let applied = frm.snelex_form_context_links || {};
+	let values = {};
+
+	if (args.shipper !== applied.shipper) {
+		Object.assign(values, get_party_values('shipper', context.shipper, !args.shipper));
 	}
+
+	if (args.consignee_customer !== applied.consignee_customer) {
+		Object.assign(values, get_party_values('consignee', context.consignee, !args.consignee_customer));
+		if (args.consignee_customer) {
+			let consignee = context.consignee || {};
+			Object.assign(values, {
+				delivery_contact_person: args.consignee_customer,
+				name1: consignee.display_name || '',
+				delivery_address: consignee.address || '',
+				delivery_phone: consignee.phone || '',
+				delivery_email: consignee.email || '',
+				delivery_fax: consignee.fax || ''
+			});
+		}
+	}
+
+	if (frm.doc.payment_by === 'Shipper') {
+		values.invoiced_to = args.shipper ? context.shipper_customer || '' : '';
+		copy_to_invoiced_to(frm, values, 'shipper');
+	} else if (frm.doc.payment_by === 'Receiver') {
+		values.invoiced_to = args.consignee_customer;
+		copy_to_invoiced_to(frm, values, 'consignee');
+	} else if (args.invoiced_to && args.invoiced_to !== applied.invoiced_to) {
+		Object.assign(values, get_party_values('invoiced_to', context.invoiced_to));
+	}
+
+	frm.snelex_form_context_links = args;
+	frm.set_value(values);
 }
 
-// Helper function to set invoiced to from consignee details
-function set_invoiced_to_from_consignee(frm) {
-	if (frm.doc.consignee_customer) {
-		frm.set_value('invoiced_to', frm.doc.consignee_customer);
-		frm.set_value('invoiced_to_display_name', frm.doc.consignee_display_name);
-		frm.set_value('invoiced_to_address', frm.doc.consignee_address);
-		frm.set_value('invoiced_to_phone', frm.doc.consignee_phone);
-		frm.set_value('invoiced_to_fax', frm.doc.consignee_fax);
-		frm.set_value('invoiced_to_email', frm.doc.consignee_email);
-		frm.set_value('invoiced_to_web', frm.doc.consignee_web);
-	} else {
-		clear_invoiced_to_details(frm);
+function get_party_values(prefix, card, clear_web) {
+	let values = {};
+	PARTY_CARD_FIELDS.forEach((field) => {
+		values[prefix + '_' + field] = (card || {})[field] || '';
+	});
+	if (clear_web) {
+		values[prefix + '_web'] = '';
 	}
+	return values;
+}
+
+function copy_to_invoiced_to(frm, values, prefix) {
+	PARTY_CARD_FIELDS.concat(['web']).forEach((field) => {
+		let source = prefix + '_' + field;
+		values['invoiced_to_' + field] = (source in values ? values[source] : frm.doc[source]) || '';
+	});
 }
 
 // Helper function to clear invoiced to details
@@ -3,10 +3,17 @@
 
 import frappe
 from frappe.model.document import Document
-from frappe.utils import flt
-import re
-from erpnext.accounts.party import get_party_details
+from frappe.utils import flt, get_datetime
 
+from snelex.party import get_parties, get_party, get_party_card
+from snelex.profiling import profiled
+
+
+# party link field -> (linked doctype, field that shows the party was fetched into the form)
+PARTY_LINK_FIELDS = {
+	"shipper": ("Shipper", "shipper_display_name"),
+	"consignee_customer": ("Customer", "consignee_display_name"),
+}
 
 
 class ConsignmentNote(Document):
@@ -15,9 +22,7 @@ class ConsignmentNote(Document):
 		self.validate_locations()
 		self.calculate_total_pieces()
 		self.validate_payment_details()
-		self.fetch_shipper_details()
-		self.fetch_customer_details()
-		self.set_invoiced_to()
+		self.update_party_details()
 
 	def validate_locations(self):
 		"""Validate that consignment from and to are different"""
@@ -51,83 +56,106 @@ class ConsignmentNote(Document):
 		elif self.payment_by == "Receiver" and not self.consignee_customer:
 			frappe.throw("Consignee (Customer) is required when Payment By is Receiver")
 
+	def update_party_details(self):
+		"""Refresh shipper, consignee and invoicing details whose source changed"""
+		self.flags.parties_to_fetch = self.get_parties_to_fetch()
+		self.resolve_parties()
+		self.fetch_shipper_details()
+		self.fetch_customer_details()
+		self.set_invoiced_to()
+
+	def get_parties_to_fetch(self):
+		"""Return the party links whose details must be fetched again.
+
+		Details already on the note are trusted while their link is unchanged
+		and the party was not modified since the note was last saved. The
+		modified check reads the party cache, so unchanged saves cost no queries.
+		"""
+		before = None if self.is_new() else self.get_doc_before_save()
+		to_fetch, unchanged = set(), {}
+		for field, (link_doctype, display_field) in PARTY_LINK_FIELDS.items():
+			if not self.get(field):
+				continue
+			if not before or before.get(field) != self.get(field) or not self.get(display_field):
+				to_fetch.add(field)
+			else:
+				unchanged[field] = (link_doctype, self.get(field))
+
+		if unchanged:
+			saved = get_datetime(before.modified)
+			parties = get_parties(list(unchanged.values()))
+			for field, key in unchanged.items():
+				party = parties.get(key)
+				if party and get_datetime(party.modified) > saved:
+					to_fetch.add(field)
+
+		return to_fetch
+
+	def invoicing_party_changed(self):
+		before = None if self.is_new() else self.get_doc_before_save()
+		return (
+			"shipper" in self.flags.parties_to_fetch
+			or not before
+			or before.payment_by != self.payment_by
+			or not self.invoiced_to
+		)
+
+	def resolve_parties(self):
+		"""Resolve shipper, consignee and invoicing party in one batched lookup"""
+		parties = []
+		if "shipper" in self.flags.parties_to_fetch:
+			parties.append(("Shipper", self.shipper))
+		if "consignee_customer" in self.flags.parties_to_fetch:
+			parties.append(("Customer", self.consignee_customer))
+		if self.payment_by == "Shipper" and self.invoicing_party_changed():
+			# a Customer named after the Shipper is billed for shipper-paid notes
+			parties.append(("Customer", self.shipper))
+		if parties:
+			get_parties(parties)
+
 	def fetch_shipper_details(self):
-		"""Fetch supplier details when shipper supplier is selected"""
-		if self.shipper:
-			shipper = frappe.get_doc("Shipper", self.shipper)
-			self.shipper_display_name = shipper.name
-
-			# Fetch primary address
-			address = frappe.db.get_value("Dynamic Link",
-				{"link_doctype": "Shipper", "link_name": self.name, "parenttype": "Address"},
-				"parent")
-
-			if address:
-				address_doc = frappe.get_doc("Address", address)
-				self.address = address_doc.get_display()
-
-			# Fetch primary contact
-			contact = frappe.db.get_value("Dynamic Link",
-				{"link_doctype": "Shipper", "link_name": self.name, "parenttype": "Contact"},
-				"parent")
-
-			if contact:
-				contact_doc = frappe.get_doc("Contact", contact)
-				self.shipper_phone = contact_doc.phone
-				self.shipper_email = contact_doc.email_id
-				self.shipper_fax =  contact_doc.fax
+		"""Fetch shipper details when shipper is selected"""
+		if "shipper" in self.flags.parties_to_fetch:
+			shipper = get_party("Shipper", self.shipper)
+			if not shipper:
+				return
+
+			self.shipper_display_name = shipper.display_name
+			if shipper.address_name:
+				self.shipper_address = shipper.address
+			if shipper.address_name or shipper.contact_name:
+				self.shipper_phone = shipper.phone
+				self.shipper_email = shipper.email
+				self.shipper_fax = shipper.fax
 
 	def fetch_customer_details(self):
-	    """Fetch customer details when consignee customer is selected"""
-	    if self.consignee_customer:
-	        # Get Customer doc
-	        customer = frappe.get_doc("Customer", self.consignee_customer)
-	        self.consignee_display_name = customer.customer_name
-
-	        # Fetch primary address
-	        address = frappe.db.get_value(
-	            "Dynamic Link",
-	            {
-	                "link_doctype": "Customer",
-	                "link_name": self.consignee_customer,   # FIXED
-	                "parenttype": "Address"
-	            },
-	            "parent"
-	        )
-
-	        if address:
-	            address_doc = frappe.get_doc("Address", address)
-	            self.consignee_address = address_doc.get_display()
-
-	        # Fetch primary contact
-	        contact = frappe.db.get_value(
-	            "Dynamic Link",
-	            {
-	                "link_doctype": "Customer",
-	                "link_name": self.consignee_customer,   # FIXED
-	                "parenttype": "Contact"
-	            },
-	            "parent"
-	        )
-
-	        if contact:
-	            contact_doc = frappe.get_doc("Contact", contact)
-	            self.consignee_phone = contact_doc.phone
-	            self.consignee_email = contact_doc.email_id
-	            self.consignee_fax = contact_doc.fax
+		"""Fetch customer details when consignee customer is selected"""
+		if "consignee_customer" in self.flags.parties_to_fetch:
+			customer = get_party("Customer", self.consignee_customer)
+			if not customer:
+				return
+
+			self.consignee_display_name = customer.display_name
+			if customer.address_name:
+				self.consignee_address = customer.address
+			if customer.contact_name:
+				self.consignee_phone = customer.phone
+				self.consignee_email = customer.email
+				self.consignee_fax = customer.fax
 
 	def set_invoiced_to(self):
 		"""Set invoiced to based on payment by selection"""
 		if self.payment_by == "Shipper":
 			# Convert shipper supplier to customer if exists, otherwise use shipper details
 			if self.shipper:
-				# Check if supplier has a linked customer
-				customer = frappe.db.get_value("Customer", {"name": self.shipper}, "name")
-				if customer:
-					self.invoiced_to = customer
-				else:
-					# Create customer from supplier if needed or use shipper details
-					self.invoiced_to = ""
+				if self.invoicing_party_changed():
+					# Check if supplier has a linked customer
+					customer = get_party("Customer", self.shipper)
+					if customer:
+						self.invoiced_to = customer.name
+					else:
+						# Create customer from supplier if needed or use shipper details
+						self.invoiced_to = ""
 				self.set_invoiced_to_details_from_shipper()
 		elif self.payment_by == "Receiver":
 			# Use consignee customer details
@@ -210,66 +238,42 @@ class ConsignmentNote(Document):
 		return {}
 
 
+def on_doctype_update():
+	frappe.db.add_index("Consignment Note", ["consignment_to", "consignment_date", "docstatus"])
+	# billing walks uninvoiced notes by party and date
+	frappe.db.add_index("Consignment Note", ["invoiced_to", "consignment_date"])
+
+
 @frappe.whitelist()
+@profiled
 def get_customer_details(customer):
-    """Get customer details for client-side population from Customer doctype"""
-    if not customer:
-        return {}
-
-    customer_doc = frappe.get_doc("Customer", customer)
-
-    # Use ERPNext helper to get address + contact
-    party_details = get_party_details(party=customer, party_type="Customer")
-
-    details = {
-        "display_name": customer_doc.customer_name,
-        "address": "",
-        "phone": "",
-        "fax": "",
-        "email": ""
-    }
-
-    # Address
-    if party_details.get("address_display"):
-        raw_address = party_details.get("address_display")
-        plain_address = re.sub(r'<br\s*/?>', '\n', raw_address)
-        details["address"] = plain_address.strip()
-
-    # Contact (not from address_doc!)
-    if party_details.get("contact_person"):
-        contact_doc = frappe.get_doc("Contact", party_details.get("contact_person"))
-        details["phone"] = contact_doc.phone or contact_doc.mobile_no or ""
-        details["fax"] = contact_doc.fax or ""
-        details["email"] = contact_doc.email_id or ""
-
-    return details
+	"""Get customer details for client-side population from Customer doctype"""
+	if not customer:
+		return {}
+	return get_party_card("Customer", customer)
+
 
 @frappe.whitelist()
+@profiled
 def get_shipper_details(shipper):
+	"""Get shipper details for client-side population from Shipper doctype"""
 	if not shipper:
 		return {}
+	return get_party_card("Shipper", shipper)
 
-	shipper_doc = frappe.get_doc("Shipper", shipper)
 
-	details = {
-		"display_name": shipper_doc.shipper or shipper_doc.name,
-		"address": "",
-		"phone": "",
-		"fax": "",
-		"email": ""
+@frappe.whitelist()
+@profiled
+def get_form_context(shipper=None, consignee_customer=None, invoiced_to=None):
+	"""Return every party card the form fills from its links in one call"""
+	parties = get_parties(
+		[("Shipper", shipper), ("Customer", consignee_customer), ("Customer", shipper), ("Customer", invoiced_to)]
+	)
+	# cards below come from the request memo filled by get_parties
+	shipper_customer = parties.get(("Customer", shipper))
+	return {
+		"shipper": get_party_card("Shipper", shipper) if shipper else {},
+		"consignee": get_party_card("Customer", consignee_customer) if consignee_customer else {},
+		"shipper_customer": shipper_customer.name if shipper_customer else "",
+		"invoiced_to": get_party_card("Customer", invoiced_to) if invoiced_to else {},
 	}
-
-	if shipper_doc.address:
-		address_doc = frappe.get_doc("Address", shipper_doc.address)
-
-		# Get display address without HTML <br>
-		raw_address = address_doc.get_display() or ""
-		plain_address = re.sub(r'<br\s*/?>', '\n', raw_address)  # replace <br> with newline
-		details["address"] = plain_address.strip()
-
-		# Other details
-		details["phone"] = address_doc.phone or ""
-		details["fax"] = address_doc.fax or ""
-		details["email"] = address_doc.email_id or ""
-
-	return details
@@ -0,0 +1,133 @@
+// Copyright (c) 2025, Snelex and contributors
+// For license information, please see license.txt
+
+frappe.listview_settings['Consignment Note'] = {
+	onload: function(listview) {
+		listview.page.add_actions_menu_item(__('Create Job Cards'), function() {
+			let selected = listview.get_checked_items(true);
+			let args = selected.length
+				? { consignment_notes: selected }
+				: { filters: listview.get_filters_for_args() };
+
+			frappe.confirm(
+				selected.length
+					? __('Create Job Cards for {0} selected Consignment Notes?', [selected.length])
+					: __('Create Job Cards for all submitted Consignment Notes matching the current filters?'),
+				function() {
+					frappe.call({
+						method: 'snelex.snelex.doctype.job_card.job_card.create_job_cards_from_consignment_notes',
+						args: args,
+						callback: function() {
+							frappe.show_alert({
+								message: __('Job Card creation queued'),
+								indicator: 'blue'
+							});
+						}
+					});
+				}
+			);
+		});
+
+		listview.page.add_menu_item(__('Export (Background)'), function() {
+			frappe.prompt({
+				fieldname: 'file_format',
+				label: __('Format'),
+				fieldtype: 'Select',
+				options: 'CSV\nXLSX\nNDJSON',
+				default: 'CSV'
+			}, function(values) {
+				frappe.call({
+					method: 'snelex.data_export.export_documents',
+					args: {
+						doctype: 'Consignment Note',
+						filters: listview.get_filters_for_args(),
+						file_format: values.file_format
+					},
+					callback: function() {
+						frappe.show_alert({
+							message: __('Export queued'),
+							indicator: 'blue'
+						});
+					}
+				});
+			}, __('Export Consignment Notes'));
+		});
+
+		listview.page.add_menu_item(__('Create Sales Invoices'), function() {
+			frappe.prompt([
+				{
+					fieldname: 'from_date',
+					label: __('From Date'),
+					fieldtype: 'Date',
+					default: frappe.datetime.month_start(),
+					reqd: 1
+				},
+				{
+					fieldname: 'to_date',
+					label: __('To Date'),
+					fieldtype: 'Date',
+					default: frappe.datetime.month_end(),
+					reqd: 1
+				},
+				{
+					fieldname: 'period',
+					label: __('Billing Period'),
+					fieldtype: 'Select',
+					options: 'Monthly\nWeekly\nDaily',
+					default: 'Monthly'
+				},
+				{
+					fieldname: 'company',
+					label: __('Company'),
+					fieldtype: 'Link',
+					options: 'Company',
+					default: frappe.defaults.get_user_default('Company')
+				}
+			], function(values) {
+				frappe.call({
+					method: 'snelex.invoicing.create_sales_invoices',
+					args: values,
+					callback: function() {
+						frappe.show_alert({
+							message: __('Invoicing queued'),
+							indicator: 'blue'
+						});
+					}
+				});
+			}, __('Invoice Consignment Notes'));
+		});
+
+		frappe.realtime.on('snelex_invoicing', function(progress) {
+			if (progress.finished) {
+				frappe.msgprint(__('{0} Sales Invoices created for {1} Consignment Notes, {2} notes without a tariff, {3} invoices failed', [
+					progress.invoices, progress.billed, progress.unpriced, progress.failed
+				]));
+				listview.refresh();
+			} else {
+				frappe.show_alert({
+					message: __('{0} Sales Invoices created', [progress.invoices]),
+					indicator: 'blue'
+				});
+			}
+		});
+
+		frappe.realtime.on('snelex_data_export', function(progress) {
+			if (progress.finished) {
+				frappe.hide_progress();
+				frappe.msgprint(__('{0} {1} exported: <a href="{2}">download</a>', [
+					progress.exported, __(progress.doctype), progress.file_url
+				]));
+			} else {
+				frappe.show_progress(__('Exporting {0}', [__(progress.doctype)]),
+					progress.exported, progress.total || progress.exported);
+			}
+		});
+
+		frappe.realtime.on('snelex_job_card_creation', function(summary) {
+			frappe.msgprint(__('{0} Job Cards created, {1} skipped, {2} failed', [
+				summary.created.length, summary.skipped.length, summary.errors.length
+			]));
+			listview.refresh();
+		});
+	}
+};
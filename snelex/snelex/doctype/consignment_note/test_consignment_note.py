@@ -5,6 +5,16 @@ import frappe
 import unittest
 from frappe.utils import today, add_days
 
+from snelex.benchmarks import count_queries
+from snelex.consignment_import import get_header_map, import_rows, normalize_row
+from snelex.data_export import export_documents, get_export_status
+from snelex.invoicing import iter_billable_groups
+from snelex.party import PARTY_CACHE_KEY, get_parties, get_party
+from snelex.profiling import get_profile_stats, reset_profile_stats
+from snelex.snelex.doctype.consignment_note.consignment_note import get_customer_details, get_form_context
+from snelex.snelex.doctype.shipper.test_shipper import make_test_shipper
+from snelex.tracking import TRACKING_CACHE_KEY, get_tracking_entries
+
 
 class TestConsignmentNote(unittest.TestCase):
 	def setUp(self):
@@ -12,6 +22,7 @@ class TestConsignmentNote(unittest.TestCase):
 		self.create_test_location()
 		self.create_test_supplier()
 		self.create_test_customer()
+		self.create_test_shipper()
 
 	def create_test_location(self):
 		"""Create test locations if they don't exist"""
@@ -50,6 +61,10 @@ class TestConsignmentNote(unittest.TestCase):
 			})
 			customer.insert(ignore_permissions=True)
 
+	def create_test_shipper(self):
+		"""Create the test Shipper, with its mandatory Address, if it doesn't exist"""
+		make_test_shipper("Test Shipper")
+
 	def test_consignment_note_creation(self):
 		"""Test basic consignment note creation"""
 		consignment_note = frappe.get_doc({
@@ -197,6 +212,250 @@ class TestConsignmentNote(unittest.TestCase):
 		consignment_note.insert()
 		self.assertEqual(consignment_note.consignee_display_name, "Test Consignee Customer")
 
+	def test_party_lookup_is_cached(self):
+		"""Test that resolved parties are stored in the Redis party cache"""
+		key = ("Customer", "Test Consignee Customer")
+		self.assertEqual(get_parties([key])[key].display_name, "Test Consignee Customer")
+
+		cached = frappe.cache.hget(PARTY_CACHE_KEY, "Customer::Test Consignee Customer")
+		self.assertEqual(cached.display_name, "Test Consignee Customer")
+
+	def test_party_cache_cleared_on_customer_update(self):
+		"""Test that a Customer update drops its cached party details"""
+		self.assertEqual(get_party("Customer", "Test Consignee Customer").display_name, "Test Consignee Customer")
+
+		customer = frappe.get_doc("Customer", "Test Consignee Customer")
+		customer.customer_name = "Renamed Consignee"
+		customer.save(ignore_permissions=True)
+		self.assertEqual(get_party("Customer", "Test Consignee Customer").display_name, "Renamed Consignee")
+
+		customer.customer_name = "Test Consignee Customer"
+		customer.save(ignore_permissions=True)
+
+	def test_filled_party_details_are_kept_while_link_is_unchanged(self):
+		"""Test that validate only refetches party details when their link changes"""
+		consignment_note = frappe.get_doc({
+			"doctype": "Consignment Note",
+			"consignment_date": today(),
+			"consignment_from": "Test Origin",
+			"consignment_to": "Test Destination",
+			"shipper": "Test Shipper",
+			"product": "Test product",
+			"payment_by": "Receiver",
+			"consignee_customer": "Test Consignee Customer",
+			"number_of_cartons": 5
+		}).insert()
+
+		consignment_note.consignee_address = "Gate 4, back entrance"
+		consignment_note.save()
+		self.assertEqual(consignment_note.consignee_address, "Gate 4, back entrance")
+
+		consignment_note.consignee_display_name = ""
+		consignment_note.save()
+		self.assertEqual(consignment_note.consignee_display_name, "Test Consignee Customer")
+
+	def test_unchanged_save_skips_party_lookups(self):
+		"""Test that a save touching no party link runs no party queries"""
+		consignment_note = frappe.get_doc({
+			"doctype": "Consignment Note",
+			"consignment_date": today(),
+			"consignment_from": "Test Origin",
+			"consignment_to": "Test Destination",
+			"shipper": "Test Shipper",
+			"product": "Test product",
+			"payment_by": "Receiver",
+			"consignee_customer": "Test Consignee Customer",
+			"number_of_cartons": 5
+		}).insert()
+
+		consignment_note.remarks = "Handle with care"
+		consignment_note.load_doc_before_save()
+		frappe.local.snelex_party_memo = {}
+		with count_queries() as queries:
+			consignment_note.update_party_details()
+		self.assertEqual(queries.count, 0)
+		self.assertEqual(consignment_note.flags.parties_to_fetch, set())
+
+	def test_party_change_refetches_on_next_save(self):
+		"""Test that a party modified after the note's last save is fetched again"""
+		consignment_note = frappe.get_doc({
+			"doctype": "Consignment Note",
+			"consignment_date": today(),
+			"consignment_from": "Test Origin",
+			"consignment_to": "Test Destination",
+			"shipper": "Test Shipper",
+			"product": "Test product",
+			"payment_by": "Receiver",
+			"consignee_customer": "Test Consignee Customer",
+			"number_of_cartons": 5
+		}).insert()
+
+		customer = frappe.get_doc("Customer", "Test Consignee Customer")
+		customer.customer_name = "Moved Consignee"
+		customer.save(ignore_permissions=True)
+		try:
+			consignment_note.remarks = "Customer moved"
+			consignment_note.save()
+			self.assertEqual(consignment_note.consignee_display_name, "Moved Consignee")
+		finally:
+			customer.customer_name = "Test Consignee Customer"
+			customer.save(ignore_permissions=True)
+
+	def test_form_context(self):
+		"""Test that the form context returns every party card in one call"""
+		context = get_form_context(consignee_customer="Test Consignee Customer", invoiced_to="Test Consignee Customer")
+		self.assertEqual(context["consignee"]["display_name"], "Test Consignee Customer")
+		self.assertEqual(context["invoiced_to"]["display_name"], "Test Consignee Customer")
+		self.assertEqual(context["shipper"], {})
+		self.assertEqual(context["shipper_customer"], "")
+
+	def test_customer_details_card(self):
+		"""Test that the consignee form trigger returns the cached plain-text party card"""
+		details = get_customer_details("Test Consignee Customer")
+		self.assertEqual(set(details), {"display_name", "address", "phone", "fax", "email"})
+		self.assertEqual(details["display_name"], "Test Consignee Customer")
+		self.assertNotIn("<br", details["address"])
+		self.assertEqual(get_customer_details(""), {})
+
+	def test_profiling_records_whitelisted_calls(self):
+		"""Test that profiled calls land in the stats once profiling is enabled"""
+		frappe.local.conf.snelex_profiling = 1
+		try:
+			reset_profile_stats()
+			get_customer_details("Test Consignee Customer")
+			get_customer_details("Test Consignee Customer")
+		finally:
+			frappe.local.conf.pop("snelex_profiling", None)
+
+		stats = {row["method"]: row for row in get_profile_stats(minutes=5)["methods"]}
+		row = stats["snelex.snelex.doctype.consignment_note.consignment_note.get_customer_details"]
+		self.assertEqual(row["calls"], 2)
+		self.assertGreater(row["sql_per_call"], 0)
+		self.assertEqual(sum(row["histogram"].values()), 2)
+
+	def test_bulk_import_reports_row_errors(self):
+		"""Test that bulk import inserts valid rows and reports invalid ones"""
+		# cells as the CSV reader yields them: all text
+		raw = {
+			"consignment_date": today(),
+			"consignment_from": "Test Origin",
+			"consignment_to": "Test Destination",
+			"payment_by": "Receiver",
+			"shipper": "Test Shipper",
+			"product": "Test product",
+			"consignee_customer": "Test Consignee Customer",
+			"number_of_cartons": " 5 ",
+			"number_of_pieces": "2",
+			# read-only columns are not imported
+			"sales_invoice": "SINV-FORGED",
+			"docstatus": "1",
+		}
+		row = normalize_row(raw, get_header_map())
+		self.assertEqual(row["number_of_cartons"], 5)
+		self.assertNotIn("sales_invoice", row)
+		self.assertNotIn("docstatus", row)
+		results = import_rows([row, dict(row, consignment_to="No Such Location")])
+
+		self.assertTrue(results[0].name)
+		self.assertIsNone(results[0].error)
+		self.assertEqual(frappe.db.get_value("Consignment Note", results[0].name, "total_no_of_pieces"), 7)
+		self.assertIsNone(results[1].name)
+		self.assertIn("No Such Location", results[1].error)
+
+	def test_tracking_index_follows_submit_and_cancel(self):
+		"""Test that the tracking index is filled on submit and cleared on cancel"""
+		tracking_no = frappe.generate_hash(length=12)
+		consignment_note = frappe.get_doc({
+			"doctype": "Consignment Note",
+			"consignment_date": today(),
+			"tracking_no": tracking_no,
+			"consignment_from": "Test Origin",
+			"consignment_to": "Test Destination",
+			"shipper": "Test Shipper",
+			"product": "Test product",
+			"payment_by": "Receiver",
+			"consignee_customer": "Test Consignee Customer",
+			"number_of_cartons": 5
+		})
+		consignment_note.insert()
+		self.assertIsNone(get_tracking_entries([tracking_no])[tracking_no])
+
+		consignment_note.submit()
+		entries = get_tracking_entries([tracking_no, "missing"])
+		self.assertEqual(entries[tracking_no].consignment_to, "Test Destination")
+		self.assertEqual(entries[tracking_no].current_location, "Test Origin")
+		self.assertNotIn("consignment_note", entries[tracking_no])
+		self.assertIsNone(entries["missing"])
+		# guests can look up any number, so misses are not cached
+		self.assertFalse(frappe.cache.hexists(TRACKING_CACHE_KEY, "missing"))
+
+		consignment_note.cancel()
+		self.assertIsNone(get_tracking_entries([tracking_no])[tracking_no])
+
+	def test_streaming_export_writes_every_chunk(self):
+		"""Test that the export pages through all matching notes into one file"""
+		names = []
+		for _ in range(3):
+			consignment_note = frappe.get_doc({
+				"doctype": "Consignment Note",
+				"consignment_date": today(),
+				"consignment_from": "Test Origin",
+				"consignment_to": "Test Destination",
+				"shipper": "Test Shipper",
+				"product": "Test product",
+				"payment_by": "Receiver",
+				"consignee_customer": "Test Consignee Customer",
+				"number_of_cartons": 1
+			})
+			consignment_note.insert()
+			names.append(consignment_note.name)
+
+		# the list view sends its filters as a list of conditions
+		export_id = export_documents(
+			"Consignment Note",
+			filters=[["Consignment Note", "name", "in", names], ["Consignment Note", "docstatus", "=", 0]],
+			fields=["consignment_date", "number_of_cartons"],
+			file_format="NDJSON",
+			chunk_size=2,
+		)
+		summary = get_export_status(export_id)
+		self.assertEqual(summary.exported, 3)
+
+		file_doc = frappe.get_doc("File", {"file_url": summary.file_url})
+		lines = file_doc.get_content().splitlines()
+		self.assertEqual(sorted(frappe.parse_json(line)["name"] for line in lines), sorted(names))
+
+	def test_billing_groups_by_party_and_period(self):
+		"""Test that uninvoiced notes are grouped per party and day and resume after a cursor"""
+		names = []
+		for date in (add_days(today(), -1), today(), today()):
+			consignment_note = frappe.get_doc({
+				"doctype": "Consignment Note",
+				"consignment_date": date,
+				"consignment_from": "Test Origin",
+				"consignment_to": "Test Destination",
+				"shipper": "Test Shipper",
+				"product": "Test product",
+				"payment_by": "Receiver",
+				"consignee_customer": "Test Consignee Customer",
+				"number_of_cartons": 1
+			})
+			consignment_note.submit()
+			names.append(consignment_note.name)
+
+		def groups(cursor=None):
+			return [
+				sorted(note.name for note in notes)
+				for (party, _), notes in iter_billable_groups(
+					add_days(today(), -1), today(), "Daily", cursor, chunk_size=1
+				)
+				if party == "Test Consignee Customer" and set(names) & {note.name for note in notes}
+			]
+
+		self.assertEqual(groups(), [names[:1], sorted(names[1:])])
+		cursor = ["Test Consignee Customer", str(add_days(today(), -1)), names[0]]
+		self.assertEqual(groups(cursor), [sorted(names[1:])])
+
 	def tearDown(self):
 		"""Clean up test data"""
 		# Delete test consignment notes
@@ -0,0 +1,13 @@
+# Copyright (c) 2025, sammish and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class DailyOperationsSummary(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Daily Operations Summary", ["date", "consignment_from", "consignment_to"])
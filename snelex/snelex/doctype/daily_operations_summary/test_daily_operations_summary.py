@@ -0,0 +1,49 @@
+# Copyright (c) 2025, sammish and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import today
+
+from snelex.analytics import refresh_dates
+from snelex.snelex.doctype.shipper.test_shipper import make_test_shipper
+
+
+class TestDailyOperationsSummary(FrappeTestCase):
+	def test_refresh_aggregates_submitted_notes(self):
+		"""Refreshing a date rolls its submitted notes up per route and payment type"""
+		for name in ("Summary Origin", "Summary Destination"):
+			if not frappe.db.exists("Location", name):
+				frappe.get_doc({"doctype": "Location", "location_name": name}).insert(ignore_permissions=True)
+
+		shipper = make_test_shipper()
+		for weight in (100, 250):
+			frappe.get_doc(
+				{
+					"doctype": "Consignment Note",
+					"consignment_date": today(),
+					"consignment_from": "Summary Origin",
+					"consignment_to": "Summary Destination",
+					"shipper": shipper.name,
+					"product": "Test product",
+					"payment_by": "3rd Party",
+					"number_of_cartons": 2,
+					"total_weight_lbs": weight,
+				}
+			).submit()
+
+		refresh_dates([today()])
+
+		row = frappe.get_all(
+			"Daily Operations Summary",
+			filters={
+				"date": today(),
+				"consignment_from": "Summary Origin",
+				"consignment_to": "Summary Destination",
+				"payment_by": "3rd Party",
+			},
+			fields=["consignment_notes", "total_pieces", "total_weight_lbs"],
+		)[0]
+		self.assertEqual(row.consignment_notes, 2)
+		self.assertEqual(row.total_pieces, 4)
+		self.assertEqual(row.total_weight_lbs, 350)
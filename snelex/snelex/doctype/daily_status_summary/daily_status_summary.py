@@ -0,0 +1,13 @@
+# Copyright (c) 2025, sammish and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class DailyStatusSummary(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Daily Status Summary", ["reference_doctype", "date", "location"])
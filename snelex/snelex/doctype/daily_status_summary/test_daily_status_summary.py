@@ -0,0 +1,70 @@
+# Copyright (c) 2025, sammish and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, today
+
+from snelex.analytics import materialize_status_counts, refresh_status_dates
+from snelex.snelex.doctype.shipper.test_shipper import make_test_shipper
+
+
+def count_drafts(date):
+	return (
+		frappe.db.get_value(
+			"Daily Status Summary",
+			{
+				"reference_doctype": "Consignment Note",
+				"date": date,
+				"location": "Status Destination",
+				"status": "Draft",
+			},
+			"count",
+		)
+		or 0
+	)
+
+
+class TestDailyStatusSummary(FrappeTestCase):
+	def setUp(self):
+		for name in ("Status Origin", "Status Destination"):
+			if not frappe.db.exists("Location", name):
+				frappe.get_doc({"doctype": "Location", "location_name": name}).insert(ignore_permissions=True)
+
+	def make_draft(self, date):
+		return frappe.get_doc(
+			{
+				"doctype": "Consignment Note",
+				"consignment_date": date,
+				"consignment_from": "Status Origin",
+				"consignment_to": "Status Destination",
+				"shipper": make_test_shipper().name,
+				"product": "Test product",
+				"payment_by": "3rd Party",
+				"number_of_cartons": 1,
+			}
+		).insert()
+
+	def test_refresh_counts_notes_per_status(self):
+		"""Refreshing a date replaces its counts per location and docstatus"""
+		refresh_status_dates({"Consignment Note": [today()]})
+		drafts = count_drafts(today())
+
+		for _ in range(2):
+			self.make_draft(today())
+
+		refresh_status_dates({"Consignment Note": [today()]})
+		self.assertEqual(count_drafts(today()), drafts + 2)
+
+	def test_moved_note_leaves_its_old_date(self):
+		"""A draft moved to another date is no longer counted under the date it left"""
+		yesterday = add_days(today(), -1)
+		note = self.make_draft(today())
+		materialize_status_counts()
+		drafts_today, drafts_yesterday = count_drafts(today()), count_drafts(yesterday)
+
+		note.consignment_date = yesterday
+		note.save()
+		materialize_status_counts()
+		self.assertEqual(count_drafts(today()), drafts_today - 1)
+		self.assertEqual(count_drafts(yesterday), drafts_yesterday + 1)
@@ -3,7 +3,13 @@
 
 import frappe
 from frappe.model.document import Document
-from frappe.utils import today
+from frappe.utils import cint, today
+
+from snelex.consignment import get_consignment_snapshot, get_consignment_snapshots, get_job_card_values
+from snelex.profiling import profiled
+
+JOB_CARD_CHUNK_SIZE = 200
+JOB_CARD_PROGRESS_EVENT = "snelex_job_card_creation"
 
 
 class JobCard(Document):
@@ -16,42 +22,17 @@ class JobCard(Document):
 	def validate_consignment_note(self):
 		"""Validate that consignment note exists and is submitted"""
 		if self.consignment_note:
-			cn_doc = frappe.get_doc("Consignment Note", self.consignment_note)
+			cn_doc = get_consignment_snapshot(self.consignment_note)
+			if not cn_doc:
+				frappe.throw(f"Consignment Note {self.consignment_note} not found", frappe.DoesNotExistError)
 			if cn_doc.docstatus != 1:
 				frappe.throw("Job Card can only be created from submitted Consignment Notes")
 
 	def fetch_consignment_details(self):
 		"""Fetch details from the linked consignment note"""
 		if self.consignment_note:
-			cn_doc = frappe.get_doc("Consignment Note", self.consignment_note)
-			
-			# Basic details
-			self.consignment_from = cn_doc.consignment_from
-			self.consignment_to = cn_doc.consignment_to
-			self.payment_by = cn_doc.payment_by
-			self.tracking_no = cn_doc.tracking_no
-			
-			# Shipper information
-			self.shipper_name = cn_doc.shipper_display_name
-			self.shipper_contact = cn_doc.shipper_display_name
-			self.shipper_phone = cn_doc.shipper_phone
-			self.shipper_email = cn_doc.shipper_email
-			
-			# Consignee information
-			self.consignee_name = cn_doc.consignee_display_name
-			self.consignee_contact = cn_doc.consignee_display_name
-			self.consignee_phone = cn_doc.consignee_phone
-			self.consignee_email = cn_doc.consignee_email
-			
-			# Shipment summary
-			self.total_pieces = cn_doc.total_no_of_pieces
-			self.total_weight = cn_doc.total_weight_lbs
-			self.number_of_cartons = cn_doc.number_of_cartons
-			self.number_of_bundles = cn_doc.number_of_bundles
-			
-			# Copy description as job description
-			if cn_doc.description:
-				self.job_description = cn_doc.description
+			cn_doc = get_consignment_snapshot(self.consignment_note)
+			self.update(get_job_card_values(cn_doc))
 
 	def set_default_values(self):
 		"""Set default values for new job cards"""
@@ -98,13 +79,16 @@ class JobCard(Document):
 
 
 @frappe.whitelist()
+@profiled
 def create_job_card_from_consignment_note(consignment_note):
 	"""Create a new job card from a consignment note"""
 	if not consignment_note:
 		frappe.throw("Consignment Note is required")
 	
 	# Check if consignment note is submitted
-	cn_doc = frappe.get_doc("Consignment Note", consignment_note)
+	cn_doc = get_consignment_snapshot(consignment_note)
+	if not cn_doc:
+		frappe.throw(f"Consignment Note {consignment_note} not found", frappe.DoesNotExistError)
 	if cn_doc.docstatus != 1:
 		frappe.throw("Job Card can only be created from submitted Consignment Notes")
 	
@@ -128,27 +112,108 @@ def create_job_card_from_consignment_note(consignment_note):
 	return job_card.name
 
 @frappe.whitelist()
+@profiled
 def get_consignment_note_details(consignment_note):
 	"""Get consignment note details for job card creation"""
 	if not consignment_note:
 		return {}
 	
-	cn_doc = frappe.get_doc("Consignment Note", consignment_note)
+	cn_doc = get_consignment_snapshot(consignment_note)
+	if not cn_doc:
+		return {}
+	frappe.has_permission("Consignment Note", "read", cn_doc.name, throw=True)
 	
-	return {
-		"consignment_from": cn_doc.consignment_from,
-		"consignment_to": cn_doc.consignment_to,
-		"payment_by": cn_doc.payment_by,
-		"tracking_no": cn_doc.tracking_no,
-		"shipper_name": cn_doc.shipper_display_name,
-		"shipper_phone": cn_doc.shipper_phone,
-		"shipper_email": cn_doc.shipper_email,
-		"consignee_name": cn_doc.consignee_display_name,
-		"consignee_phone": cn_doc.consignee_phone,
-		"consignee_email": cn_doc.consignee_email,
-		"total_pieces": cn_doc.total_no_of_pieces,
-		"total_weight": cn_doc.total_weight_lbs,
-		"number_of_cartons": cn_doc.number_of_cartons,
-		"number_of_bundles": cn_doc.number_of_bundles,
-		"job_description": cn_doc.description
-	}
\ No newline at end of file
+	return get_job_card_values(cn_doc)
+
+
+@frappe.whitelist()
+@profiled
+def create_job_cards_from_consignment_notes(consignment_notes=None, filters=None):
+	"""Queue Job Card creation for a list of Consignment Notes or a list-view filter"""
+	frappe.has_permission("Job Card", "create", throw=True)
+
+	consignment_notes = frappe.parse_json(consignment_notes) if consignment_notes else None
+	filters = frappe.parse_json(filters) if filters else None
+	if not consignment_notes and filters is None:
+		frappe.throw("Select Consignment Notes or pass a filter")
+
+	job_id = f"job_card_creation::{frappe.generate_hash(length=10)}"
+	frappe.enqueue(
+		"snelex.snelex.doctype.job_card.job_card.make_job_cards",
+		queue="long",
+		timeout=3600,
+		job_id=job_id,
+		now=frappe.flags.in_test,
+		consignment_notes=consignment_notes,
+		filters=filters,
+		# not job_name: frappe.enqueue takes that argument for itself
+		creation_id=job_id,
+		user=frappe.session.user,
+	)
+	return job_id
+
+
+def make_job_cards(consignment_notes=None, filters=None, creation_id=None, user=None, chunk_size=JOB_CARD_CHUNK_SIZE):
+	"""Background job: create one Job Card per submitted note that has none, committing per chunk"""
+	if not consignment_notes:
+		filters = filters or {}
+		if isinstance(filters, dict):
+			filters["docstatus"] = 1
+		else:
+			filters.append(["Consignment Note", "docstatus", "=", 1])
+		consignment_notes = frappe.get_all("Consignment Note", filters=filters, order_by="name asc", pluck="name")
+
+	summary = frappe._dict(creation_id=creation_id, total=len(consignment_notes), created=[], skipped=[], errors=[])
+	chunk_size = cint(chunk_size) or JOB_CARD_CHUNK_SIZE
+
+	for start in range(0, len(consignment_notes), chunk_size):
+		chunk = consignment_notes[start : start + chunk_size]
+		make_job_card_chunk(chunk, summary)
+		frappe.db.commit()
+
+		done = min(start + chunk_size, summary.total)
+		frappe.publish_progress(
+			done * 100 / summary.total,
+			title="Creating Job Cards",
+			description=f"{done} of {summary.total} Consignment Notes processed",
+		)
+
+	frappe.publish_realtime(JOB_CARD_PROGRESS_EVENT, summary, user=user)
+	return summary
+
+
+def make_job_card_chunk(consignment_notes, summary):
+	"""Create Job Cards for one chunk using one IN query for existing cards and one for note fields"""
+	existing = set(
+		frappe.get_all("Job Card", filters={"consignment_note": ["in", consignment_notes]}, pluck="consignment_note")
+	)
+	# primes the per-request snapshot memo that JobCard.validate reads from
+	snapshots = get_consignment_snapshots(consignment_notes)
+
+	for consignment_note in consignment_notes:
+		snapshot = snapshots.get(consignment_note)
+		if consignment_note in existing:
+			summary.skipped.append(consignment_note)
+			continue
+		if not snapshot or snapshot.docstatus != 1:
+			summary.errors.append({"consignment_note": consignment_note, "error": "Consignment Note is not submitted"})
+			continue
+
+		savepoint = f"job_card_{len(summary.created)}"
+		frappe.db.savepoint(savepoint)
+		try:
+			job_card = frappe.get_doc({
+				"doctype": "Job Card",
+				"consignment_note": consignment_note,
+				"job_date": today(),
+				"job_status": "Open",
+				"advance_status": "Open"
+			})
+			job_card.insert()
+		except Exception as e:
+			frappe.db.rollback(save_point=savepoint)
+			frappe.clear_messages()
+			summary.errors.append({"consignment_note": consignment_note, "error": str(e)})
+		else:
+			existing.add(consignment_note)
+			summary.created.append(job_card.name)
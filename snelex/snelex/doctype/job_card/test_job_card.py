@@ -1,9 +1,27 @@
 # Copyright (c) 2025, sammish and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from snelex.realtime import WINDOW_KEY, flush_status_deltas, publish_status_deltas
+
 
 class TestJobCard(FrappeTestCase):
-	pass
+	def test_status_deltas_are_coalesced(self):
+		"""Changes inside one window reach the list as one message, latest value per document"""
+		# hold the window open so the flushes only collect
+		frappe.cache.set(frappe.cache.make_key(WINDOW_KEY.format("Job Card")), 1, ex=60)
+		try:
+			frappe.local.snelex_status_deltas = {
+				"Job Card": {"JOB-A": {"job_status": "Open"}, "JOB-B": {"job_status": "Open"}}
+			}
+			flush_status_deltas()
+			frappe.local.snelex_status_deltas = {"Job Card": {"JOB-A": {"job_status": "Completed"}}}
+			flush_status_deltas()
+		finally:
+			frappe.cache.delete(frappe.cache.make_key(WINDOW_KEY.format("Job Card")))
+
+		changes = publish_status_deltas("Job Card", wait=0)
+		self.assertEqual(changes, {"JOB-A": {"job_status": "Completed"}, "JOB-B": {"job_status": "Open"}})
+		self.assertIsNone(publish_status_deltas("Job Card", wait=0))
@@ -0,0 +1,29 @@
+# Copyright (c) 2025, sammish and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import getdate
+
+
+class LaneTariff(Document):
+	def validate(self):
+		if self.consignment_from == self.consignment_to:
+			frappe.throw("Consignment From and Consignment To cannot be the same location")
+		if self.valid_from and self.valid_to and getdate(self.valid_from) > getdate(self.valid_to):
+			frappe.throw("Valid From cannot be after Valid To")
+		self.title = f"{self.consignment_from} → {self.consignment_to}"
+		self.validate_bands()
+
+	def validate_bands(self):
+		"""Each (weight, cbm) band may appear only once"""
+		seen = set()
+		for row in self.rates:
+			band = (row.weight_upto_lbs or 0, row.cbm_upto or 0)
+			if band in seen:
+				frappe.throw(f"Row {row.idx}: the weight and CBM band is already priced")
+			seen.add(band)
+
+
+def on_doctype_update():
+	frappe.db.add_index("Lane Tariff", ["consignment_from", "consignment_to"])
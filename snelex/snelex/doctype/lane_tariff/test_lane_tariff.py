@@ -0,0 +1,195 @@
+# Copyright (c) 2025, sammish and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, today
+
+from snelex.invoicing import CURSOR_KEY, run_invoicing
+from snelex.rating import RateEngine, Tariff, clear_tariff_cache
+from snelex.snelex.doctype.shipper.test_shipper import make_test_shipper
+
+FREIGHT_ITEM = "Freight Charges"
+
+
+def make_note(weight, cbm, pieces=1, date=None):
+	return frappe._dict(
+		name=f"CN-{weight}-{cbm}",
+		consignment_date=date or today(),
+		consignment_from="Dar",
+		consignment_to="Arusha",
+		total_weight_lbs=weight,
+		total_cbm=cbm,
+		total_no_of_pieces=pieces,
+	)
+
+
+def make_billing_fixtures():
+	"""Locations, a freight Item, a tariff of 100 + 1 per lbs and two Customers; returns the Customers"""
+	for name in ("Tariff Origin", "Tariff Destination"):
+		if not frappe.db.exists("Location", name):
+			frappe.get_doc({"doctype": "Location", "location_name": name}).insert(ignore_permissions=True)
+
+	if not frappe.db.exists("Item", FREIGHT_ITEM):
+		frappe.get_doc(
+			{
+				"doctype": "Item",
+				"item_code": FREIGHT_ITEM,
+				"item_group": "All Item Groups",
+				"stock_uom": "Nos",
+				"is_stock_item": 0,
+			}
+		).insert(ignore_permissions=True)
+
+	if not frappe.db.exists("Lane Tariff", {"consignment_from": "Tariff Origin", "enabled": 1}):
+		frappe.get_doc(
+			{
+				"doctype": "Lane Tariff",
+				"consignment_from": "Tariff Origin",
+				"consignment_to": "Tariff Destination",
+				"item": FREIGHT_ITEM,
+				"enabled": 1,
+				"rates": [{"flat_rate": 100, "rate_per_lbs": 1}],
+			}
+		).insert(ignore_permissions=True)
+	clear_tariff_cache()
+
+	customers = []
+	for customer_name in ("Tariff Customer A", "Tariff Customer B"):
+		name = frappe.db.get_value("Customer", {"customer_name": customer_name})
+		if not name:
+			name = (
+				frappe.get_doc(
+					{
+						"doctype": "Customer",
+						"customer_name": customer_name,
+						"customer_group": "All Customer Groups",
+						"territory": "All Territories",
+					}
+				)
+				.insert(ignore_permissions=True)
+				.name
+			)
+		customers.append(name)
+	return customers
+
+
+def make_billable_note(customer, weight, date=None):
+	"""A submitted note on the tariff lane, invoiced to ``customer``"""
+	return frappe.get_doc(
+		{
+			"doctype": "Consignment Note",
+			"consignment_date": date or today(),
+			"consignment_from": "Tariff Origin",
+			"consignment_to": "Tariff Destination",
+			"shipper": make_test_shipper().name,
+			"product": "Test product",
+			"payment_by": "Receiver",
+			"consignee_customer": customer,
+			"number_of_cartons": 1,
+			"total_weight_lbs": weight,
+		}
+	).submit()
+
+
+def get_company(test):
+	company = frappe.defaults.get_global_default("company") or frappe.db.get_value("Company", {}, "name")
+	if not company:
+		test.skipTest("Sales Invoices need a Company")
+	return company
+
+
+class TestLaneTariff(FrappeTestCase):
+	def setUp(self):
+		rates = [
+			frappe._dict(weight_upto_lbs=100, cbm_upto=1, flat_rate=50),
+			frappe._dict(weight_upto_lbs=100, cbm_upto=0, flat_rate=80),
+			frappe._dict(weight_upto_lbs=0, cbm_upto=0, rate_per_lbs=2, minimum_charge=300),
+		]
+		tariff = Tariff("TRF-1", "Freight", add_days(today(), -30), None, rates)
+		self.engine = RateEngine({("Dar", "Arusha"): [tariff]})
+
+	def test_bands(self):
+		prices = self.engine.price_many(
+			[make_note(60, 0.5), make_note(60, 3), make_note(100, 1), make_note(120, 1), make_note(400, 2)]
+		)
+		self.assertEqual(prices["CN-60-0.5"].amount, 50)
+		# above the 1 CBM band, but still within the weight band
+		self.assertEqual(prices["CN-60-3"].amount, 80)
+		# band bounds are inclusive
+		self.assertEqual(prices["CN-100-1"].amount, 50)
+		# the open band charges by weight, never below its minimum
+		self.assertEqual(prices["CN-120-1"].amount, 300)
+		self.assertEqual(prices["CN-400-2"].amount, 800)
+		self.assertEqual(prices["CN-400-2"].item, "Freight")
+
+	def test_unpriced(self):
+		before_validity = make_note(60, 0.5, date=add_days(today(), -60))
+		other_lane = make_note(60, 0.5).update(consignment_to="Mwanza")
+		self.assertEqual(self.engine.price_many([before_validity, other_lane]), {})
+
+	def test_older_tariff_prices_what_the_newest_lacks(self):
+		"""The newest valid tariff is skipped for a shipment none of its bands hold"""
+		newest = Tariff("TRF-2", "Freight", today(), None, [frappe._dict(weight_upto_lbs=100, flat_rate=40)])
+		older = self.engine.lanes[("Dar", "Arusha")][0]
+		engine = RateEngine({("Dar", "Arusha"): [newest, older]})
+
+		prices = engine.price_many([make_note(60, 0.5), make_note(400, 2)])
+		self.assertEqual(prices["CN-60-0.5"].tariff, "TRF-2")
+		self.assertEqual(prices["CN-400-2"].tariff, "TRF-1")
+
+	def test_run_invoicing_bills_each_party(self):
+		"""One Sales Invoice per invoiced_to party, its notes stamped with the invoice and their price"""
+		company = get_company(self)
+		customer_a, customer_b = make_billing_fixtures()
+		notes = [
+			make_billable_note(customer_a, 10),
+			make_billable_note(customer_a, 20),
+			make_billable_note(customer_b, 30),
+		]
+
+		run_invoicing(today(), today(), company)
+
+		billed = {
+			row.name: row
+			for row in frappe.get_all(
+				"Consignment Note",
+				filters={"name": ["in", [note.name for note in notes]]},
+				fields=["name", "sales_invoice", "freight_amount"],
+			)
+		}
+		invoice_a, _, invoice_b = (billed[note.name].sales_invoice for note in notes)
+		self.assertEqual(billed[notes[1].name].sales_invoice, invoice_a)
+		self.assertNotEqual(invoice_a, invoice_b)
+		self.assertEqual([billed[note.name].freight_amount for note in notes], [110, 120, 130])
+
+		invoice = frappe.get_doc("Sales Invoice", invoice_a)
+		self.assertEqual(invoice.customer, customer_a)
+		self.assertEqual(sorted(item.rate for item in invoice.items), [110, 120])
+		self.assertEqual(frappe.db.get_value("Sales Invoice", invoice_b, "customer"), customer_b)
+
+	def test_run_invoicing_resumes_and_cancel_releases(self):
+		"""A run picks up after the saved cursor; cancelling its invoice frees the notes again"""
+		company = get_company(self)
+		customer_a, customer_b = make_billing_fixtures()
+		yesterday = add_days(today(), -1)
+		skipped = make_billable_note(customer_a, 10, date=yesterday)
+		notes = [make_billable_note(customer_a, 20), make_billable_note(customer_b, 30)]
+
+		cursor_key = CURSOR_KEY.format(company, yesterday, today(), "Daily")
+		frappe.db.set_global(cursor_key, frappe.as_json([customer_a, yesterday, skipped.name]))
+		run_invoicing(yesterday, today(), company, period="Daily")
+
+		self.assertFalse(frappe.db.get_value("Consignment Note", skipped.name, "sales_invoice"))
+		invoices = [frappe.db.get_value("Consignment Note", note.name, "sales_invoice") for note in notes]
+		self.assertTrue(all(invoices))
+		self.assertFalse(frappe.db.get_global(cursor_key))
+
+		invoice = frappe.get_doc("Sales Invoice", invoices[0])
+		invoice.submit()
+		invoice.cancel()
+		self.assertEqual(
+			frappe.db.get_value("Consignment Note", notes[0].name, ["sales_invoice", "freight_amount"]),
+			(None, 0),
+		)
+		self.assertEqual(frappe.db.get_value("Consignment Note", notes[1].name, "sales_invoice"), invoices[1])
@@ -12,32 +12,61 @@ frappe.ui.form.on("Manifest",{
             }
 
         })
+        if(!frm.is_new() && frm.doc.status === "Open" && !frm.doc.truck){
+            frm.add_custom_button(__("Assign Truck"),function(){
+                frappe.call({
+                    method:'snelex.fleet.assign_truck',
+                    args:{
+                        location:frm.doc.location,
+                        date:frm.doc.manifest_date,
+                        truck_type:frm.doc.truck_type,
+                        // the load is weighed server-side from the saved consignment rows
+                        manifest:frm.doc.name
+                    },
+                    callback:function(r){
+                        if(r.message){
+                            frm.set_value("truck",r.message.name)
+                        }else{
+                            frappe.msgprint(__("No free truck matches this Manifest"))
+                        }
+                    }
+                });
+            });
+        }
+        if(!frm.is_new() && (frm.doc.consignment_details || []).length){
+            frm.add_custom_button(__("Print Consignment Notes"),function(){
+                frappe.call({
+                    method:'snelex.batch_print.print_consignment_notes',
+                    args:{manifest:frm.doc.name},
+                    callback:function(){
+                        frappe.show_alert({message:__("Consignment Notes are being printed"),indicator:"blue"})
+                    }
+                });
+            });
+        }
+    },
+    onload:function(frm){
+        // onload runs on every form load, so drop the handler of the previous Manifest first
+        frappe.realtime.off("snelex_batch_print");
+        frappe.realtime.on("snelex_batch_print",function(data){
+            if(data.print_id === "consignment_print::" + frm.doc.name){
+                frm.reload_doc();
+                window.open(data.file_url);
+            }
+        });
     },
     get_consignment_details:function(frm){
       if(!frm.doc.manifest_date || !frm.doc.location){
         frappe.throw("Select the Manifest Date and Location")
       }
-      frappe.call({
-          method:'snelex.snelex.doctype.manifest.manifest.get_consignment_details',
-          args:{
-           manifest_date:frm.doc.manifest_date,
-           location:frm.doc.location
-          },
-          callback:function(r){
-              if (r.message){
-                  frm.clear_table("consignment_details")
-                  r.message.forEach(function(row)
-              {
-                  let child=frm.add_child("consignment_details");
-                  child.consignment_number=row.name;
-                  child.consignment_date=row.consignment_date;
-                  child.consignee=row.consignee_customer;
-                  child.shipper=row.shipper;
-                  child.remarks=row.remarks;
-              });
+      // rows are filled server-side, page by page, and synced back onto the form
+      frm.call({
+          method:'fill_consignment_details',
+          freeze:true,
+          freeze_message:__("Fetching Consignment Notes..."),
+          callback:function(){
               frm.refresh_field("consignment_details")
-
-              }
+              frm.dirty()
           }
       });
     }
@@ -2,41 +2,114 @@
 # For license information, please see license.txt
 
 import frappe
-from frappe.model.naming import make_autoname
 from frappe.model.document import Document
+from frappe.utils import cint, getdate
+
+from snelex.fleet import validate_truck
+from snelex.numbering import make_job_card_number, make_manifest_number
+from snelex.profiling import profiled
+from snelex.truck_expiry import validate_truck_expiry
 
 class Manifest(Document):
     def validate(self):
+        validate_truck(self)
+        validate_truck_expiry(self)
+
+    def before_save(self):
+        # numbers cannot be given back, so they are drawn once every validation has passed
         self.generate_manifest_number()
         self.generate_job_card_number()
-        
+
     def generate_manifest_number(self):
         """Generate Manifest Number Automatically"""
         if not self.manifest_number:
             if self.location:
-                location = frappe.get_doc("Location", self.location)
-                prefix = location.custom_location_code or "MNF"
-                self.manifest_number = make_autoname(f"{prefix}-.#####")
+                self.manifest_number = make_manifest_number(self.location)
 
     def generate_job_card_number(self):
         """Generate Job Card Number Automatically"""
         if not self.job_card_number:
             if self.location:
-                location = frappe.get_doc("Location", self.location)
-                prefix = location.custom_location_code or "JCN"
-                self.job_card_number = make_autoname(f"#####.-{prefix}")
+                self.job_card_number = make_job_card_number(self.location)
+
+    @frappe.whitelist()
+    @profiled
+    def fill_consignment_details(self):
+        """Replace Consignment List rows with every eligible note for this date and location"""
+        if not self.manifest_date or not self.location:
+            frappe.throw("Select the Manifest Date and Location")
+
+        self.set("consignment_details", [])
+        manifest = None if self.is_new() else self.name
+        for row in iter_consignment_details(self.manifest_date, self.location, manifest):
+            self.append("consignment_details", {
+                "consignment_number": row.name,
+                "consignment_date": row.consignment_date,
+                "consignee": row.consignee_customer,
+                "shipper": row.shipper,
+                "remarks": row.remarks,
+            })
+
+CONSIGNMENT_PAGE_LENGTH = 500
+MAX_CONSIGNMENT_PAGE_LENGTH = 2000
+
 
 @frappe.whitelist()
-def get_consignment_details(manifest_date,location):
+@profiled
+def get_consignment_details(manifest_date, location, manifest=None, after=None, page_length=CONSIGNMENT_PAGE_LENGTH):
+	"""Return one page of submitted Consignment Notes bound for ``location`` on ``manifest_date``.
+
+	Pages are keyset-paginated on ``name``: pass the last name of the previous
+	page as ``after``. Notes already listed on another Manifest are skipped.
+	"""
 	# "arguments are from manifest doctype"
-	if manifest_date and location:
-		consignment=frappe.get_all("Consignment Note",
-		filters={
-			"consignment_date":manifest_date,
-			"consignment_to":location
-
-		},
-		fields=["name","consignment_date","consignee_customer","shipper","remarks"]
+	frappe.has_permission("Consignment Note", "read", throw=True)
+	if not (manifest_date and location):
+		return []
+
+	page_length = min(cint(page_length) or CONSIGNMENT_PAGE_LENGTH, MAX_CONSIGNMENT_PAGE_LENGTH)
+
+	note = frappe.qb.DocType("Consignment Note")
+	listed = frappe.qb.DocType("Consignment List")
+
+	on_other_manifest = (
+		frappe.qb.from_(listed)
+		.select(listed.consignment_number)
+		.where(listed.parenttype == "Manifest")
+		.where(listed.parent != (manifest or ""))
+		.where(listed.consignment_number.isnotnull())
+	)
+
+	query = (
+		frappe.qb.from_(note)
+		.select(
+			note.name,
+			note.consignment_date,
+			note.consignee_customer,
+			note.shipper,
+			note.remarks,
+			note.total_weight_lbs,
+			note.total_cbm,
 		)
-		if consignment:
-			return consignment
+		.where(note.consignment_to == location)
+		.where(note.consignment_date == getdate(manifest_date))
+		.where(note.docstatus == 1)
+		.where(note.name.notin(on_other_manifest))
+		.orderby(note.name)
+		.limit(page_length)
+	)
+	if after:
+		query = query.where(note.name > after)
+
+	return query.run(as_dict=True)
+
+
+def iter_consignment_details(manifest_date, location, manifest=None, page_length=CONSIGNMENT_PAGE_LENGTH):
+	"""Yield every eligible Consignment Note, one keyset page at a time"""
+	after = None
+	while True:
+		page = get_consignment_details(manifest_date, location, manifest, after, page_length)
+		yield from page
+		if len(page) < page_length:
+			break
+		after = page[-1].name
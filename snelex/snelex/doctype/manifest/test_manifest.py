@@ -1,9 +1,75 @@
 # Copyright (c) 2025, sammish and Contributors
 # See license.txt
 
-# import frappe
+import threading
+
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from snelex.load_planning import plan_loads
+from snelex.numbering import SERIES_CACHE_KEY, next_number
+
 
 class TestManifest(FrappeTestCase):
-	pass
+	def test_number_allocator_under_concurrent_threads(self):
+		"""Allocated numbers stay unique when many threads draw from one series"""
+		site = frappe.local.site
+		series = f"TEST-{frappe.generate_hash(length=8)}-"
+		thread_count, per_thread = 8, 250
+		allocated, errors = [], []
+
+		def worker():
+			frappe.init(site=site)
+			frappe.connect()
+			try:
+				numbers = [next_number(series) for _ in range(per_thread)]
+				frappe.db.commit()
+				allocated.extend(numbers)
+			except Exception as e:
+				errors.append(e)
+			finally:
+				frappe.destroy()
+
+		threads = [threading.Thread(target=worker) for _ in range(thread_count)]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+
+		self.assertEqual(errors, [])
+		self.assertEqual(len(allocated), thread_count * per_thread)
+		self.assertEqual(len(set(allocated)), len(allocated))
+
+		# the high-water mark reached tabSeries, so a Redis flush cannot reissue numbers
+		frappe.db.commit()  # start a fresh snapshot to see the worker commits
+		self.assertGreaterEqual(
+			frappe.db.get_value("Series", series, "current", order_by="name"), max(allocated)
+		)
+
+		frappe.cache.delete(frappe.cache.make_key(SERIES_CACHE_KEY.format(series)))
+		frappe.db.sql("delete from `tabSeries` where `name` = %s", series)
+		frappe.db.commit()
+
+	def test_load_plan_respects_capacity(self):
+		"""Notes are packed within weight and CBM limits onto as few trucks as fit"""
+		trucks = [
+			{"name": "BIG", "max_weight": 1000, "max_cbm": 10},
+			{"name": "SMALL", "max_weight": 300, "max_cbm": 0},
+			{"name": "SPARE", "max_weight": 1000, "max_cbm": 10},
+		]
+		notes = [{"name": f"CN-{i}", "weight": 100, "cbm": 1} for i in range(9)]
+		notes.append({"name": "TOO-HEAVY", "weight": 5000, "cbm": 1})
+
+		plan = plan_loads(notes, trucks)
+
+		self.assertEqual([note.name for note in plan.unassigned], ["TOO-HEAVY"])
+		self.assertEqual(len(plan.loads), 1)
+		self.assertEqual(plan.loads[0].weight, 900)
+		self.assertEqual(plan.loads[0].truck, "BIG")
+		for load in plan.loads:
+			self.assertLessEqual(load.weight, load.max_weight)
+			self.assertLessEqual(load.cbm, load.max_cbm)
+
+		# a truck limited by weight only ranks by its weight, so a light load moves onto it
+		plan = plan_loads([{"name": "LIGHT", "weight": 250, "cbm": 1}], trucks)
+		self.assertEqual([load.truck for load in plan.loads], ["SMALL"])
@@ -1,9 +1,49 @@
 # Copyright (c) 2025, sammish and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from snelex.provisioning import reconcile_customers
+
+
+def make_test_shipper(name="Test Shipper"):
+	"""Return the Shipper ``name``, creating it with its mandatory Address when missing"""
+	if frappe.db.exists("Shipper", name):
+		return frappe.get_doc("Shipper", name)
+
+	address = frappe.get_doc(
+		{
+			"doctype": "Address",
+			"address_title": name,
+			"address_type": "Office",
+			"address_line1": "1 Test Street",
+			"city": "Test City",
+			"country": frappe.db.get_default("country") or frappe.db.get_value("Country", {}, "name"),
+			"links": [{"link_doctype": "Shipper", "link_name": name}],
+		}
+	).insert(ignore_permissions=True, ignore_links=True)
+	return frappe.get_doc({"doctype": "Shipper", "shipper": name, "address": address.name}).insert(
+		ignore_permissions=True
+	)
+
 
 class TestShipper(FrappeTestCase):
-	pass
+	def test_customer_is_provisioned_for_new_shipper(self):
+		"""Saving a Shipper queues its Customer, and saving again does not create a second one"""
+		shipper = make_test_shipper(f"Test Shipper {frappe.generate_hash(length=6)}")
+		self.assertEqual(frappe.db.count("Customer", {"customer_name": shipper.name}), 1)
+
+		shipper.save(ignore_permissions=True)
+		self.assertEqual(frappe.db.count("Customer", {"customer_name": shipper.name}), 1)
+
+	def test_reconciliation_creates_missing_customers(self):
+		"""The bulk reconciliation recreates Customers that went missing"""
+		shipper = make_test_shipper(f"Test Shipper {frappe.generate_hash(length=6)}")
+		frappe.delete_doc("Customer", frappe.db.get_value("Customer", {"customer_name": shipper.name}))
+
+		summary = reconcile_customers(batch_size=50)
+		self.assertIn(
+			shipper.name, [frappe.db.get_value("Customer", c, "customer_name") for c in summary.created]
+		)
+		self.assertFalse(summary.errors)
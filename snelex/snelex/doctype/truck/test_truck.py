@@ -1,9 +1,145 @@
 # Copyright (c) 2025, sammish and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, today
+
+from snelex.fleet import assign_truck, rebuild_fleet_index
+from snelex.snelex.doctype.shipper.test_shipper import make_test_shipper
+from snelex.truck_expiry import get_truck_expiry, scan_truck_expiry
+
+
+def make_truck(capacity, truck_type="Low Bed"):
+	if not frappe.db.exists("Supplier", "Fleet Owner"):
+		frappe.get_doc(
+			{"doctype": "Supplier", "supplier_name": "Fleet Owner", "supplier_group": "All Supplier Groups"}
+		).insert(ignore_permissions=True)
+
+	return frappe.get_doc(
+		{
+			"doctype": "Truck",
+			"truck_number": f"FLEET-{frappe.generate_hash(length=8)}",
+			"registration_number": frappe.generate_hash(length=8),
+			"model": "Test",
+			"owner_name": "Fleet Owner",
+			"fuel_type": "Diesel",
+			"insurance_expiry_date": add_days(today(), 365),
+			"permit_expiry_date": add_days(today(), 365),
+			"status": "Available",
+			"truck_type": truck_type,
+			"capacityton": capacity,
+		}
+	).insert()
 
 
 class TestTruck(FrappeTestCase):
-	pass
+	def setUp(self):
+		for location in ("Fleet Yard", "Fleet Depot"):
+			if not frappe.db.exists("Location", location):
+				frappe.get_doc({"doctype": "Location", "location_name": location}).insert(
+					ignore_permissions=True
+				)
+		frappe.db.set_value("Truck", {"truck_type": "Low Bed"}, "status", "Unavailable")
+		rebuild_fleet_index()
+
+	def test_assign_truck_follows_manifests(self):
+		"""The smallest fitting truck is assigned, held by its Open Manifest and released on close"""
+		small, large = make_truck(5), make_truck(20)
+
+		truck = assign_truck(weight=8000, truck_type="Low Bed")
+		self.assertEqual(truck.name, large.name)
+
+		manifest = frappe.get_doc(
+			{
+				"doctype": "Manifest",
+				"location": "Fleet Yard",
+				"manifest_date": today(),
+				"status": "Open",
+				"transport_type": "By Road",
+				"remarks": "Fleet test",
+				"truck": small.name,
+			}
+		).insert()
+		self.assertEqual(frappe.db.get_value("Truck", small.name, "status"), "In Transit")
+		self.assertEqual(assign_truck(weight=100, truck_type="Low Bed").name, large.name)
+
+		# the truck is on the road, a second Open Manifest cannot take it
+		self.assertRaises(frappe.ValidationError, frappe.copy_doc(manifest).insert)
+
+		manifest.status = "Close"
+		manifest.save()
+		self.assertEqual(frappe.db.get_value("Truck", small.name, "status"), "Available")
+		self.assertEqual(frappe.db.get_value("Truck", small.name, "current_location"), "Fleet Yard")
+		self.assertEqual(assign_truck("Fleet Yard", weight=100, truck_type="Low Bed").name, small.name)
+		# a truck parked at a location is still found from anywhere else
+		self.assertEqual(assign_truck(weight=100, truck_type="Low Bed").name, small.name)
+		self.assertEqual(assign_truck("Nowhere", weight=100, truck_type="Low Bed").name, small.name)
+
+	def test_assign_truck_weighs_the_manifest(self):
+		"""Given a Manifest, the truck must carry the weight of the notes it lists"""
+		make_truck(5)
+		large = make_truck(20)
+		note = frappe.get_doc(
+			{
+				"doctype": "Consignment Note",
+				"consignment_date": today(),
+				"consignment_from": "Fleet Yard",
+				"consignment_to": "Fleet Depot",
+				"shipper": make_test_shipper().name,
+				"product": "Test product",
+				"payment_by": "3rd Party",
+				"number_of_cartons": 1,
+				"total_weight_lbs": 8000,
+			}
+		).submit()
+		manifest = frappe.get_doc(
+			{
+				"doctype": "Manifest",
+				"location": "Fleet Yard",
+				"manifest_date": today(),
+				"status": "Open",
+				"transport_type": "By Road",
+				"remarks": "Fleet test",
+				"consignment_details": [{"consignment_number": note.name}],
+			}
+		).insert()
+
+		self.assertEqual(assign_truck(truck_type="Low Bed", manifest=manifest.name).name, large.name)
+
+	def test_expired_truck_is_blocked(self):
+		"""The expiry calendar blocks a truck whose insurance lapsed and clears once it is renewed"""
+		truck = make_truck(10)
+		truck.insurance_expiry_date = add_days(today(), -1)
+		truck.save()
+
+		calendar = scan_truck_expiry(notify=False)
+		self.assertEqual(calendar[truck.name][1], "Insurance")
+
+		manifest = frappe.get_doc(
+			{
+				"doctype": "Manifest",
+				"location": "Fleet Yard",
+				"manifest_date": today(),
+				"status": "Open",
+				"transport_type": "By Road",
+				"remarks": "Expiry test",
+				"truck": truck.name,
+			}
+		)
+		self.assertRaises(frappe.ValidationError, manifest.insert)
+
+		truck.insurance_expiry_date = add_days(today(), 365)
+		truck.save()
+		self.assertIsNone(get_truck_expiry(truck.name))
+		manifest.insert()
+
+		# beyond the calendar horizon, the Truck's own dates are checked
+		truck = make_truck(10)
+		truck.permit_expiry_date = add_days(today(), 60)
+		truck.save()
+		manifest = frappe.copy_doc(manifest)
+		manifest.update(
+			{"truck": truck.name, "manifest_date": add_days(today(), 90), "manifest_number": None}
+		)
+		self.assertRaisesRegex(frappe.ValidationError, "Permit expired", manifest.insert)
@@ -0,0 +1,84 @@
+// Copyright (c) 2025, Snelex and contributors
+// For license information, please see license.txt
+
+frappe.pages['snelex-profiler'].on_page_load = function(wrapper) {
+	let page = frappe.ui.make_app_page({
+		parent: wrapper,
+		title: __('Snelex Profiler'),
+		single_column: true
+	});
+
+	let minutes = page.add_field({
+		fieldname: 'minutes',
+		label: __('Period'),
+		fieldtype: 'Select',
+		options: [
+			{ value: 15, label: __('Last 15 minutes') },
+			{ value: 60, label: __('Last hour') },
+			{ value: 360, label: __('Last 6 hours') },
+			{ value: 1440, label: __('Last 24 hours') }
+		],
+		default: 60,
+		change: () => refresh()
+	});
+
+	page.set_primary_action(__('Refresh'), () => refresh(), 'refresh');
+	page.set_secondary_action(__('Reset'), function() {
+		frappe.confirm(__('Drop all recorded statistics?'), function() {
+			frappe.call({
+				method: 'snelex.profiling.reset_profile_stats',
+				callback: () => refresh()
+			});
+		});
+	});
+
+	let $body = $('<div class="frappe-card p-3"></div>').appendTo(page.main);
+
+	function format_ms(value) {
+		return value === null ? '&gt; 10000' : format_number(value, null, 2);
+	}
+
+	function refresh() {
+		frappe.call({
+			method: 'snelex.profiling.get_profile_stats',
+			args: { minutes: minutes.get_value() },
+			callback: function(r) {
+				let stats = r.message;
+				let rows = stats.methods.map((row) => `
+					<tr>
+						<td class="text-monospace">${frappe.utils.escape_html(row.method)}</td>
+						<td class="text-right">${row.calls}</td>
+						<td class="text-right">${format_ms(row.mean_ms)}</td>
+						<td class="text-right">${format_ms(row.p50_ms)}</td>
+						<td class="text-right">${format_ms(row.p95_ms)}</td>
+						<td class="text-right">${format_number(row.total_ms, null, 0)}</td>
+						<td class="text-right">${row.sql_per_call}</td>
+						<td class="text-right">${row.sql_ms_per_call}</td>
+						<td class="text-right">${row.cache_hit_rate === null ? '-' : Math.round(row.cache_hit_rate * 100) + '%'}</td>
+					</tr>`).join('');
+
+				$body.html(`
+					${stats.enabled ? '' : `<div class="alert alert-warning">${__('Profiling is disabled. Set {0} in the site config to record calls.', ['<code>snelex_profiling</code>'])}</div>`}
+					<table class="table table-bordered table-sm">
+						<thead>
+							<tr>
+								<th>${__('Method')}</th>
+								<th class="text-right">${__('Calls')}</th>
+								<th class="text-right">${__('Mean (ms)')}</th>
+								<th class="text-right">${__('p50 (ms)')}</th>
+								<th class="text-right">${__('p95 (ms)')}</th>
+								<th class="text-right">${__('Total (ms)')}</th>
+								<th class="text-right">${__('SQL / call')}</th>
+								<th class="text-right">${__('SQL ms / call')}</th>
+								<th class="text-right">${__('Cache hits')}</th>
+							</tr>
+						</thead>
+						<tbody>${rows || `<tr><td colspan="9" class="text-muted text-center">${__('No calls recorded')}</td></tr>`}</tbody>
+					</table>
+				`);
+			}
+		});
+	}
+
+	refresh();
+};
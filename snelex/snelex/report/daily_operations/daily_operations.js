@@ -0,0 +1,46 @@
+// Copyright (c) 2025, Snelex and contributors
+// For license information, please see license.txt
+
+frappe.query_reports['Daily Operations'] = {
+	filters: [
+		{
+			fieldname: 'from_date',
+			label: __('From Date'),
+			fieldtype: 'Date',
+			default: frappe.datetime.add_months(frappe.datetime.get_today(), -1),
+			reqd: 1
+		},
+		{
+			fieldname: 'to_date',
+			label: __('To Date'),
+			fieldtype: 'Date',
+			default: frappe.datetime.get_today(),
+			reqd: 1
+		},
+		{
+			fieldname: 'group_by',
+			label: __('Group By'),
+			fieldtype: 'Select',
+			options: 'Route\nDate',
+			default: 'Route'
+		},
+		{
+			fieldname: 'consignment_from',
+			label: __('Consignment From'),
+			fieldtype: 'Link',
+			options: 'Location'
+		},
+		{
+			fieldname: 'consignment_to',
+			label: __('Consignment To'),
+			fieldtype: 'Link',
+			options: 'Location'
+		},
+		{
+			fieldname: 'payment_by',
+			label: __('Payment By'),
+			fieldtype: 'Select',
+			options: '\nShipper\nReceiver\n3rd Party'
+		}
+	]
+};
@@ -0,0 +1,133 @@
+# Copyright (c) 2025, Snelex and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.query_builder.functions import Sum
+from frappe.utils import flt, getdate
+
+from snelex.analytics import SUMMARY_DOCTYPE, WATERMARK_KEY
+
+TOTAL_FIELDS = (
+	"consignment_notes",
+	"total_pieces",
+	"total_weight_lbs",
+	"total_cbm",
+	"job_cards",
+	"delivered",
+	"on_time",
+)
+
+
+def execute(filters=None):
+	filters = frappe._dict(filters or {})
+	rows = get_data(filters)
+	message = None
+	if refreshed := frappe.db.get_global(WATERMARK_KEY):
+		message = f"Figures as of {refreshed}"
+	return get_columns(filters), rows, message, get_chart(filters, rows)
+
+
+def get_columns(filters):
+	if filters.group_by == "Date":
+		first = [{"fieldname": "date", "label": "Date", "fieldtype": "Date", "width": 110}]
+	else:
+		first = [
+			{
+				"fieldname": "consignment_from",
+				"label": "From",
+				"fieldtype": "Link",
+				"options": "Location",
+				"width": 140,
+			},
+			{
+				"fieldname": "consignment_to",
+				"label": "To",
+				"fieldtype": "Link",
+				"options": "Location",
+				"width": 140,
+			},
+		]
+
+	return [
+		*first,
+		{"fieldname": "consignment_notes", "label": "Consignment Notes", "fieldtype": "Int", "width": 120},
+		{"fieldname": "total_pieces", "label": "Pieces", "fieldtype": "Int", "width": 90},
+		{"fieldname": "total_weight_lbs", "label": "Weight (lbs)", "fieldtype": "Float", "width": 110},
+		{"fieldname": "total_cbm", "label": "CBM", "fieldtype": "Float", "width": 90},
+		{"fieldname": "shipper_pct", "label": "Shipper Paid %", "fieldtype": "Percent", "width": 110},
+		{"fieldname": "receiver_pct", "label": "Receiver Paid %", "fieldtype": "Percent", "width": 110},
+		{"fieldname": "third_party_pct", "label": "3rd Party %", "fieldtype": "Percent", "width": 100},
+		{"fieldname": "job_cards", "label": "Job Cards", "fieldtype": "Int", "width": 90},
+		{"fieldname": "delivered", "label": "Delivered", "fieldtype": "Int", "width": 90},
+		{"fieldname": "on_time_pct", "label": "On Time %", "fieldtype": "Percent", "width": 100},
+	]
+
+
+def get_data(filters):
+	"""Sum the summary rows per group and payment type, then pivot the payment mix"""
+	summary = frappe.qb.DocType(SUMMARY_DOCTYPE)
+	if filters.group_by == "Date":
+		keys = [summary.date]
+	else:
+		keys = [summary.consignment_from, summary.consignment_to]
+
+	query = (
+		frappe.qb.from_(summary)
+		.select(*keys, summary.payment_by, *(Sum(summary[field]).as_(field) for field in TOTAL_FIELDS))
+		.groupby(*keys, summary.payment_by)
+		.orderby(*keys)
+	)
+	if filters.from_date:
+		query = query.where(summary.date >= getdate(filters.from_date))
+	if filters.to_date:
+		query = query.where(summary.date <= getdate(filters.to_date))
+	for field in ("consignment_from", "consignment_to", "payment_by"):
+		if filters.get(field):
+			query = query.where(summary[field] == filters.get(field))
+
+	groups = {}
+	for row in query.run(as_dict=True):
+		key = tuple(row[field.name] for field in keys)
+		group = groups.get(key)
+		if group is None:
+			group = groups[key] = frappe._dict({field.name: row[field.name] for field in keys})
+			group.update({field: 0 for field in TOTAL_FIELDS}, by_payment={})
+		for field in TOTAL_FIELDS:
+			group[field] += flt(row[field])
+		group.by_payment[row.payment_by] = flt(row.consignment_notes)
+
+	for group in groups.values():
+		notes = group.consignment_notes or 1
+		by_payment = group.pop("by_payment")
+		group.shipper_pct = by_payment.get("Shipper", 0) * 100 / notes
+		group.receiver_pct = by_payment.get("Receiver", 0) * 100 / notes
+		group.third_party_pct = by_payment.get("3rd Party", 0) * 100 / notes
+		group.on_time_pct = group.on_time * 100 / group.delivered if group.delivered else None
+
+	return list(groups.values())
+
+
+def get_chart(filters, rows):
+	if not rows:
+		return None
+
+	if filters.group_by == "Date":
+		labels = [str(row.date) for row in rows]
+		return {
+			"data": {
+				"labels": labels,
+				"datasets": [
+					{"name": "Consignment Notes", "values": [row.consignment_notes for row in rows]}
+				],
+			},
+			"type": "line",
+		}
+
+	top = sorted(rows, key=lambda row: row.consignment_notes, reverse=True)[:10]
+	return {
+		"data": {
+			"labels": [f"{row.consignment_from} → {row.consignment_to}" for row in top],
+			"datasets": [{"name": "Consignment Notes", "values": [row.consignment_notes for row in top]}],
+		},
+		"type": "bar",
+	}
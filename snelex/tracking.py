@@ -0,0 +1,295 @@
+# Copyright (c) 2025, Snelex and contributors
+# For license information, please see license.txt
+
+"""Denormalized tracking index for Consignment Notes.
+
+``Consignment Tracking`` holds one row per submitted Consignment Note with
+everything a tracking lookup needs: tracking number, Job Card, job status,
+current location and the Manifest it travels on. Rows are rebuilt from
+``doc_events`` on Consignment Note, Job Card and Manifest with a handful of
+set-based queries, and ``track`` / ``track_many`` read them through a Redis
+hash keyed by tracking number. Numbers of archived notes are answered from
+``Archived Consignment``. Only numbers that exist are cached: the lookups are
+open to guests, so caching their misses would let anyone grow the hash.
+"""
+
+import pickle
+
+import frappe
+from frappe.rate_limiter import rate_limit
+from frappe.utils import now_datetime
+
+from snelex.profiling import count_cache, profiled
+
+DOCTYPE = "Consignment Tracking"
+ARCHIVE_DOCTYPE = "Archived Consignment"
+TRACKING_CACHE_KEY = "snelex:tracking"
+MAX_BATCH_SIZE = 500
+REBUILD_CHUNK_SIZE = 1000
+
+# fields returned by the tracking API, which guests can call: no internal document names
+PUBLIC_FIELDS = (
+	"tracking_no",
+	"job_status",
+	"current_location",
+	"consignment_to",
+	"last_update",
+)
+
+
+@frappe.whitelist(allow_guest=True)
+@rate_limit(limit=600, seconds=60)
+@profiled
+def track(tracking_no):
+	"""Return the tracking entry for a single tracking number"""
+	tracking_no = (tracking_no or "").strip()
+	if not tracking_no:
+		return None
+	return get_tracking_entries([tracking_no]).get(tracking_no)
+
+
+@frappe.whitelist(allow_guest=True)
+@rate_limit(limit=60, seconds=60)
+@profiled
+def track_many(tracking_nos):
+	"""Return ``{tracking_no: entry}`` for up to ``MAX_BATCH_SIZE`` tracking numbers"""
+	tracking_nos = frappe.parse_json(tracking_nos) or []
+	if isinstance(tracking_nos, str):
+		tracking_nos = [tracking_nos]
+
+	tracking_nos = list(dict.fromkeys(str(t).strip() for t in tracking_nos if t))
+	if len(tracking_nos) > MAX_BATCH_SIZE:
+		frappe.throw(f"At most {MAX_BATCH_SIZE} tracking numbers can be looked up at once")
+
+	return get_tracking_entries(tracking_nos)
+
+
+def get_tracking_entries(tracking_nos):
+	"""Read-through cache lookup of tracking entries, ``None`` for unknown numbers"""
+	result = _get_cached(tracking_nos)
+	missing = [t for t in tracking_nos if t not in result]
+	count_cache(hits=len(result), misses=len(missing))
+	if missing:
+		for tracking_no, entry in _load_entries(missing).items():
+			result[tracking_no] = entry
+			frappe.cache.hset(TRACKING_CACHE_KEY, tracking_no, entry)
+
+	return {t: result.get(t) for t in tracking_nos}
+
+
+@profiled
+def update_from_consignment_note(doc, method=None):
+	"""doc_events handler for Consignment Note"""
+	if method in ("on_cancel", "on_trash"):
+		remove_tracking([doc.name])
+	elif doc.docstatus == 1:
+		rebuild_tracking([doc.name])
+
+
+@profiled
+def update_from_job_card(doc, method=None):
+	"""doc_events handler for Job Card"""
+	if doc.consignment_note:
+		rebuild_tracking([doc.consignment_note])
+
+
+@profiled
+def update_from_manifest(doc, method=None):
+	"""doc_events handler for Manifest: refresh notes added to or dropped from it"""
+	notes = {row.consignment_number for row in doc.get("consignment_details") if row.consignment_number}
+	notes.update(frappe.get_all(DOCTYPE, filters={"manifest": doc.name}, pluck="name"))
+	rebuild_tracking(list(notes), exclude_manifest=doc.name if method == "on_trash" else None)
+
+
+def rebuild_tracking(consignment_notes=None, exclude_manifest=None):
+	"""Recompute tracking rows for the given notes (or every submitted note) in bulk"""
+	if consignment_notes is None:
+		last = ""
+		while True:
+			names = frappe.get_all(
+				"Consignment Note",
+				filters={"docstatus": 1, "name": [">", last]},
+				order_by="name asc",
+				limit=REBUILD_CHUNK_SIZE,
+				pluck="name",
+			)
+			if not names:
+				break
+			rebuild_tracking(names, exclude_manifest)
+			last = names[-1]
+		return
+
+	for start in range(0, len(consignment_notes), REBUILD_CHUNK_SIZE):
+		_rebuild_chunk(consignment_notes[start : start + REBUILD_CHUNK_SIZE], exclude_manifest)
+
+
+def remove_tracking(consignment_notes):
+	"""Drop tracking rows for notes that are cancelled or deleted"""
+	old = frappe.get_all(DOCTYPE, filters={"name": ["in", consignment_notes]}, pluck="tracking_no")
+	frappe.db.delete(DOCTYPE, {"name": ["in", consignment_notes]})
+	_clear_cache(old)
+
+
+def _rebuild_chunk(consignment_notes, exclude_manifest=None):
+	if not consignment_notes:
+		return
+
+	notes = frappe.get_all(
+		"Consignment Note",
+		filters={"name": ["in", consignment_notes], "docstatus": 1},
+		fields=["name", "tracking_no", "consignment_from", "consignment_to", "modified"],
+	)
+	if not notes:
+		remove_tracking(consignment_notes)
+		return
+
+	names = [note.name for note in notes]
+	old_tracking_nos = frappe.get_all(
+		DOCTYPE, filters={"name": ["in", consignment_notes]}, pluck="tracking_no"
+	)
+
+	job_cards = _latest_by_note(
+		frappe.get_all(
+			"Job Card",
+			filters={"consignment_note": ["in", names]},
+			fields=["name", "consignment_note", "job_status", "modified"],
+			order_by="creation asc",
+		)
+	)
+	manifests = _get_manifests(names, exclude_manifest)
+
+	now = now_datetime()
+	values = []
+	for note in notes:
+		job = job_cards.get(note.name) or {}
+		manifest = manifests.get(note.name) or {}
+		if job.get("job_status") == "Completed":
+			current_location = note.consignment_to
+		else:
+			current_location = manifest.get("location") or note.consignment_from
+
+		last_update = max(filter(None, (note.modified, job.get("modified"), manifest.get("modified"))))
+		values.append(
+			(
+				note.name,
+				now,
+				now,
+				frappe.session.user,
+				frappe.session.user,
+				0,
+				note.tracking_no,
+				note.name,
+				job.get("name"),
+				job.get("job_status"),
+				current_location,
+				note.consignment_to,
+				manifest.get("manifest"),
+				last_update,
+			)
+		)
+
+	frappe.db.delete(DOCTYPE, {"name": ["in", consignment_notes]})
+	frappe.db.bulk_insert(
+		DOCTYPE,
+		fields=[
+			"name",
+			"creation",
+			"modified",
+			"modified_by",
+			"owner",
+			"docstatus",
+			"tracking_no",
+			"consignment_note",
+			"job_card",
+			"job_status",
+			"current_location",
+			"consignment_to",
+			"manifest",
+			"last_update",
+		],
+		values=values,
+	)
+
+	_clear_cache(old_tracking_nos + [note.tracking_no for note in notes])
+
+
+def _latest_by_note(rows):
+	latest = {}
+	for row in rows:
+		# rows come oldest first, so the last one per note wins
+		latest[row.consignment_note] = row
+	return latest
+
+
+def _get_manifests(consignment_notes, exclude_manifest=None):
+	"""Return the most recently modified Manifest listing each note"""
+	if not consignment_notes:
+		return {}
+
+	manifest = frappe.qb.DocType("Manifest")
+	listed = frappe.qb.DocType("Consignment List")
+	query = (
+		frappe.qb.from_(listed)
+		.join(manifest)
+		.on(manifest.name == listed.parent)
+		.select(
+			listed.consignment_number,
+			manifest.name.as_("manifest"),
+			manifest.location,
+			manifest.modified,
+		)
+		.where(listed.parenttype == "Manifest")
+		.where(listed.consignment_number.isin(consignment_notes))
+		.orderby(manifest.modified)
+	)
+	if exclude_manifest:
+		query = query.where(manifest.name != exclude_manifest)
+
+	return {row.consignment_number: row for row in query.run(as_dict=True)}
+
+
+def _load_entries(tracking_nos):
+	"""Read tracking rows for ``tracking_nos``; the latest note wins on duplicates"""
+	entries = {}
+	for row in frappe.get_all(
+		DOCTYPE,
+		filters={"tracking_no": ["in", tracking_nos]},
+		fields=list(PUBLIC_FIELDS),
+		order_by="last_update asc",
+	):
+		entries[row.tracking_no] = row
+
+	missing = [t for t in tracking_nos if t not in entries]
+	if missing:
+		entries.update(_load_archived_entries(missing))
+	return entries
+
+
+def _load_archived_entries(tracking_nos):
+	"""Tracking entries kept with archived notes, see ``snelex.archival``"""
+	entries = {}
+	for row in frappe.get_all(
+		ARCHIVE_DOCTYPE,
+		filters={"tracking_no": ["in", tracking_nos]},
+		fields=["tracking_no", "tracking_data"],
+		order_by="consignment_date asc",
+	):
+		entry = frappe.parse_json(row.tracking_data) if row.tracking_data else None
+		if entry:
+			entries[row.tracking_no] = frappe._dict({field: entry.get(field) for field in PUBLIC_FIELDS})
+	return entries
+
+
+def _get_cached(tracking_nos):
+	"""Fetch cached entries with a single HMGET; keys that were never cached are left out"""
+	values = frappe.cache.hmget(frappe.cache.make_key(TRACKING_CACHE_KEY), tracking_nos)
+	return {
+		tracking_no: pickle.loads(value)
+		for tracking_no, value in zip(tracking_nos, values, strict=True)
+		if value is not None
+	}
+
+
+def _clear_cache(tracking_nos):
+	for tracking_no in {t for t in tracking_nos if t}:
+		frappe.cache.hdel(TRACKING_CACHE_KEY, tracking_no)
@@ -0,0 +1,164 @@
+# Copyright (c) 2025, Snelex and contributors
+# For license information, please see license.txt
+
+"""Insurance and permit expiry calendar for the fleet.
+
+The daily ``scan_truck_expiry`` job reads the trucks whose insurance or
+permit expires within ``EXPIRY_HORIZON_DAYS`` with one range query over the
+two indexed expiry dates. ``build_expiry_calendar`` turns the rows into
+``{truck: "date|document"}`` holding the earliest expiry of each truck, and
+the result replaces the ``snelex:truck_expiry`` Redis hash. Truck saves
+refresh their own entry, so a renewed insurance unblocks the truck at once.
+
+``Manifest.validate`` calls ``validate_truck_expiry``, which answers from the
+hash with one Redis lookup instead of loading the Truck. Manifests dated
+beyond the horizon read the Truck's dates instead. The scan also
+sends a digest of expired and expiring trucks to the fleet alert role, in
+batches of ``DIGEST_BATCH_SIZE`` trucks per email.
+"""
+
+import frappe
+from frappe.utils import add_days, getdate, today
+
+from snelex.profiling import count_cache, profiled
+
+CALENDAR_KEY = "snelex:truck_expiry"
+BUILT_KEY = "snelex:truck_expiry:built"
+EXPIRY_HORIZON_DAYS = 30
+DIGEST_BATCH_SIZE = 200
+FLEET_ALERT_ROLE = "System Manager"
+
+# fieldname -> label used in messages and the digest
+EXPIRY_FIELDS = {
+	"insurance_expiry_date": "Insurance",
+	"permit_expiry_date": "Permit",
+}
+
+
+def scan_truck_expiry(notify=True):
+	"""Scheduler job: rebuild the expiry calendar and send the daily digest"""
+	horizon = add_days(today(), EXPIRY_HORIZON_DAYS)
+	calendar = build_expiry_calendar(get_expiring_trucks(horizon))
+
+	calendar_key = frappe.cache.make_key(CALENDAR_KEY)
+	pipe = frappe.cache.pipeline()
+	pipe.delete(calendar_key)
+	if calendar:
+		pipe.hset(calendar_key, mapping={truck: f"{date}|{kind}" for truck, (date, kind) in calendar.items()})
+	# the scan runs daily, the margin covers a late scheduler
+	pipe.set(frappe.cache.make_key(BUILT_KEY), 1, ex=2 * 86400)
+	pipe.execute()
+
+	if notify and calendar:
+		send_expiry_digest(calendar)
+	return calendar
+
+
+def get_expiring_trucks(horizon):
+	"""Trucks with a document expiring on or before ``horizon``, in one range query"""
+	truck = frappe.qb.DocType("Truck")
+	return (
+		frappe.qb.from_(truck)
+		.select(truck.name, *(truck[field] for field in EXPIRY_FIELDS))
+		.where((truck.insurance_expiry_date <= horizon) | (truck.permit_expiry_date <= horizon))
+		.run(as_dict=True)
+	)
+
+
+def build_expiry_calendar(rows):
+	"""Return ``{truck: (date, document)}`` with the earliest expiry of every row"""
+	calendar = {}
+	for row in rows:
+		expiries = [(getdate(row[field]), label) for field, label in EXPIRY_FIELDS.items() if row.get(field)]
+		if expiries:
+			calendar[row["name"]] = min(expiries)
+	return calendar
+
+
+@profiled
+def update_truck_expiry(doc, method=None, *args):
+	"""doc_events handler for Truck: keep the truck's calendar entry in step with its dates"""
+	calendar_key = frappe.cache.make_key(CALENDAR_KEY)
+	pipe = frappe.cache.pipeline()
+	if method == "after_rename":
+		# args are (old, new, merge)
+		pipe.hdel(calendar_key, args[0])
+
+	entry = None
+	if method != "after_delete":
+		entry = build_expiry_calendar([doc.as_dict()]).get(doc.name)
+	if entry and entry[0] <= getdate(add_days(today(), EXPIRY_HORIZON_DAYS)):
+		pipe.hset(calendar_key, doc.name, f"{entry[0]}|{entry[1]}")
+	else:
+		pipe.hdel(calendar_key, doc.name)
+	pipe.execute()
+
+
+def get_truck_expiry(truck):
+	"""Return ``(date, document)`` of the earliest expiry of ``truck`` within the horizon, else None"""
+	if not frappe.cache.exists(BUILT_KEY):
+		count_cache(misses=1)
+		scan_truck_expiry(notify=False)
+	else:
+		count_cache(hits=1)
+
+	(value,) = frappe.cache.hmget(frappe.cache.make_key(CALENDAR_KEY), [truck])
+	if not value:
+		return None
+	date, kind = value.decode().split("|", 1)
+	return getdate(date), kind
+
+
+def validate_truck_expiry(manifest):
+	"""Refuse a truck whose insurance or permit has expired by the Manifest date"""
+	if not manifest.truck or manifest.status != "Open":
+		return
+
+	manifest_date = getdate(manifest.manifest_date or today())
+	if manifest_date > getdate(add_days(today(), EXPIRY_HORIZON_DAYS)):
+		# the calendar does not hold expiries that far ahead
+		truck = frappe.db.get_value("Truck", manifest.truck, list(EXPIRY_FIELDS), as_dict=True) or {}
+		expiry = build_expiry_calendar([{"name": manifest.truck, **truck}]).get(manifest.truck)
+	else:
+		expiry = get_truck_expiry(manifest.truck)
+	if expiry and expiry[0] < manifest_date:
+		frappe.throw(f"Truck {manifest.truck} cannot be assigned: its {expiry[1]} expired on {expiry[0]}")
+
+
+def send_expiry_digest(calendar):
+	"""Email the expired and expiring trucks to the fleet alert role, a batch per email"""
+	recipients = get_alert_recipients()
+	if not recipients:
+		return
+
+	today_date = getdate(today())
+	entries = sorted((date, truck, kind) for truck, (date, kind) in calendar.items())
+	batches = range(0, len(entries), DIGEST_BATCH_SIZE)
+	for number, start in enumerate(batches, 1):
+		batch = entries[start : start + DIGEST_BATCH_SIZE]
+		rows = "".join(
+			f"<tr><td>{frappe.utils.escape_html(truck)}</td><td>{kind}</td><td>{date}</td>"
+			f"<td>{'Expired' if date < today_date else 'Expiring'}</td></tr>"
+			for date, truck, kind in batch
+		)
+		part = f" ({number}/{len(batches)})" if len(batches) > 1 else ""
+		frappe.sendmail(
+			recipients=recipients,
+			subject=f"Truck documents expiring by {add_days(today_date, EXPIRY_HORIZON_DAYS)}{part}",
+			message=(
+				"<table class='table table-bordered'>"
+				"<tr><th>Truck</th><th>Document</th><th>Expiry</th><th>State</th></tr>"
+				f"{rows}</table>"
+			),
+			delayed=True,
+		)
+
+
+def get_alert_recipients():
+	users = frappe.get_all(
+		"Has Role", filters={"role": FLEET_ALERT_ROLE, "parenttype": "User"}, pluck="parent", distinct=True
+	)
+	users = [user for user in users if user not in ("Administrator", "Guest")]
+	if not users:
+		return []
+	return frappe.get_all("User", filters={"name": ["in", users], "enabled": 1}, pluck="email")